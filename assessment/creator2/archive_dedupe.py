@@ -0,0 +1,163 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+from configuration import Configuration as Config
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Written to the destination root after extraction
+ALIAS_MANIFEST_NAME = ".archive_aliases.json"
+
+
+def hash_stream(f: BinaryIO) -> str:
+    """SHA-256 of a seekable binary stream, which is rewound afterwards."""
+    h = hashlib.sha256()
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest()
+
+
+def hash_archive(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hash_stream(f)
+
+
+class ArchiveRegistry:
+    """
+    Content-addressed record of the archives seen during one extraction run.
+
+    The first archive with a given SHA-256 is extracted as usual. Every later
+    byte-identical archive is an alias: it is not extracted (or scanned), only
+    its path is remembered. When extraction is done, each alias is resolved
+    to the directory it would have been extracted to, and that directory is
+    mapped onto the location of the extracted copy.
+
+    All paths are relative to the destination root.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # digest -> (where the first copy ended up, its top-level entry names,
+        # or None if it was not readable and kept as a plain file)
+        self._extracted: Dict[str, Tuple[Path, Optional[Set[str]]]] = {}
+        # digest -> path of the first archive with it
+        self._claimed: Dict[str, Path] = {}
+        # (alias archive path, digest)
+        self._aliases: List[Tuple[Path, str]] = []
+        # alias path -> (canonical path, digest), filled in by resolve()
+        self.aliases: Dict[Path, Tuple[Path, str]] = {}
+
+    def claim(self, digest: str, rel_path: Path) -> bool:
+        """
+        Register the archive at rel_path. Returns True if it is the first
+        archive with this digest (or that same archive again, e.g. one that
+        was kept as a plain file and is retried) and must be extracted;
+        otherwise it is recorded as an alias and False is returned.
+        """
+        with self._lock:
+            first_rel_path = self._claimed.setdefault(digest, rel_path)
+            if first_rel_path == rel_path:
+                return True
+            self._aliases.append((rel_path, digest))
+            return False
+
+    def reserve(self, digest: str, rel_path: Path) -> None:
+        """
+        Make the archive at rel_path the first one with digest, unless one
+        already is. Concurrent extractions reserve their archives in a fixed
+        order beforehand, so thread timing does not decide which copy is
+        extracted and which ones become aliases.
+        """
+        with self._lock:
+            self._claimed.setdefault(digest, rel_path)
+
+    def extracted(self, digest: str, target_dir_rel: Path, top_levels: Set[str]) -> None:
+        """Record where the first archive with digest was extracted to."""
+        with self._lock:
+            self._extracted[digest] = (target_dir_rel, top_levels)
+
+    def kept(self, digest: str, rel_path: Path) -> None:
+        """Record that the first file with digest was not a readable archive and was kept as is."""
+        with self._lock:
+            self._extracted[digest] = (rel_path, None)
+
+    def outcome(self, digest: str, rel_path: Path) -> Optional[dict]:
+        """
+        How the archive at rel_path was handled, as JSON-serializable data
+        for restore(): an alias, or where it was extracted to. None if it was
+        not seen.
+        """
+        with self._lock:
+            if self._claimed.get(digest) != rel_path:
+                return {"alias": True} if (rel_path, digest) in self._aliases else None
+            if digest not in self._extracted:
+                return None
+            target_rel, top_levels = self._extracted[digest]
+            return {"target": target_rel.as_posix(),
+                    "top_levels": sorted(top_levels) if top_levels is not None else None}
+
+    def restore(self, digest: str, rel_path: Path, outcome: dict) -> None:
+        """Register an archive handled by an earlier, resumed run, as outcome() described it."""
+        with self._lock:
+            if outcome.get("alias"):
+                self._aliases.append((rel_path, digest))
+                return
+            self._claimed[digest] = rel_path
+            top_levels = outcome["top_levels"]
+            self._extracted[digest] = (Path(outcome["target"]), set(top_levels) if top_levels is not None else None)
+
+    def resolve(self) -> Dict[Path, Tuple[Path, str]]:
+        """Resolve every alias to (canonical path, digest) once all archives are extracted."""
+        # Imported here because extractor imports this module
+        from assessment.creator2.extractor import archive_target_dir_rel
+
+        for alias_rel, digest in self._aliases:
+            if digest not in self._extracted:
+                continue
+            canonical_rel, top_levels = self._extracted[digest]
+            if top_levels is None:
+                alias_path = alias_rel
+            else:
+                # Same bytes, same entry names: only the archive's own name
+                # decides the directory the alias would have been extracted to
+                alias_path = archive_target_dir_rel(alias_rel, top_levels)
+            if alias_path != canonical_rel:
+                self.aliases[alias_path] = (canonical_rel, digest)
+        return self.aliases
+
+    def register_aliases(self, dest_root: Path) -> None:
+        """Make the resolved aliases known to Config.file_data_manager as absolute paths."""
+        for alias_path, (canonical_path, digest) in self.aliases.items():
+            Config.file_data_manager.add_path_alias(dest_root / alias_path, dest_root / canonical_path)
+
+    def write_manifest(self, dest_root: Path) -> None:
+        """Write the resolved aliases, if there are any, to ALIAS_MANIFEST_NAME in dest_root."""
+        if not self.aliases:
+            return
+        manifest = [
+            {"alias": alias_path.as_posix(), "canonical": canonical_path.as_posix(), "sha256": digest}
+            for alias_path, (canonical_path, digest) in sorted(self.aliases.items())
+        ]
+        with open(dest_root / ALIAS_MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump({"aliases": manifest}, f, indent=2)
+
+
+# Registry of the current extraction run
+_registry = ArchiveRegistry()
+
+
+def get_registry() -> ArchiveRegistry:
+    return _registry
+
+
+def reset_registry() -> ArchiveRegistry:
+    """Start a new extraction run with an empty registry."""
+    global _registry
+    _registry = ArchiveRegistry()
+    return _registry
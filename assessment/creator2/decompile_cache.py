@@ -0,0 +1,126 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# 10 GB
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+# Share of max_bytes a full cache is evicted down to, so the cache directory
+# is listed once per this much room made rather than on every put
+LOW_WATER_RATIO = 0.9
+
+
+def hash_class(class_file: Path, cfr_jar: Path) -> str:
+    """
+    Cache key of the source CFR generates for class_file: the SHA-256 of the
+    class, of its inner classes (MyClass$*.class next to it, which CFR
+    decompiles into the same .java file), and of the CFR jar's name, since
+    another CFR version may generate different source.
+    """
+    digest = hashlib.sha256(cfr_jar.name.encode())
+    for path in [class_file] + sorted(class_file.parent.glob(f"{class_file.stem}$*.class")):
+        digest.update(path.name.encode())
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DecompileCache:
+    """
+    Persistent cache of decompiled sources, shared by every run that uses
+    the same cache_dir: class hash (see hash_class()) -> the .java file CFR
+    generated for it, stored as <cache_dir>/<first 2 hex digits>/<hash>.java.
+
+    A hit is copied into place, so no JVM is started for it. It is never
+    hard-linked: CFR (or anything else) writing the .java file in place
+    would then write through into the entry. Entries themselves are never
+    written in place either; put() replaces them with a finished file.
+
+    The cache is kept under max_bytes: once it goes over, the least
+    recently used entries are evicted until it is down to LOW_WATER_RATIO of
+    that. An entry's modification time is its last use.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _entry(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}.java"
+
+    def _entries(self) -> List[Tuple[Path, int, float]]:
+        """(path, size, last use) of every entry."""
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".java"):
+                    stat = entry.stat()
+                    entries.append((Path(entry.path), stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, digest: str, dest: Path) -> bool:
+        """Put the cached source for digest at dest. Returns False on a miss."""
+        entry = self._entry(digest)
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+
+        # Unlinked first: dest may be a hard link into the cache left by an older version
+        dest.unlink(missing_ok=True)
+        try:
+            shutil.copyfile(entry, dest)
+        except FileNotFoundError:
+            # Evicted in the meantime
+            return False
+        return True
+
+    def put(self, digest: str, java_file: Path) -> None:
+        """Cache java_file as the source generated for digest, evicting old entries if the cache is full."""
+        entry = self._entry(digest)
+        entry.parent.mkdir(exist_ok=True)
+        # Written to a temporary file first, so a reader never sees a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp, open(java_file, "rb") as src:
+            shutil.copyfileobj(src, tmp)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            old_size = entry.stat().st_size if entry.is_file() else 0
+            os.replace(tmp_path, entry)
+            self._size += size - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries down to the low-water mark. Caller holds the lock."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        low_water = self.max_bytes * LOW_WATER_RATIO
+        for path, size, _ in entries:
+            if self._size <= low_water:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
+
+    def size(self) -> int:
+        return self._size
+
+
+def open_cache(cache_dir: Optional[str], max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[DecompileCache]:
+    """The cache in cache_dir, or None (no caching) if cache_dir is not given."""
+    return DecompileCache(Path(cache_dir), max_bytes) if cache_dir else None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import os
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional
+from configuration import Configuration as Config
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# The compression ratio is only checked once an archive has expanded this
+# far, so small, very compressible files (e.g. padding or test data) pass
+RATIO_MIN_BYTES = 16 * 1024 * 1024
+
+
+class BudgetExceeded(Exception):
+    """Extracting an archive would exceed an extraction budget."""
+
+
+class ArchiveBudget:
+    """
+    Budget of one archive or compressed file while it is extracted. Every
+    member and every chunk written is counted as it streams through, so an
+    archive is stopped as soon as it goes over a limit rather than after it
+    has been fully expanded.
+    """
+
+    def __init__(self, run_budget: "ExtractionBudget", compressed_size: int, depth: int):
+        self._run_budget = run_budget
+        self.compressed_size = compressed_size
+        self.depth = depth
+        self.expanded_bytes = 0
+        self.members = 0
+
+    def add_member(self) -> None:
+        self.members += 1
+        max_members = self._run_budget.max_members
+        if max_members and self.members > max_members:
+            raise BudgetExceeded(f"more than {max_members} members")
+
+    def add_bytes(self, size: int) -> None:
+        self.expanded_bytes += size
+        max_archive_bytes = self._run_budget.max_archive_bytes
+        if max_archive_bytes and self.expanded_bytes > max_archive_bytes:
+            raise BudgetExceeded(f"expands to more than {max_archive_bytes} bytes")
+        max_ratio = self._run_budget.max_compression_ratio
+        if (max_ratio and self.expanded_bytes > RATIO_MIN_BYTES
+                and self.expanded_bytes > max_ratio * max(self.compressed_size, 1)):
+            raise BudgetExceeded(f"compression ratio above {max_ratio}")
+        self._run_budget.add_bytes(size)
+
+    def copy(self, src: BinaryIO, dst: BinaryIO) -> None:
+        """shutil.copyfileobj(), counting every chunk against the budget."""
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            self.add_bytes(len(chunk))
+            dst.write(chunk)
+
+    def read(self, src: BinaryIO, size: int = -1) -> bytes:
+        """src.read(size), counting every chunk against the budget."""
+        if size >= 0:
+            data = src.read(size)
+            self.add_bytes(len(data))
+            return data
+        chunks = []
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            self.add_bytes(len(chunk))
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+class ExtractionBudget:
+    """
+    Limits for one extraction run, against decompression bombs. Each archive
+    gets an ArchiveBudget; the total number of bytes extracted is shared by
+    all of them (and all extraction threads). A limit of 0 means unlimited.
+    """
+
+    def __init__(self, max_archive_bytes: int = 0, max_total_bytes: int = 0, max_compression_ratio: float = 0,
+                 max_members: int = 0, max_depth: int = 0):
+        self.max_archive_bytes = max_archive_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_compression_ratio = max_compression_ratio
+        self.max_members = max_members
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+
+    def add_bytes(self, size: int) -> None:
+        with self._lock:
+            self.total_bytes += size
+            total_bytes = self.total_bytes
+        if self.max_total_bytes and total_bytes > self.max_total_bytes:
+            raise BudgetExceeded(f"extraction total above {self.max_total_bytes} bytes")
+
+    def archive(self, archive_path: Path, depth: int, compressed_size: Optional[int] = None) -> ArchiveBudget:
+        """
+        Budget for extracting the archive at archive_path, nested depth
+        archives deep (1 for an archive in the source itself).
+        """
+        if self.max_depth and depth > self.max_depth:
+            raise BudgetExceeded(f"nested more than {self.max_depth} archives deep")
+        if self.max_total_bytes and self.total_bytes > self.max_total_bytes:
+            raise BudgetExceeded(f"extraction total above {self.max_total_bytes} bytes")
+        if compressed_size is None:
+            compressed_size = os.path.getsize(archive_path)
+        return ArchiveBudget(self, compressed_size, depth)
+
+
+def skip_status(e: BudgetExceeded) -> str:
+    """Status reported for an archive that was not extracted because of e."""
+    return f"Skipped: {e}"
+
+
+# Budget of the current extraction run
+_budget = ExtractionBudget()
+
+
+def get_budget() -> ExtractionBudget:
+    return _budget
+
+
+def reset_budget() -> ExtractionBudget:
+    """Start a new extraction run with the configured limits."""
+    global _budget
+    _budget = ExtractionBudget(
+        max_archive_bytes=Config.max_archive_bytes,
+        max_total_bytes=Config.max_total_bytes,
+        max_compression_ratio=Config.max_compression_ratio,
+        max_members=Config.max_archive_members,
+        max_depth=Config.max_nesting_depth,
+    )
+    return _budget
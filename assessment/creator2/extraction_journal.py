@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from assessment.creator2 import archive_dedupe
+from loggers.extraction_logger import extraction_logger
+from configuration import Configuration as Config
+
+# Written next to the destination root (<dest>.extraction_journal.jsonl), so
+# it is not taken for extracted content
+JOURNAL_SUFFIX = ".extraction_journal.jsonl"
+
+# Config attributes that decide what an extraction produces
+SETTINGS = ("filter_extensions", "filter_globs", "filter_max_size", "filter_hash", "max_archive_bytes",
+            "max_total_bytes", "max_compression_ratio", "max_archive_members", "max_nesting_depth", "image_mode",
+            "dedupe_archives", "prefer_sources_jars")
+
+
+def current_settings() -> dict:
+    """The values of SETTINGS in this run."""
+    return {name: getattr(Config, name) for name in SETTINGS}
+
+
+class ExtractionJournal:
+    """
+    Append-only record of the archives an extraction run has finished, so a
+    run that died can be resumed by running it again on the same
+    destination.
+
+    Every finished archive gets one JSON line: its path, its SHA-256, the
+    files it produced, and how deduplication handled it. The line is written
+    and synced to disk once the archive is fully extracted, before a nested
+    archive is removed. An archive without a line was not finished and is
+    extracted again, overwriting what it had written. Bookkeeping done along
+    the way (image layers, statuses, filtered files) is noted in the journal
+    as well and restored when it is loaded.
+
+    An archive is only taken as extracted while everything it produced is
+    still there, so a destination that was cleared starts over. The first
+    line holds the SETTINGS of the run that started the journal; a journal
+    written under other settings is discarded and the run starts over too.
+
+    All paths in the journal are relative to the destination root.
+    """
+
+    def __init__(self, dest_root: Path):
+        self.dest_root = dest_root
+        self.path = dest_root.with_name(dest_root.name + JOURNAL_SUFFIX)
+        self._lock = threading.Lock()
+        # archive path -> its line
+        self._entries: Dict[str, dict] = {}
+        self.settings = current_settings()
+        resume = self.path.is_file() and dest_root.is_dir() and self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self._write({"settings": self.settings}, sync=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def _rel(self, path: Path) -> str:
+        try:
+            return Path(path).relative_to(self.dest_root).as_posix()
+        except ValueError:
+            return Path(path).resolve().relative_to(self.dest_root).as_posix()
+
+    def _load(self) -> bool:
+        """Load the journal; False if it cannot be resumed under the current settings."""
+        with open(self.path, "rb") as f:
+            data = f.read()
+        header = data.split(b"\n", 1)[0]
+        try:
+            settings = json.loads(header).get("settings")
+        except (ValueError, AttributeError):
+            settings = None
+        if settings != self.settings:
+            extraction_logger.info(f"[extraction_journal] {self.path} was written under other settings; "
+                                   f"extracting from scratch")
+            return False
+
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            # The last line was cut off by the crash; drop it so appending starts on a new line
+            with open(self.path, "r+b") as f:
+                f.truncate(end)
+
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                extraction_logger.error(f"[extraction_journal] Ignoring unreadable line in {self.path}: {e}")
+                continue
+            if "archive" in record:
+                self._entries[record["archive"]] = record
+            elif "note" in record:
+                self._restore_note(record)
+        extraction_logger.info(f"[extraction_journal] Resuming: {len(self._entries)} archives already extracted")
+        return True
+
+    def _write(self, record: dict, sync: bool = False) -> None:
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self._file.write(line)
+            if sync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def lookup(self, archive_path: Path, digest: str) -> Optional[dict]:
+        """
+        The line of the archive at archive_path if an earlier run finished it,
+        it has not changed since, and what it produced is still there.
+        """
+        entry = self._entries.get(self._rel(archive_path))
+        if entry is None or entry["sha256"] != digest or not self._complete(entry, set()):
+            return None
+        return entry
+
+    def _complete(self, entry: dict, seen: Set[str]) -> bool:
+        seen.add(entry["archive"])
+        for rel in entry["produced"]:
+            if (self.dest_root / rel).is_file():
+                continue
+            nested = self._entries.get(rel)
+            if nested is None or rel in seen or not self._complete(nested, seen):
+                return False
+        return True
+
+    def replay(self, entry: dict, seen: Optional[Set[str]] = None) -> List[Path]:
+        """
+        Restore what extracting an archive did and return the files it
+        produced. Nested archives among them that were extracted and removed
+        since are replaced by the files they produced in turn.
+        """
+        seen = set() if seen is None else seen
+        seen.add(entry["archive"])
+        if entry.get("dedupe") and Config.dedupe_archives:
+            archive_dedupe.get_registry().restore(entry["sha256"], Path(entry["archive"]), entry["dedupe"])
+
+        produced: List[Path] = []
+        for rel in entry["produced"]:
+            path = self.dest_root / rel
+            nested = self._entries.get(rel)
+            if nested is not None and rel not in seen and not path.is_file():
+                produced.extend(self.replay(nested, seen))
+            else:
+                produced.append(path)
+        return produced
+
+    def record(self, archive_path: Path, digest: str, produced: List[Path], keep: bool = True) -> None:
+        """
+        Record that the archive at archive_path was fully extracted into
+        'produced'. keep tells whether the archive stays (a source file, or
+        one that was not extracted) or is removed afterwards.
+        """
+        rel = self._rel(archive_path)
+        entry = {"archive": rel, "sha256": digest, "produced": [self._rel(path) for path in produced], "keep": keep}
+        if Config.dedupe_archives:
+            outcome = archive_dedupe.get_registry().outcome(digest, Path(rel))
+            if outcome is not None:
+                entry["dedupe"] = outcome
+        self._write(entry, sync=True)
+        with self._lock:
+            self._entries[rel] = entry
+
+    def note(self, kind: str, path: Path, **data) -> None:
+        self._write({"note": kind, "path": self._rel(path), **data})
+
+    def _restore_note(self, note: dict) -> None:
+        path = self.dest_root / note["path"]
+        if note["note"] == "layer":
+            Config.file_data_manager.add_file_layer(path, note["layer"])
+        elif note["note"] == "status":
+            Config.file_data_manager.set_file_status(path, note["status"])
+        elif note["note"] == "filtered":
+            Config.file_data_manager.add_filtered_file(path, note["size"], note.get("sha256"))
+
+
+# Journal of the current extraction run, if EXTRACTION_JOURNAL is set
+_journal: Optional[ExtractionJournal] = None
+
+
+def get_journal() -> Optional[ExtractionJournal]:
+    return _journal
+
+
+def open_journal(dest_root: Path) -> Optional[ExtractionJournal]:
+    """Start journaling an extraction run into dest_root, resuming from its journal if there is one."""
+    global _journal
+    _journal = ExtractionJournal(dest_root) if Config.extraction_journal else None
+    return _journal
+
+
+def close_journal() -> None:
+    global _journal
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+
+
+def note(kind: str, path: Path, **data) -> None:
+    """Note bookkeeping about the file at path (see ExtractionJournal._restore_note) in the current journal."""
+    if _journal is not None:
+        _journal.note(kind, path, **data)
+
+
+def note_layers(paths: List[Path]) -> None:
+    """Note the image layers recorded for paths in the current journal."""
+    if _journal is None:
+        return
+    for path in paths:
+        layer = Config.file_data_manager.get_file_layer(path)
+        if layer is not None:
+            _journal.note("layer", path, layer=layer)
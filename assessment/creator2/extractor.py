@@ -4,135 +4,136 @@
 import argparse
 import os
 import shutil
+import threading
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import zipfile
 import tarfile
 import gzip
 import bz2
 import lzma
-from loggers.extraction_logger import extraction_logger
+import zlib
+from assessment.creator2 import (archive_dedupe, extraction_budget, extraction_journal, file_magic, image_extractor,
+                                 member_filter)
+from assessment.creator2.extraction_budget import ArchiveBudget, BudgetExceeded
+from assessment.creator2.member_filter import FilteredMember
+from loggers.extraction_logger import ProgressLog, stage_logger
 from configuration import Configuration as Config
 
-
-
-# Toggle this to turn noisy debug output on/off
-DEBUG = True
-
-
-def debug_print(*args, **kwargs):
-    if DEBUG:
-        print(*args, **kwargs, flush=True)
+# Per-file messages are logged at DEBUG; LOG_STAGE_LEVELS sets each stage's level
+copy_log = stage_logger("copy")
+archive_log = stage_logger("archive")
+nested_log = stage_logger("nested")
+image_log = stage_logger("image")
 
 
 # ---------- Classification helpers ----------
 
-def _looks_like_hex_hash(name: str) -> bool:
+def classify(path: Path) -> str:
     """
-    Heuristic: filename looks like a hash (Docker/OCI layers often do this).
+    Classify the file by its content (see file_magic.classify_header):
+    - "multi"   -> multi-file archive
+    - "single"  -> single-file compression
+    - "none"    -> normal file
     """
-    name = name.lower()
-    if not (32 <= len(name) <= 128):
-        return False
-    return all(c in "0123456789abcdef" for c in name)
+    kind, fmt = file_magic.classify_file(path)
+    copy_log.debug(f"[classify] {path} -> {kind} ({fmt})")
+    return kind
 
 
-def _is_image_layer_candidate(path: Path) -> bool:
-    """
-    Return True iff this hex-looking, extension-less file is *likely* an image
-    layer blob, not just some random hex-y filename like .build-id entries.
-
-    We require that some ancestor directory is named 'sha256' (typical for
-    Docker/OCI blobs: .../blobs/sha256/<hash> or .../sha256/<hash>).
-    """
-    if path.suffix != "" or not _looks_like_hex_hash(path.name):
-        return False
+# ---------- Extraction helpers ----------
 
-    for parent in path.parents:
-        if parent.name.lower() == "sha256":
-            return True
-    return False
+# Nested archives are extracted concurrently; extractions that write to the
+# same target path (e.g. foo.zip and foo.tar.gz -> foo/) take its lock.
+# Target path -> [lock, number of extractions holding or waiting for it]
+_target_locks: Dict[Path, List] = {}
+_target_locks_guard = threading.Lock()
 
 
-def is_multi_archive(path: Path) -> bool:
+@contextmanager
+def _target_lock(target: Path) -> Iterator[None]:
     """
-    True if this path should be treated as a multi-file archive.
+    Hold the lock for an extraction target path. It is dropped once no
+    extraction holds or waits for it, so there is never more than one per
+    running extraction.
     """
-    name = path.name.lower()
+    key = target.resolve()
+    with _target_locks_guard:
+        entry = _target_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _target_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _target_locks[key]
+
 
-    # Common multi-file archives by extension
-    if name.endswith((".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")):
-        return True
-    if path.suffix.lower() in {".zip", ".tar", ".jar"}:
-        return True
+# Maven's source artifact next to a binary jar: foo-1.2.jar, foo-1.2-sources.jar
+SOURCES_JAR_SUFFIX = "-sources.jar"
 
-    # Special rule for .gz:
-    #   - name has another extension before .gz -> single-file compression
-    #   - otherwise -> treat as multi-file archive (e.g., "compress1.gz")
-    if path.suffix.lower() == ".gz" and "." not in path.stem:
-        return True
+# Sources jars seen in this run, which may already have been extracted and
+# removed when the binary jar next to them is extracted
+_sources_jars: Set[Path] = set()
+_sources_jars_guard = threading.Lock()
 
-    # Hash-named *image layer* files (no extension, hex name) under a 'sha256' directory
-    if _is_image_layer_candidate(path):
-        return True
 
-    return False
+def _note_sources_jars(paths: Iterable[Path]) -> None:
+    """Remember the sources jars among paths, before any of them is extracted."""
+    with _sources_jars_guard:
+        _sources_jars.update(path for path in paths if path.name.endswith(SOURCES_JAR_SUFFIX))
 
 
-def is_single_compressed(path: Path) -> bool:
+def sources_jar_for(jar_path: Path) -> Optional[Path]:
     """
-    True if this path is a single-file compressed file.
+    The -sources.jar next to the binary jar at jar_path, if there is one and
+    PREFER_SOURCES_JARS is set. Its sources are scanned instead of the
+    jar's classes.
     """
-    suffix = path.suffix.lower()
+    name = jar_path.name
+    if not Config.prefer_sources_jars or not name.endswith(".jar") or name.endswith(SOURCES_JAR_SUFFIX):
+        return None
+    sources_jar = jar_path.with_name(name[:-len(".jar")] + SOURCES_JAR_SUFFIX)
+    with _sources_jars_guard:
+        if sources_jar in _sources_jars:
+            return sources_jar
+    return sources_jar if sources_jar.is_file() else None
 
-    if suffix in {".bz2", ".xz", ".lzma"}:
-        return True
 
-    if suffix == ".gz":
-        # If there's another extension before .gz (e.g. ".txt.gz"), treat as single-file
-        return "." in path.stem
-
-    return False
-
-
-def classify(path: Path) -> str:
+def decompress_single(src_file: Path, dest_file: Path, depth: int = 1) -> Path:
     """
-    Classify the file:
-    - "multi"   -> multi-file archive
-    - "single"  -> single-file compression
-    - "none"    -> normal file
+    Decompress single-file compressed src_file, nested depth archives deep,
+    to dest_file and return dest_file. Raises BudgetExceeded (leaving no
+    output) if it goes over the extraction budget.
     """
-    if is_multi_archive(path):
-        kind = "multi"
-    elif is_single_compressed(path):
-        kind = "single"
-    else:
-        kind = "none"
-
-    debug_print(f"[classify] {path} -> {kind}")
-    return kind
-
-
-# ---------- Extraction helpers ----------
-
-def decompress_single(src_file: Path, dest_file: Path) -> None:
-    """Decompress single-file compressed src_file to dest_file."""
-    debug_print(f"[decompress_single] {src_file} -> {dest_file}")
+    archive_log.debug(f"[decompress_single] {src_file} -> {dest_file}")
+    budget = extraction_budget.get_budget().archive(src_file, depth)
     dest_file.parent.mkdir(parents=True, exist_ok=True)
 
     openers = {
-        ".gz": gzip.open,
-        ".bz2": bz2.open,
-        ".xz": lzma.open,
-        ".lzma": lzma.open,
+        file_magic.GZIP: gzip.open,
+        file_magic.BZIP2: bz2.open,
+        file_magic.XZ: lzma.open,
+        file_magic.LZMA: lzma.open,
     }
 
-    opener = openers.get(src_file.suffix.lower())
+    opener = openers.get(file_magic.classify_file(src_file)[1])
     if opener is None:
-        print(extraction_logger.error(f"Unsupported single-file compression: {src_file}"))
+        archive_log.error(f"[decompress_single] Unsupported single-file compression: {src_file}")
         raise ValueError(f"Unsupported single-file compression: {src_file}")
 
-    with opener(src_file, "rb") as f_in, open(dest_file, "wb") as f_out:
-        shutil.copyfileobj(f_in, f_out)
+    with _target_lock(dest_file):
+        try:
+            with opener(src_file, "rb") as f_in, open(dest_file, "wb") as f_out:
+                budget.copy(f_in, f_out)
+        except BudgetExceeded:
+            dest_file.unlink(missing_ok=True)
+            raise
+    return dest_file
 
 
 def strip_multi_suffix(rel_path: Path) -> Path:
@@ -147,163 +148,385 @@ def strip_multi_suffix(rel_path: Path) -> Path:
     for suf in (".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz"):
         if lower.endswith(suf):
             result = Path(s[:-len(suf)])
-            debug_print(f"[strip_multi_suffix] {rel_path} -> {result}")
+            copy_log.debug(f"[strip_multi_suffix] {rel_path} -> {result}")
             return result
 
     # Fallback: remove just the last suffix
     result = rel_path.with_suffix("")
-    debug_print(f"[strip_multi_suffix] {rel_path} -> {result}")
+    copy_log.debug(f"[strip_multi_suffix] {rel_path} -> {result}")
     return result
 
 
-def safe_extract_tar(tar_obj: tarfile.TarFile, path: Path) -> None:
+def zip_top_levels(names: List[str]) -> Set[str]:
+    """Top-level entry names of a zip archive, ignoring macOS resource forks."""
+    return set(
+        n.split("/", 1)[0].rstrip("/")
+        for n in names
+        if n and not n.startswith("__MACOSX")
+    )
+
+
+def _tar_top_level(name: str) -> str:
+    """Top-level entry name of a tar member."""
+    return name.split("/", 1)[0].rstrip("/")
+
+
+def tar_top_levels(names: List[str]) -> Set[str]:
+    """Top-level entry names of a tar archive."""
+    return set(
+        _tar_top_level(n)
+        for n in names
+        if n and n not in (".", "/")
+    )
+
+
+def archive_target_dir_rel(rel_path: Path, top_levels: Set[str]) -> Path:
+    """
+    Directory, relative to the destination root, that the archive at rel_path
+    is extracted into: the archive name without its extension(s), or its
+    parent when the archive's only top-level entry already has that name.
+    """
+    default_dir_rel = strip_multi_suffix(rel_path)
+    if len(top_levels) == 1 and next(iter(top_levels)) == default_dir_rel.name:
+        copy_log.debug(f"[archive_target_dir_rel] Flattening top-level dir of {rel_path}")
+        return default_dir_rel.parent
+    return default_dir_rel
+
+
+def _discard(paths: List[Path]) -> None:
+    """Remove the files an extraction that went over its budget had written."""
+    for path in paths:
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            archive_log.error(f"[extract] Could not remove {path}: {e}")
+
+
+def _unhoist(path: Path, hoist: str, written: List[Path]) -> List[Path]:
+    """
+    Move files that were written with their top-level directory 'hoist'
+    stripped (path/x) back under it (path/hoist/x). Returns their new paths.
     """
-    Safely extract a tarfile to 'path', handling:
+    archive_log.debug(f"[safe_extract_tar] {path}: more than one top-level entry, moving files under {hoist}/")
+    hoist_dir = path / hoist
+    if path in written:
+        # The only member so far was a file named like the archive itself
+        moved = path.with_name(path.name + "_unhoist")
+        os.replace(path, moved)
+        path.mkdir()
+        os.replace(moved, hoist_dir)
+        return [hoist_dir]
+
+    unhoisted: List[Path] = []
+    for old_path in written:
+        new_path = hoist_dir / old_path.relative_to(path)
+        new_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(old_path, new_path)
+        unhoisted.append(new_path)
+        # Drop directories the move left empty
+        for parent in old_path.parents:
+            if parent == path:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+    return unhoisted
+
+
+# Errors from a corrupt or truncated tar or compressed stream
+_TAR_STREAM_ERRORS = (tarfile.TarError, EOFError, OSError, zlib.error, lzma.LZMAError)
+# The ones a member's content can raise once the stream breaks off; an
+# OSError while copying a member is more likely from writing it
+_TAR_BROKEN_ERRORS = (tarfile.TarError, EOFError, zlib.error, lzma.LZMAError)
+
+
+def safe_extract_tar(tar_obj: tarfile.TarFile, path: Path, hoist: Optional[str] = None,
+                     budget: Optional[ArchiveBudget] = None,
+                     filtered: Optional[List[FilteredMember]] = None) -> Tuple[List[Path], Set[str]]:
+    """
+    Safely extract a tarfile to 'path' in a single pass over its members, so
+    a compressed tar opened as a stream (mode "r|*") is decompressed only
+    once, handling:
     - path traversal protection
     - Windows-invalid filename characters
     - skipping special files (symlinks, devices, FIFOs)
-    """
-    path = path.resolve()
-    invalid_chars = '<>:"|?*' if os.name == "nt" else ""
 
-    debug_print(f"[safe_extract_tar] Extracting to {path}")
+    If 'hoist' is given and the archive's only top-level entry has that
+    name, its content is written to 'path' directly (see
+    archive_target_dir_rel). This is decided on the fly: once another
+    top-level entry turns up, the files written so far are moved under
+    path / hoist.
 
-    for member in tar_obj.getmembers():
-        name = member.name
-        if not name:
-            continue
+    Returns the paths of the regular files written and the archive's
+    top-level entry names. A stream that breaks off after some files were
+    written is logged and extraction stops there. If the archive goes over
+    'budget', the files written are removed and BudgetExceeded is raised.
 
-        # On Windows, skip names with invalid characters (like ":" in man pages)
-        if os.name == "nt" and any(ch in name for ch in invalid_chars):
-            extraction_logger.info(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
-            debug_print(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
-            continue
+    Members the member filter rejects are not written; they are appended to
+    'filtered' for the caller to record once the files are in their final
+    place, or recorded right away if it is None.
+    """
+    path = path.resolve()
+    written: List[Path] = []
+    top_levels: Set[str] = set()
+    hoisting = hoist is not None
+    invalid_chars = '<>:"|?*' if os.name == "nt" else ""
 
-        # Path traversal protection
-        member_path = (path / name).resolve()
-        if not str(member_path).startswith(str(path)):
-            extraction_logger.exception(f"Unsafe path in tar archive (path traversal attempt) for path: {path}")
-            raise Exception("Unsafe path in tar archive (path traversal attempt)")
+    archive_log.debug(f"[safe_extract_tar] Extracting to {path}")
 
-        try:
-            if member.isdir():
-                debug_print(f"[safe_extract_tar] Dir: {member_path}")
-                member_path.mkdir(parents=True, exist_ok=True)
-
-            elif member.isreg():
-                debug_print(f"[safe_extract_tar] File: {member_path}")
-                member_path.parent.mkdir(parents=True, exist_ok=True)
-                src_f = tar_obj.extractfile(member)
-                if src_f is None:
-                    debug_print(f"[safe_extract_tar]   No fileobj for {name}, skipping")
-                    continue
+    members = iter(tar_obj)
+    member_path = None
+    try:
+        while True:
+            try:
+                member = next(members)
+            except StopIteration:
+                break
+            except _TAR_STREAM_ERRORS as e:
+                if not written:
+                    raise
+                archive_log.error(f"[safe_extract_tar] Archive broken off after {len(written)} files: {e}")
+                break
+
+            name = member.name
+            if not name:
+                continue
+            if budget is not None:
+                budget.add_member()
+
+            if name not in (".", "/"):
+                top_levels.add(_tar_top_level(name))
+                if hoisting and top_levels != {hoist}:
+                    written = _unhoist(path, hoist, written)
+                    if filtered:
+                        filtered[:] = [(path / hoist / dest_file.relative_to(path), size, file_hash)
+                                       for dest_file, size, file_hash in filtered]
+                    hoisting = False
+
+            # On Windows, skip names with invalid characters (like ":" in man pages)
+            if os.name == "nt" and any(ch in name for ch in invalid_chars):
+                archive_log.debug(f"[safe_extract_tar] Skipping invalid Windows name: {name}")
+                continue
 
-                try:
-                    with src_f:
-                        with open(member_path, "wb") as dst_f:
-                            shutil.copyfileobj(src_f, dst_f)
-                except (OSError, ValueError) as e:
-                    extraction_logger.error(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
-                    debug_print(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
+            out_name = name.split("/", 1)[1] if hoisting and "/" in name else ("" if hoisting else name)
+
+            # Path traversal protection
+            member_path = (path / out_name).resolve()
+            if not str(member_path).startswith(str(path)):
+                archive_log.exception(f"Unsafe path in tar archive (path traversal attempt) for path: {path}")
+                raise Exception("Unsafe path in tar archive (path traversal attempt)")
+
+            try:
+                if member.isdir():
+                    archive_log.debug(f"[safe_extract_tar] Dir: {member_path}")
+                    member_path.mkdir(parents=True, exist_ok=True)
+
+                elif member.isreg():
+                    filtered_member = member_filter.check_member(name, member_path, member.size,
+                                                                 lambda: tar_obj.extractfile(member))
+                    if filtered_member is not None:
+                        archive_log.debug(f"[safe_extract_tar] Filtered: {member_path}")
+                        if filtered is None:
+                            member_filter.record([filtered_member])
+                        else:
+                            filtered.append(filtered_member)
+                        continue
+
+                    archive_log.debug(f"[safe_extract_tar] File: {member_path}")
+                    if member_path == path:
+                        # A file named like the archive: it takes the place of the (empty) directory
+                        path.rmdir()
+                    member_path.parent.mkdir(parents=True, exist_ok=True)
+                    src_f = tar_obj.extractfile(member)
+                    if src_f is None:
+                        archive_log.debug(f"[safe_extract_tar]   No fileobj for {name}, skipping")
+                        continue
+
+                    try:
+                        with src_f:
+                            with open(member_path, "wb") as dst_f:
+                                if budget is None:
+                                    shutil.copyfileobj(src_f, dst_f)
+                                else:
+                                    budget.copy(src_f, dst_f)
+                    except _TAR_BROKEN_ERRORS as e:
+                        # The stream broke off in the middle of this member
+                        member_path.unlink(missing_ok=True)
+                        if not written:
+                            raise
+                        archive_log.error(f"[safe_extract_tar] Archive broken off after {len(written)} files: {e}")
+                        break
+                    except (OSError, ValueError) as e:
+                        archive_log.error(f"[safe_extract_tar]   Failed writing {member_path}: {e}")
+                        member_path.unlink(missing_ok=True)
+                        continue
+                    written.append(member_path)
+
+                    # Apply basic permissions; ignore failures
+                    try:
+                        os.chmod(member_path, member.mode & 0o777)
+                    except PermissionError:
+                        archive_log.error(f"[safe_extract_tar]   chmod failed for {member_path}")
+                        pass
+
+                else:
+                    # Skip symlinks, devices, fifos, etc.
+                    archive_log.debug(f"[safe_extract_tar] Skipping special member: {name}")
                     continue
 
-                # Apply basic permissions; ignore failures
-                try:
-                    os.chmod(member_path, member.mode & 0o777)
-                except PermissionError:
-                    extraction_logger.error(f"[safe_extract_tar]   chmod failed for {member_path}")
-                    debug_print(f"[safe_extract_tar]   chmod failed for {member_path}")
-                    pass
-
-            else:
-                # Skip symlinks, devices, fifos, etc.
-                extraction_logger.info(f"[safe_extract_tar] Skipping special member: {name}")
-                debug_print(f"[safe_extract_tar] Skipping special member: {name}")
+            except (PermissionError, OSError, ValueError) as e:
+                archive_log.error(f"[safe_extract_tar]   Error for {name}: {e}")
                 continue
 
-        except (PermissionError, OSError, ValueError) as e:
-            extraction_logger.error(f"[safe_extract_tar]   Error for {name}: {e}")
-            debug_print(f"[safe_extract_tar]   Error for {name}: {e}")
-            continue
+    except BudgetExceeded:
+        # The member being written when the budget ran out is incomplete
+        _discard(written + ([member_path] if member_path is not None and member_path != path else []))
+        raise
+
+    return written, top_levels
 
 
-def safe_extract_zip(zf: zipfile.ZipFile, path: Path) -> None:
+def safe_extract_zip(zf: zipfile.ZipFile, path: Path, budget: Optional[ArchiveBudget] = None,
+                     filtered: Optional[List[FilteredMember]] = None, skip_classes: bool = False) -> List[Path]:
     """
     Safe zip extraction with path traversal protection.
+
+    Returns the paths of the files written. If the archive goes over
+    'budget', the files written are removed and BudgetExceeded is raised.
+    Members the member filter rejects are handled as in safe_extract_tar().
+    With skip_classes, .class members are handled as filtered out as well.
     """
     path = path.resolve()
-    debug_print(f"[safe_extract_zip] Extracting to {path}")
+    written: List[Path] = []
+    archive_log.debug(f"[safe_extract_zip] Extracting to {path}")
 
-    for info in zf.infolist():
-        if info.is_dir():
-            d = (path / info.filename).resolve()
-            debug_print(f"[safe_extract_zip] Dir: {d}")
-            d.mkdir(parents=True, exist_ok=True)
-            continue
+    try:
+        for info in zf.infolist():
+            if budget is not None:
+                budget.add_member()
+            if info.is_dir():
+                d = (path / info.filename).resolve()
+                archive_log.debug(f"[safe_extract_zip] Dir: {d}")
+                d.mkdir(parents=True, exist_ok=True)
+                continue
 
-        dest = (path / info.filename).resolve()
-        if not str(dest).startswith(str(path)):
-            extraction_logger.exception(f"Unsafe path in zip archive (path traversal attempt) for path: {dest}")
-            raise Exception("Unsafe path in zip archive (path traversal attempt)")
+            dest = (path / info.filename).resolve()
+            if not str(dest).startswith(str(path)):
+                archive_log.exception(f"Unsafe path in zip archive (path traversal attempt) for path: {dest}")
+                raise Exception("Unsafe path in zip archive (path traversal attempt)")
 
-        debug_print(f"[safe_extract_zip] File: {dest}")
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        with zf.open(info, "r") as src, open(dest, "wb") as dst:
-            shutil.copyfileobj(src, dst)
+            if skip_classes and info.filename.endswith(".class"):
+                filtered_member = (dest, info.file_size, None)
+            else:
+                filtered_member = member_filter.check_member(info.filename, dest, info.file_size,
+                                                             lambda: zf.open(info, "r"))
+            if filtered_member is not None:
+                archive_log.debug(f"[safe_extract_zip] Filtered: {dest}")
+                if filtered is None:
+                    member_filter.record([filtered_member])
+                else:
+                    filtered.append(filtered_member)
+                continue
+
+            archive_log.debug(f"[safe_extract_zip] File: {dest}")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            # Counted as written before copying, so a partial file is removed as well
+            written.append(dest)
+            with zf.open(info, "r") as src, open(dest, "wb") as dst:
+                if budget is None:
+                    shutil.copyfileobj(src, dst)
+                else:
+                    budget.copy(src, dst)
+    except BudgetExceeded:
+        _discard(written)
+        raise
 
+    return written
 
-def _finalize_extract_dir(extract_dir: Path, final_dir: Path) -> None:
+
+def _finalize_extract_dir(extract_dir: Path, final_dir: Path, written: List[Path] = ()) -> List[Path]:
     """
     Ensure extracted content ends up at final_dir, replacing any existing file/dir.
+
+    Returns the paths in 'written' (files extracted under extract_dir) as they
+    are after the move.
     """
     if extract_dir == final_dir:
-        debug_print(f"[finalize] extract_dir == final_dir == {final_dir}, nothing to do")
-        return
+        archive_log.debug(f"[finalize] extract_dir == final_dir == {final_dir}, nothing to do")
+        return list(written)
 
-    debug_print(f"[finalize] Moving {extract_dir} -> {final_dir}")
+    extract_root = extract_dir.resolve()
+
+    archive_log.debug(f"[finalize] Moving {extract_dir} -> {final_dir}")
     if final_dir.exists():
         if final_dir.is_file():
-            debug_print(f"[finalize] Removing file {final_dir}")
+            archive_log.debug(f"[finalize] Removing file {final_dir}")
             final_dir.unlink()
         elif final_dir.is_dir():
-            debug_print(f"[finalize] Removing dir {final_dir}")
+            archive_log.debug(f"[finalize] Removing dir {final_dir}")
             shutil.rmtree(final_dir)
 
     extract_dir.parent.mkdir(parents=True, exist_ok=True)
     os.replace(extract_dir, final_dir)
 
+    final_root = final_dir.resolve()
+    return [final_root / p.relative_to(extract_root) for p in written]
+
+
+def _record_filtered(extract_dir: Path, final_dir: Path, filtered: List[FilteredMember]) -> None:
+    """Record the members filtered out while extracting to extract_dir, as if they were under final_dir."""
+    if extract_dir != final_dir:
+        extract_root = extract_dir.resolve()
+        filtered = [(final_dir.resolve() / dest_file.relative_to(extract_root), size, file_hash)
+                    for dest_file, size, file_hash in filtered]
+    member_filter.record(filtered)
 
-def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> None:
+
+def extract_multi(src_file: Path, dest_root: Path, rel_path: Path, depth: int = 1,
+                  digest: Optional[str] = None) -> List[Path]:
     """
     Extract a multi-file archive.
 
-    - Normal archives: .zip, .tar, .tar.gz, etc.
-    - Hash-named image layers (no extension, hex name under sha256): treated
-      as tar streams via tarfile.open(..., "r:*") directly.
-    """
-    debug_print(f"[extract_multi] {src_file} (rel={rel_path})")
-    default_dir_rel = strip_multi_suffix(rel_path)
-    base_name = default_dir_rel.name
+    - Zip archives (jar, war, ...), recognized by their content
+    - Everything else, including hash-named image layers: read as tar
+      streams via tarfile.open(..., "r|*") in a single pass.
 
+    Returns the final paths of all files produced. If the file is not a
+    readable archive it is kept as a plain file, and that path is returned.
+    depth is how many archives deep the file is nested; BudgetExceeded is
+    raised, without leaving any output, if the archive goes over the
+    extraction budget. digest is the archive's SHA-256, if already taken.
+    """
+    archive_log.debug(f"[extract_multi] {src_file} (rel={rel_path})")
     archive_src = src_file  # works for normal archives and layer blobs
+    budget = extraction_budget.get_budget().archive(archive_src, depth)
+
+    # A binary jar with a sources jar next to it is extracted without its
+    # classes. It is not deduplicated: another copy may have no sources jar
+    sources_jar = sources_jar_for(src_file)
+    if sources_jar is not None:
+        archive_log.debug(f"[extract_multi] Classes covered by {sources_jar}, not extracted: {src_file}")
 
-    # ZIP?
-    if zipfile.is_zipfile(archive_src):
-        debug_print(f"[extract_multi] ZIP archive detected: {archive_src}")
+    # Byte-identical archives are extracted once; the others become aliases
+    if not Config.dedupe_archives or sources_jar is not None:
+        digest = None
+    else:
+        if digest is None:
+            digest = archive_dedupe.hash_archive(archive_src)
+        if not archive_dedupe.get_registry().claim(digest, rel_path):
+            archive_log.debug(f"[extract_multi] Duplicate of an earlier archive, not extracted: {src_file}")
+            return []
+
+    # ZIP? Only probed if the content was not recognized; a small tar ending
+    # in an uncompressed jar would look like a zip to is_zipfile()
+    fmt = file_magic.classify_file(archive_src)[1]
+    if fmt == file_magic.ZIP or (fmt is None and zipfile.is_zipfile(archive_src)):
+        archive_log.debug(f"[extract_multi] ZIP archive detected: {archive_src}")
         with zipfile.ZipFile(archive_src, "r") as zf:
             names = [i.filename for i in zf.infolist() if i.filename]
-            top_levels = set(
-                n.split("/", 1)[0].rstrip("/")
-                for n in names
-                if n and not n.startswith("__MACOSX")
-            )
-
-            target_dir_rel = default_dir_rel
-            if len(top_levels) == 1:
-                only = next(iter(top_levels))
-                if only == base_name:
-                    debug_print("[extract_multi] Flattening ZIP top-level dir")
-                    target_dir_rel = default_dir_rel.parent
+            top_levels = zip_top_levels(names)
+            target_dir_rel = archive_target_dir_rel(rel_path, top_levels)
 
             target_dir_candidate = dest_root / target_dir_rel
 
@@ -317,100 +540,229 @@ def extract_multi(src_file: Path, dest_root: Path, rel_path: Path) -> None:
                 extract_dir = target_dir_candidate
                 final_dir = target_dir_candidate
 
-            extract_dir.mkdir(parents=True, exist_ok=True)
-            safe_extract_zip(zf, extract_dir)
-            _finalize_extract_dir(extract_dir, final_dir)
-        return
-
-    # TAR (covers .tar, .tar.gz, and hash layer blobs)
+            # Locked on the unflattened directory, like tar and single-file extraction
+            with _target_lock(dest_root / strip_multi_suffix(rel_path)):
+                extract_dir.mkdir(parents=True, exist_ok=True)
+                filtered: List[FilteredMember] = []
+                try:
+                    written = safe_extract_zip(zf, extract_dir, budget, filtered, skip_classes=sources_jar is not None)
+                except BudgetExceeded:
+                    if extract_dir != final_dir:
+                        shutil.rmtree(extract_dir, ignore_errors=True)
+                    if digest is not None:
+                        archive_dedupe.get_registry().kept(digest, rel_path)
+                    raise
+                written = _finalize_extract_dir(extract_dir, final_dir, written)
+                _record_filtered(extract_dir, final_dir, filtered)
+            if digest is not None:
+                archive_dedupe.get_registry().extracted(digest, target_dir_rel, top_levels)
+        return written
+
+    # TAR (covers .tar, .tar.gz, and hash layer blobs), read as a stream in a
+    # single pass; the top-level flattening is decided while extracting
+    default_dir = dest_root / strip_multi_suffix(rel_path)
+    # In-place case (hash-layer blob, file path == dir path): extract to a
+    # temp dir, then replace the file
+    if src_file.resolve() == default_dir.resolve():
+        extract_dir = default_dir.with_name(default_dir.name + "_extracted")
+    else:
+        extract_dir = default_dir
     try:
-        debug_print(f"[extract_multi] Trying TAR: {archive_src}")
-        with tarfile.open(archive_src, mode="r:*") as tf:
-            names = [m.name for m in tf.getmembers() if m.name]
-            top_levels = set(
-                n.split("/", 1)[0].rstrip("/")
-                for n in names
-                if n and n not in (".", "/")
-            )
-
-            target_dir_rel = default_dir_rel
-            if len(top_levels) == 1:
-                only = next(iter(top_levels))
-                if only == base_name:
-                    debug_print("[extract_multi] Flattening TAR top-level dir")
-                    target_dir_rel = default_dir_rel.parent
-
-            target_dir_candidate = dest_root / target_dir_rel
-
-            if src_file.resolve() == target_dir_candidate.resolve():
-                # Hash-layer in-place: extract to temp dir, then replace the file.
-                extract_dir = target_dir_candidate.with_name(
-                    target_dir_candidate.name + "_extracted"
-                )
-                final_dir = target_dir_candidate
-            else:
-                extract_dir = target_dir_candidate
-                final_dir = target_dir_candidate
-
+        archive_log.debug(f"[extract_multi] Trying TAR: {archive_src}")
+        with tarfile.open(archive_src, mode="r|*") as tf, _target_lock(default_dir):
             extract_dir.mkdir(parents=True, exist_ok=True)
-            safe_extract_tar(tf, extract_dir)
-            _finalize_extract_dir(extract_dir, final_dir)
-        return
-
-    except (tarfile.ReadError, OSError, FileNotFoundError) as e:
-        extraction_logger.error(f"[extract_multi] Not a TAR or error reading {archive_src}: {e}")
-        debug_print(f"[extract_multi] Not a TAR or error reading {archive_src}: {e}")
+            filtered: List[FilteredMember] = []
+            try:
+                written, top_levels = safe_extract_tar(tf, extract_dir, hoist=default_dir.name, budget=budget,
+                                                       filtered=filtered)
+            except BudgetExceeded:
+                if extract_dir != default_dir:
+                    shutil.rmtree(extract_dir, ignore_errors=True)
+                if digest is not None:
+                    archive_dedupe.get_registry().kept(digest, rel_path)
+                raise
+            written = _finalize_extract_dir(extract_dir, default_dir, written)
+            _record_filtered(extract_dir, default_dir, filtered)
+        if digest is not None:
+            archive_dedupe.get_registry().extracted(digest, archive_target_dir_rel(rel_path, top_levels), top_levels)
+        return written
+
+    except _TAR_STREAM_ERRORS as e:
+        archive_log.error(f"[extract_multi] Not a TAR or error reading {archive_src}: {e}")
+        if extract_dir.is_dir() and not any(extract_dir.iterdir()):
+            extract_dir.rmdir()
 
     # Fallback: treat as plain file
+    if digest is not None:
+        archive_dedupe.get_registry().kept(digest, rel_path)
     dest_file = dest_root / rel_path
     if dest_file != src_file:
-        debug_print(f"[extract_multi] Fallback copy {src_file} -> {dest_file}")
+        archive_log.debug(f"[extract_multi] Fallback copy {src_file} -> {dest_file}")
         dest_file.parent.mkdir(parents=True, exist_ok=True)
         shutil.copy2(src_file, dest_file)
+    return [dest_file]
 
 
 # ---------- Copy / nested extraction pipeline ----------
 
-def copy_or_extract_file(src_file: Path, dest_root: Path, rel_path: Path) -> None:
+def copy_or_extract_file(src_file: Path, dest_root: Path, rel_path: Path, digest: Optional[str] = None) -> List[Path]:
     """
-    Handle a single file during the initial copy phase.
+    Handle a single file during the initial copy phase. digest is the file's
+    SHA-256, if already taken.
+
+    Returns the paths of the files produced under dest_root.
     """
     if not src_file.is_file():
-        return
+        return []
 
     kind = classify(src_file)
 
     if kind == "none":
         dest_file = dest_root / rel_path
-        debug_print(f"[copy_or_extract] Copy (none): {src_file} -> {dest_file}")
+        if member_filter.filter_member(rel_path.as_posix(), dest_file, src_file.stat().st_size,
+                                       lambda: open(src_file, "rb")):
+            copy_log.debug(f"[copy_or_extract] Filtered: {src_file}")
+            return []
+        copy_log.debug(f"[copy_or_extract] Copy (none): {src_file} -> {dest_file}")
+        dest_file.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(src_file, dest_file)
+        return [dest_file]
+
+    try:
+        if kind == "single":
+            dest_rel = rel_path.with_suffix("")  # drop only final extension
+            dest_file = dest_root / dest_rel
+            copy_log.debug(f"[copy_or_extract] Decompress (single): {src_file} -> {dest_file}")
+            return [decompress_single(src_file, dest_file)]
+
+        else:  # "multi"
+            copy_log.debug(f"[copy_or_extract] Extract (multi): {src_file}")
+            return extract_multi(src_file, dest_root, rel_path, digest=digest)
+
+    except BudgetExceeded as e:
+        return _skip_archive(src_file, dest_root / rel_path, e)
+
+
+def _skip_archive(src_file: Path, dest_file: Path, e: BudgetExceeded) -> List[Path]:
+    """
+    Keep an archive that went over the extraction budget at dest_file,
+    unextracted, and record the reason so it is reported instead of
+    scanned. Returns the (no) files produced.
+    """
+    archive_log.error(f"[extract] Not extracting {src_file}: {e}")
+    if dest_file != src_file:
         dest_file.parent.mkdir(parents=True, exist_ok=True)
         shutil.copy2(src_file, dest_file)
+    Config.file_data_manager.set_file_status(dest_file, extraction_budget.skip_status(e))
+    extraction_journal.note("status", dest_file, status=extraction_budget.skip_status(e))
+    return []
+
+
+def _split_produced(paths: List[Path], on_file: Optional[Callable[[Path], None]],
+                    kept: Optional[Path] = None) -> List[Tuple[Path, str]]:
+    """
+    Pass every produced file that needs no further extraction to on_file, so
+    it can be scanned while extraction carries on, and return the
+    (path, kind) of the archives/compressed files among them. 'kept' is an
+    archive that was not readable and was kept as a plain file.
+    """
+    archives: List[Tuple[Path, str]] = []
+    for path in paths:
+        if not path.is_file():
+            continue
+        kind = "none" if path == kept else classify(path)
+        if kind != "none":
+            archives.append((path, kind))
+        elif on_file is not None:
+            on_file(path)
+    return archives
 
-    elif kind == "single":
-        dest_rel = rel_path.with_suffix("")  # drop only final extension
-        dest_file = dest_root / dest_rel
-        debug_print(f"[copy_or_extract] Decompress (single): {src_file} -> {dest_file}")
-        decompress_single(src_file, dest_file)
 
-    else:  # "multi"
-        debug_print(f"[copy_or_extract] Extract (multi): {src_file}")
-        extract_multi(src_file, dest_root, rel_path)
+def extract_image(image: image_extractor.ImageLayout, dest_root: Path, rel_path: Path,
+                  on_file: Optional[Callable[[Path], None]] = None,
+                  produced: Optional[List[Path]] = None) -> List[Tuple[Path, str]]:
+    """
+    Write the final merged filesystem of a container image to
+    dest_root / strip_multi_suffix(rel_path) instead of extracting every
+    layer blob separately, and record the layer each file came from.
 
+    Returns the (path, kind) of the archives/compressed files in the image.
+    Every file written is also appended to 'produced', if given.
+    """
+    image_root = dest_root / strip_multi_suffix(rel_path)
+    image_log.debug(f"[extract_image] {image.source} -> {image_root}")
+    archives: List[Tuple[Path, str]] = []
+    try:
+        budget = extraction_budget.get_budget().archive(image.source, 1, image.size())
+        for dest_file, layer_ref in image_extractor.write_image_files(image, image_root, budget):
+            Config.file_data_manager.add_file_layer(dest_file, layer_ref)
+            extraction_journal.note("layer", dest_file, layer=layer_ref)
+            if produced is not None:
+                produced.append(dest_file)
+            archives.extend(_split_produced([dest_file], on_file))
+    except BudgetExceeded as e:
+        # The files already written are kept; the image is reported as not fully extracted
+        image_log.error(f"[extract_image] Stopped extracting {image.source}: {e}")
+        Config.file_data_manager.set_file_status(dest_root / rel_path, extraction_budget.skip_status(e))
+        extraction_journal.note("status", dest_root / rel_path, status=extraction_budget.skip_status(e))
+    return archives
+
+
+def _copy_source_file(src_file: Path, dest_root: Path, rel_path: Path,
+                      on_file: Optional[Callable[[Path], None]] = None) -> List[Tuple[Path, str]]:
+    """
+    Copy/extract one source file (see copy_or_extract_file), pass the finished
+    plain files to on_file and return the archives produced. With IMAGE_MODE,
+    container image tars are applied layer by layer instead.
 
-def copy_tree_with_extraction(src: Path, dest_root: Path) -> None:
+    With an extraction journal, an archive an earlier run already extracted
+    is not extracted again; the files it produced are used as they are.
+    """
+    journal = extraction_journal.get_journal()
+    digest = None
+    if journal is not None and src_file.is_file() and classify(src_file) != "none":
+        digest = archive_dedupe.hash_archive(src_file)
+        entry = journal.lookup(dest_root / rel_path, digest)
+        if entry is not None:
+            archive_log.debug(f"[extract] Already extracted by an earlier run: {src_file}")
+            return _split_produced(journal.replay(entry), on_file)
+
+    image = image_extractor.open_image(src_file) if Config.image_mode and src_file.is_file() else None
+    if image is not None:
+        try:
+            produced: List[Path] = []
+            with image:
+                archives = extract_image(image, dest_root, rel_path, on_file, produced)
+            if digest is not None:
+                journal.record(dest_root / rel_path, digest, produced)
+            return archives
+        except (KeyError, ValueError, OSError, tarfile.TarError) as e:
+            image_log.error(f"[extract_image] Could not apply the layers of {src_file}, extracting as a tar: {e}")
+
+    produced = copy_or_extract_file(src_file, dest_root, rel_path, digest)
+    if digest is not None:
+        journal.record(dest_root / rel_path, digest, produced)
+    return _split_produced(produced, on_file)
+
+
+def copy_tree_with_extraction(src: Path, dest_root: Path,
+                              on_file: Optional[Callable[[Path], None]] = None) -> List[Tuple[Path, str]]:
     """
     Copy a directory from src to dest_root, extracting archives/compressed files
-    encountered in src.
+    encountered in src. Finished plain files are passed to on_file.
+
+    Returns the (path, kind) of the nested archives/compressed files produced.
     """
     if not src.is_dir():
-        extraction_logger.error(f"Source {src} is not a directory")
+        copy_log.error(f"Source {src} is not a directory")
         raise ValueError(f"Source {src} is not a directory")
 
-    debug_print(f"[copy_tree_with_extraction] Walking {src}")
+    archives: List[Tuple[Path, str]] = []
+    copy_log.debug(f"[copy_tree_with_extraction] Walking {src}")
     for dirpath, dirnames, filenames in os.walk(src):
         dirpath = Path(dirpath)
         rel_dir = dirpath.relative_to(src)
-        debug_print(f"[copy_tree_with_extraction] Dir: {dirpath}, rel={rel_dir}")
+        copy_log.debug(f"[copy_tree_with_extraction] Dir: {dirpath}, rel={rel_dir}")
 
         for filename in filenames:
             src_file = dirpath / filename
@@ -420,112 +772,233 @@ def copy_tree_with_extraction(src: Path, dest_root: Path) -> None:
             else:
                 rel_path = rel_dir / filename
 
-            debug_print(f"[copy_tree_with_extraction] File: {src_file}, rel={rel_path}")
-            copy_or_extract_file(src_file, dest_root, rel_path)
+            copy_log.debug(f"[copy_tree_with_extraction] File: {src_file}, rel={rel_path}")
+            archives.extend(_copy_source_file(src_file, dest_root, rel_path, on_file))
 
+    return archives
 
-def extract_nested_archives(dest_root: Path) -> None:
-    """
-    Repeatedly scan dest_root for archive/compressed files and extract them
-    in-place until no more remain.
 
-    Each physical file path is processed at most once.
-    """
-    processed = set()  # resolved absolute paths we've already processed
-    pass_num = 0
+def _is_deduplicated(abs_path: Path, kind: str) -> bool:
+    """Whether extract_multi() deduplicates the archive at abs_path by its digest."""
+    return kind == "multi" and Config.dedupe_archives and sources_jar_for(abs_path) is None
 
-    while True:
-        pass_num += 1
-        debug_print(f"[extract_nested_archives] Pass {pass_num} starting")
-        changed = False
 
-        for dirpath, dirnames, filenames in os.walk(dest_root):
-            dirpath = Path(dirpath)
+def _nested_archive_digest(abs_path: Path, kind: str) -> Optional[str]:
+    """SHA-256 of a nested archive, if deduplication or the extraction journal needs it."""
+    if extraction_journal.get_journal() is None and not _is_deduplicated(abs_path, kind):
+        return None
+    return archive_dedupe.hash_archive(abs_path)
 
-            for filename in filenames:
-                abs_path = dirpath / filename
 
-                # Resolve to a canonical key; skip if we can't resolve
-                try:
-                    key = str(abs_path.resolve())
-                except FileNotFoundError:
-                    extraction_logger.error(f"Failed to resolve path to a canonical key for path: {abs_path}")
-                    continue
+def _extract_nested_archive(dest_root: Path, abs_path: Path, kind: str, depth: int,
+                            digest: Optional[str] = None) -> List[Path]:
+    """
+    Extraction task for one nested archive/compressed file: extract it in
+    place, remove it, and return the paths of the files produced. An archive
+    over the extraction budget is kept and reported instead. digest is the
+    archive's SHA-256, if already taken.
+
+    With an extraction journal, the archive is recorded once it is extracted
+    (before it is removed); one an earlier run already extracted is only
+    removed.
+    """
+    rel_path = abs_path.relative_to(dest_root)
+    nested_log.debug(f"[extract_nested_archives] {kind} -> {abs_path}")
+
+    journal = extraction_journal.get_journal()
+    if journal is not None and digest is None:
+        digest = archive_dedupe.hash_archive(abs_path)
+    entry = journal.lookup(abs_path, digest) if journal is not None else None
+    if entry is not None:
+        nested_log.debug(f"[extract_nested_archives] Already extracted by an earlier run: {abs_path}")
+        produced = journal.replay(entry)
+        keep = entry["keep"]
+    else:
+        keep = False
+        try:
+            if kind == "single":
+                dest_rel = rel_path.with_suffix("")
+                dest_file = dest_root / dest_rel
+                produced = [decompress_single(abs_path, dest_file, depth)]
+            else:  # "multi"
+                produced = extract_multi(abs_path, dest_root, rel_path, depth, digest)
+        except BudgetExceeded as e:
+            produced = _skip_archive(abs_path, abs_path, e)
+            keep = True
+        if journal is not None:
+            journal.record(abs_path, digest, produced, keep or abs_path in produced)
+
+    # A file that is not a readable archive is kept as a plain file
+    if abs_path not in produced:
+        file_magic.forget(abs_path)
+    if not keep and abs_path.exists() and abs_path.is_file() and abs_path not in produced:
+        try:
+            nested_log.debug(f"[extract_nested_archives] unlink {abs_path}")
+            abs_path.unlink()
+        except PermissionError as e:
+            nested_log.error(f"[extract_nested_archives] unlink failed: {e}")
 
-                # Don't process same file path more than once across passes
-                if key in processed:
-                    continue
+    return produced
 
-                processed.add(key)
 
-                if not abs_path.is_file():
-                    continue
+def _find_archives(dest_root: Path) -> List[Tuple[Path, str]]:
+    """Walk dest_root once and return the (path, kind) of every archive/compressed file."""
+    archives: List[Tuple[Path, str]] = []
+    for dirpath, dirnames, filenames in os.walk(dest_root):
+        for filename in filenames:
+            abs_path = Path(dirpath, filename)
+            kind = classify(abs_path)
+            if kind != "none":
+                archives.append((abs_path, kind))
+    return archives
 
-                kind = classify(abs_path)
-                if kind == "none":
-                    continue
 
-                rel_path = abs_path.relative_to(dest_root)
-                debug_print(f"[extract_nested_archives] {kind} -> {abs_path}")
-
-                if kind == "single":
-                    dest_rel = rel_path.with_suffix("")
-                    dest_file = dest_root / dest_rel
-                    decompress_single(abs_path, dest_file)
-                    if abs_path.exists() and abs_path.is_file():
-                        try:
-                            debug_print(f"[extract_nested_archives] unlink {abs_path}")
-                            abs_path.unlink()
-                        except PermissionError as e:
-                            extraction_logger.error(f"[extract_nested_archives] unlink failed: {e}")
-                            debug_print(f"[extract_nested_archives] unlink failed: {e}")
-                    changed = True
-
-                else:  # "multi"
-                    extract_multi(abs_path, dest_root, rel_path)
-                    if abs_path.exists() and abs_path.is_file():
-                        try:
-                            debug_print(f"[extract_nested_archives] unlink {abs_path}")
-                            abs_path.unlink()
-                        except PermissionError as e:
-                            extraction_logger.error(f"[extract_nested_archives] unlink failed: {e}")
-                            debug_print(f"[extract_nested_archives] unlink failed: {e}")
-                    changed = True
-
-        debug_print(f"[extract_nested_archives] Pass {pass_num} changed={changed}")
-        if not changed:
-            break
+def extract_nested_archives(dest_root: Path, on_file: Optional[Callable[[Path], None]] = None,
+                            workers: Optional[int] = None,
+                            archives: Optional[List[Tuple[Path, str]]] = None, depth: int = 1) -> None:
+    """
+    Extract the archives/compressed files under dest_root in-place, including
+    the archives those produce, until no more remain. Finished plain files
+    produced by each extraction are passed to on_file.
+
+    'archives' seeds the work queue with (path, kind) pairs, as returned by
+    the copy phase, which are nested depth archives deep. When it is None,
+    dest_root is walked once to find them.
+    After that only the files each extraction produced are looked at, so the
+    tree is never walked again.
+
+    Each archive is a task on a pool of EXTRACTION_WORKERS threads, so
+    independent archives (image layers, the jars inside them) are extracted
+    concurrently. The archives are extracted one nesting level at a time:
+    the archives found in a level's output make up the next level. Before a
+    level is extracted, its archives are hashed and reserved for
+    deduplication in path order, so of byte-identical archives the same
+    copy is extracted in every run, whatever the thread timing. Each archive
+    path is processed at most once.
+    """
+    workers = Config.extraction_workers if workers is None else workers
+    dest_root = dest_root.resolve()
+    if archives is None:
+        # Collected before anything is submitted, so the walk never sees the
+        # output of a running task
+        archives = _find_archives(dest_root)
+    _note_sources_jars(path for path, _ in archives)
+    scheduled: Set[Path] = set()
+    # Running/queued task -> the archive it extracts
+    pending: Dict[Future, Path] = {}
+    progress = ProgressLog(nested_log, "nested archives extracted")
+    registry = archive_dedupe.get_registry()
+
+    with ThreadPoolExecutor(max_workers=workers or None, thread_name_prefix="extract") as executor:
+        level = archives
+        try:
+            while level:
+                level = sorted({path: (path, kind) for path, kind in level if path not in scheduled}.values())
+                scheduled.update(path for path, _ in level)
+                digests = list(executor.map(_nested_archive_digest, *zip(*level)))
+                for (abs_path, kind), digest in zip(level, digests):
+                    if _is_deduplicated(abs_path, kind):
+                        registry.reserve(digest, abs_path.relative_to(dest_root))
+
+                for (abs_path, kind), digest in zip(level, digests):
+                    future = executor.submit(_extract_nested_archive, dest_root, abs_path, kind, depth, digest)
+                    pending[future] = abs_path
+
+                level = []
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        archive_path = pending.pop(future)
+                        produced = future.result()
+                        progress.add()
+
+                        # Files from an archive taken from an image layer belong to that layer
+                        Config.file_data_manager.inherit_file_layer(archive_path, produced)
+                        extraction_journal.note_layers(produced)
+                        nested = _split_produced(produced, on_file, kept=archive_path)
+                        _note_sources_jars(path for path, _ in nested)
+                        level.extend(nested)
+                depth += 1
+        except BaseException:
+            # A failed task, or on_file giving up: the queued tasks are not started
+            for other in pending:
+                other.cancel()
+            raise
+    progress.done()
 
 
 # ---------- CLI ----------
-def main(source_dir, dest_dir) -> None:
-
-    if source_dir.is_dir():
-        # Normal directory: copy + first-level extraction, then nested extraction
-        copy_tree_with_extraction(source_dir, dest_dir)
-        rel_path = Path(source_dir.name)
-        target_dir_rel = strip_multi_suffix(rel_path)
-        target_dir = dest_dir / target_dir_rel
-        # Second phase: extract all nested archives/compressed files in-place
-        extract_nested_archives(dest_dir)
-
-    elif source_dir.is_file():
-        # Top-level is a single file (could be archive/compressed/normal):
-        # Treat it as if it were a file inside a virtual root and process it,
-        # then run nested extraction on whatever it produced.
-        rel_path = Path(source_dir.name)
-        copy_or_extract_file(source_dir, dest_dir, rel_path)
-        target_dir_rel = strip_multi_suffix(rel_path)
-        target_dir = dest_dir / target_dir_rel
-        # Second phase: extract all nested archives/compressed files in-place
-        extract_nested_archives(dest_dir)
+def main(source_dir, dest_dir, on_file: Optional[Callable[[Path], None]] = None) -> None:
+    """
+    Copy/extract source_dir into dest_dir, including all nested archives.
 
-    else:
-        extraction_logger.error(f"Source path {source_dir} is neither a file nor a directory")
-        raise ValueError(f"Source path {source_dir} is neither a file nor a directory")
+    If on_file is given, it is called with every finished plain file as soon
+    as it has been written, so scanning can overlap with extraction.
 
-    # Second phase: extract all nested archives/compressed files in-place
-    # extract_nested_archives(dest_dir)
+    With EXTRACTION_JOURNAL, running it again after a run into the same
+    dest_dir died resumes that run: archives it finished are not extracted
+    again (see extraction_journal).
+    """
+    # Produced paths are compared with and made relative to dest_dir
+    dest_dir = dest_dir.resolve()
+    archive_registry = archive_dedupe.reset_registry()
+    extraction_budget.reset_budget()
+    member_filter.reset_filter()
+    file_magic.clear_cache()
+    with _sources_jars_guard:
+        _sources_jars.clear()
+
+    progress = ProgressLog(copy_log, "files extracted")
+
+    def emit(path: Path) -> None:
+        progress.add()
+        if on_file is not None:
+            on_file(path)
+
+    extraction_journal.open_journal(dest_dir)
+    try:
+        image = image_extractor.open_image(source_dir) if Config.image_mode and source_dir.is_dir() else None
+
+        if image is not None:
+            # OCI image layout directory: merged filesystem, then nested extraction
+            with image:
+                archives = extract_image(image, dest_dir, Path(source_dir.name), emit)
+            extract_nested_archives(dest_dir, emit, archives=archives, depth=2)
+
+        elif source_dir.is_dir():
+            # Normal directory: copy + first-level extraction, then nested extraction
+            archives = copy_tree_with_extraction(source_dir, dest_dir, emit)
+            rel_path = Path(source_dir.name)
+            target_dir_rel = strip_multi_suffix(rel_path)
+            target_dir = dest_dir / target_dir_rel
+            # Second phase: extract all nested archives/compressed files in-place
+            extract_nested_archives(dest_dir, emit, archives=archives, depth=2)
+
+        elif source_dir.is_file():
+            # Top-level is a single file (could be archive/compressed/normal):
+            # Treat it as if it were a file inside a virtual root and process it,
+            # then run nested extraction on whatever it produced.
+            rel_path = Path(source_dir.name)
+            archives = _copy_source_file(source_dir, dest_dir, rel_path, emit)
+            target_dir_rel = strip_multi_suffix(rel_path)
+            target_dir = dest_dir / target_dir_rel
+            # Second phase: extract all nested archives/compressed files in-place
+            extract_nested_archives(dest_dir, emit, archives=archives, depth=2)
+
+        else:
+            copy_log.error(f"Source path {source_dir} is neither a file nor a directory")
+            raise ValueError(f"Source path {source_dir} is neither a file nor a directory")
+
+        # Second phase: extract all nested archives/compressed files in-place
+        # extract_nested_archives(dest_dir)
+
+        if Config.dedupe_archives:
+            archive_registry.resolve()
+            archive_registry.register_aliases(dest_dir)
+            archive_registry.write_manifest(dest_dir)
+        progress.done()
+    finally:
+        extraction_journal.close_journal()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import lzma
+import os
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Bytes read from the start of a file to sniff its format. A tar header is
+# 512 bytes; the rest lets a compressed tar's first header be decompressed.
+HEADER_SIZE = 4096
+
+ZIP = "zip"
+TAR = "tar"
+GZIP = "gzip"
+BZIP2 = "bzip2"
+XZ = "xz"
+LZMA = "lzma"
+ZSTD = "zstd"
+CPIO = "cpio"
+AR = "ar"
+
+# (offset, magic bytes, format), checked in order
+_MAGIC = (
+    (257, b"ustar", TAR),  # POSIX and GNU tar
+    (0, b"PK\x03\x04", ZIP),
+    (0, b"PK\x05\x06", ZIP),  # empty zip
+    (0, b"PK\x07\x08", ZIP),  # spanned zip
+    (0, b"\x1f\x8b", GZIP),
+    (0, b"BZh", BZIP2),
+    (0, b"\xfd7zXZ\x00", XZ),
+    (0, b"\x28\xb5\x2f\xfd", ZSTD),
+    (0, b"070701", CPIO),  # new ASCII
+    (0, b"070702", CPIO),  # new ASCII with CRC
+    (0, b"070707", CPIO),  # old ASCII
+    (0, b"\xc7\x71", CPIO),  # old binary, little-endian
+    (0, b"\x71\xc7", CPIO),  # old binary, big-endian
+    (0, b"!<arch>\n", AR),
+)
+
+COMPRESSED_FORMATS = (GZIP, BZIP2, XZ, LZMA)
+
+# Suffixes decompress_single() strips to name the decompressed file
+SINGLE_SUFFIXES = {".gz", ".bz2", ".xz", ".lzma"}
+
+# Used when the content alone does not tell whether a compressed file holds a tar
+COMPRESSED_TAR_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tbz", ".tar.xz", ".txz", ".tar.lzma")
+
+# Archives that may carry data before their first entry (e.g. executable jars
+# with a launcher script), so they have no magic at offset 0
+ZIP_SUFFIXES = {".zip", ".jar", ".war", ".ear"}
+
+# Classification: ("multi" | "single" | "none", format or None if not recognized)
+Classification = Tuple[str, Optional[str]]
+
+# path -> ((mtime_ns, size) when classified, classification)
+_cache: Dict[Path, Tuple[Tuple[int, int], Classification]] = {}
+
+
+def sniff(header: bytes) -> Optional[str]:
+    """Format of a file from its first bytes, or None if not recognized."""
+    for offset, magic, fmt in _MAGIC:
+        if header[offset:offset + len(magic)] == magic:
+            return fmt
+    return None
+
+
+def _inner_is_tar(fmt: str, header: bytes) -> Optional[bool]:
+    """
+    Whether the compressed data starting with header holds a tar, decided
+    from its first decompressed tar header. None if that cannot be told from
+    header alone (bzip2 only emits whole 100-900 KB blocks).
+    """
+    if fmt == GZIP:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif fmt == XZ:
+        decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+    elif fmt == LZMA:
+        decompressor = lzma.LZMADecompressor(format=lzma.FORMAT_ALONE)
+    else:
+        return None
+
+    try:
+        data = decompressor.decompress(header)
+    except (zlib.error, lzma.LZMAError, EOFError):
+        return None
+    if len(data) < 262:
+        return None if len(data) == 0 else False
+    return data[257:262] == b"ustar"
+
+
+def classify_header(header: bytes, name: str) -> Classification:
+    """
+    Classify a file from its first HEADER_SIZE bytes; the name is only used
+    where the content is not conclusive.
+    - "multi"   -> multi-file archive (zip, tar, compressed tar)
+    - "single"  -> single-file compression
+    - "none"    -> normal file, or a format there is no extractor for
+    """
+    lower = name.lower()
+    suffix = os.path.splitext(lower)[1]
+    fmt = sniff(header)
+
+    # Legacy .lzma streams have no magic; most start with the 0x5D properties byte
+    if fmt is None and suffix == ".lzma" and header[:1] == b"\x5d":
+        fmt = LZMA
+
+    if fmt in (TAR, ZIP):
+        return "multi", fmt
+
+    if fmt in COMPRESSED_FORMATS:
+        inner_is_tar = _inner_is_tar(fmt, header)
+        if inner_is_tar is None:
+            inner_is_tar = lower.endswith(COMPRESSED_TAR_SUFFIXES)
+        if inner_is_tar:
+            return "multi", fmt
+        # Other compressed files are only decompressed if their name says so
+        # (e.g. .svgz stays as it is)
+        return ("single" if suffix in SINGLE_SUFFIXES else "none"), fmt
+
+    if fmt is None and (suffix == ".tar" or suffix in ZIP_SUFFIXES):
+        # Pre-POSIX tar, or a zip with leading data: left to the archive readers
+        return "multi", None
+
+    # Not an archive, or zstd/cpio/ar, which have no extractor here
+    return "none", fmt
+
+
+def classify_file(path: Path) -> Classification:
+    """
+    Classify the file at path by its content. The result is cached per path
+    and only recomputed if the file's size or modification time changed, so
+    each file is opened for this at most once.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "none", None
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+    except OSError:
+        return "none", None
+    classification = classify_header(header, path.name)
+    if classification == ("multi", None) and path.suffix.lower() in ZIP_SUFFIXES:
+        # Settle zips with leading data now, so the extractor need not probe again
+        classification = ("multi", ZIP) if zipfile.is_zipfile(path) else ("none", None)
+    _cache[path] = (key, classification)
+    return classification
+
+
+def forget(path: Path) -> None:
+    """Drop the cached classification of a file that was removed or replaced."""
+    _cache.pop(path, None)
+
+
+def clear_cache() -> None:
+    _cache.clear()
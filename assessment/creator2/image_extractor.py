@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+import json
+import os
+import shutil
+import tarfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Set, Tuple
+from assessment.creator2 import file_magic, member_filter
+from assessment.creator2.extraction_budget import ArchiveBudget, BudgetExceeded
+from loggers.extraction_logger import stage_logger
+
+image_log = stage_logger("image")
+
+# OCI / Docker layer whiteouts: ".wh.<name>" deletes <name> from the layers
+# below, ".wh..wh..opq" hides everything the layers below have in its directory
+WHITEOUT_PREFIX = ".wh."
+OPAQUE_WHITEOUT = ".wh..wh..opq"
+
+_INDEX_MEDIA_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+)
+
+# (path in the merged filesystem, layer reference, member, member content)
+ImageFile = Tuple[str, str, tarfile.TarInfo, BinaryIO]
+
+
+def _normalize(name: str) -> str:
+    """Layer/archive member name as a relative posix path without './' or trailing '/'."""
+    while name.startswith("./"):
+        name = name[2:]
+    return name.strip("/")
+
+
+class ImageLayout:
+    """
+    Read access to a container image: a 'docker save' / OCI archive tar, or
+    an OCI image layout directory.
+    """
+
+    def __init__(self, source: Path):
+        self.source = source
+        self._tar: Optional[tarfile.TarFile] = None
+        self._members = {}
+        if source.is_file():
+            self._tar = tarfile.open(source, mode="r:")
+            self._members = {_normalize(m.name): m for m in self._tar.getmembers() if m.isreg()}
+
+    def __enter__(self) -> "ImageLayout":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+
+    def exists(self, name: str) -> bool:
+        if self._tar is not None:
+            return _normalize(name) in self._members
+        return Path(self.source, name).is_file()
+
+    def open(self, name: str) -> BinaryIO:
+        if self._tar is not None:
+            return self._tar.extractfile(self._members[_normalize(name)])
+        return open(Path(self.source, name), "rb")
+
+    def size(self) -> int:
+        """Size of the image on disk."""
+        if self._tar is not None:
+            return os.path.getsize(self.source)
+        return sum(path.stat().st_size for path in self.source.rglob("*") if path.is_file())
+
+    def read_json(self, name: str):
+        with self.open(name) as f:
+            return json.load(f)
+
+
+def open_image(source: Path) -> Optional[ImageLayout]:
+    """
+    Return an ImageLayout if source is a container image (an uncompressed
+    tar or a directory holding manifest.json or index.json), otherwise None.
+    """
+    if source.is_file() and file_magic.classify_file(source)[1] != file_magic.TAR:
+        return None
+    if not source.is_file() and not source.is_dir():
+        return None
+
+    try:
+        layout = ImageLayout(source)
+    except (tarfile.TarError, OSError) as e:
+        image_log.error(f"[image_extractor] Could not read {source}: {e}")
+        return None
+
+    if layout.exists("manifest.json") or (layout.exists("index.json") and layout.exists("oci-layout")):
+        return layout
+    layout.close()
+    return None
+
+
+def _blob_name(digest: str) -> str:
+    algorithm, _, hex_digest = digest.partition(":")
+    return f"blobs/{algorithm}/{hex_digest}"
+
+
+def layer_refs(layout: ImageLayout) -> List[str]:
+    """
+    Return the layer blob names of the image, bottom layer first. Only the
+    first image is used when an archive holds several.
+    """
+    if layout.exists("manifest.json"):
+        images = layout.read_json("manifest.json")
+        if len(images) > 1:
+            image_log.info(f"[image_extractor] {layout.source} holds {len(images)} images, using the first")
+        return list(images[0]["Layers"])
+
+    # OCI layout: index.json -> (nested indexes) -> image manifest -> layers
+    manifest = layout.read_json("index.json")
+    while "layers" not in manifest:
+        descriptors = manifest.get("manifests") or []
+        if not descriptors:
+            raise ValueError(f"No image manifest found in {layout.source}")
+        manifest = layout.read_json(_blob_name(descriptors[0]["digest"]))
+        if manifest.get("mediaType") not in _INDEX_MEDIA_TYPES and "layers" not in manifest:
+            raise ValueError(f"Unsupported image manifest in {layout.source}")
+    return [_blob_name(layer["digest"]) for layer in manifest["layers"]]
+
+
+def _is_hidden(path: str, hidden: Set[str], opaque: Set[str]) -> bool:
+    """True if an upper layer replaced or deleted path or one of its parent directories."""
+    if path in hidden:
+        return True
+    parent = path
+    while parent:
+        parent = parent.rpartition("/")[0]
+        if parent in opaque or (parent and parent in hidden):
+            return True
+    return False
+
+
+def iter_image_files(layout: ImageLayout) -> Iterator[ImageFile]:
+    """
+    Yield every regular file of the image's final merged filesystem.
+
+    Layers are read top-down, so each path is decided by the uppermost layer
+    that has it. That layer's whiteouts, opaque directories and
+    non-directory entries hide the path (and everything under it) in all
+    lower layers. Files that are overwritten or deleted further up are
+    therefore never read out of their layer. Each layer is read once, as a
+    stream.
+    """
+    # Paths decided by an upper layer, and directories made opaque by one
+    hidden: Set[str] = set()
+    opaque: Set[str] = set()
+
+    for layer_ref in reversed(layer_refs(layout)):
+        layer_hidden: Set[str] = set()
+        layer_opaque: Set[str] = set()
+
+        with layout.open(layer_ref) as blob, tarfile.open(fileobj=blob, mode="r|*") as layer:
+            for member in layer:
+                path = _normalize(member.name)
+                if not path:
+                    continue
+                parent, _, base = path.rpartition("/")
+
+                # Whiteouts only apply to the layers below this one
+                if base == OPAQUE_WHITEOUT:
+                    layer_opaque.add(parent)
+                    continue
+                if base.startswith(WHITEOUT_PREFIX):
+                    layer_hidden.add(f"{parent}/{base[len(WHITEOUT_PREFIX):]}".lstrip("/"))
+                    continue
+
+                if member.isdir() or path in layer_hidden or _is_hidden(path, hidden, opaque):
+                    continue
+                layer_hidden.add(path)
+
+                if not member.isreg():
+                    # Symlinks, hard links, devices: hide lower layers but are not extracted
+                    image_log.debug(f"[image_extractor] Skipping special member: {path}")
+                    continue
+
+                member_file = layer.extractfile(member)
+                if member_file is not None:
+                    yield path, layer_ref, member, member_file
+
+        hidden |= layer_hidden
+        opaque |= layer_opaque
+
+
+def write_image_files(layout: ImageLayout, image_root: Path,
+                      budget: Optional[ArchiveBudget] = None) -> Iterator[Tuple[Path, str]]:
+    """
+    Write the image's final merged filesystem under image_root and yield
+    (written path, layer reference) for every file, as soon as it is written.
+    Files the member filter rejects are recorded instead of written. Raises
+    BudgetExceeded once the files written go over 'budget'.
+    """
+    image_root = image_root.resolve()
+    image_root.mkdir(parents=True, exist_ok=True)
+
+    for path, layer_ref, member, member_file in iter_image_files(layout):
+        if budget is not None:
+            budget.add_member()
+
+        # On Windows, skip names with invalid characters (like ":" in man pages)
+        if os.name == "nt" and any(ch in path for ch in '<>:"|?*'):
+            image_log.debug(f"[image_extractor] Skipping invalid Windows name: {path}")
+            continue
+
+        # Path traversal protection
+        dest_file = (image_root / path).resolve()
+        if not str(dest_file).startswith(str(image_root)):
+            image_log.exception(f"Unsafe path in image layer (path traversal attempt) for path: {dest_file}")
+            raise Exception("Unsafe path in image layer (path traversal attempt)")
+
+        if member_filter.filter_member(path, dest_file, member.size, lambda: member_file):
+            continue
+
+        try:
+            dest_file.parent.mkdir(parents=True, exist_ok=True)
+            with member_file, open(dest_file, "wb") as f_out:
+                if budget is None:
+                    shutil.copyfileobj(member_file, f_out)
+                else:
+                    budget.copy(member_file, f_out)
+        except BudgetExceeded:
+            dest_file.unlink(missing_ok=True)
+            raise
+        except (OSError, ValueError) as e:
+            image_log.error(f"[image_extractor] Failed writing {dest_file}: {e}")
+            continue
+
+        try:
+            os.chmod(dest_file, member.mode & 0o777)
+        except PermissionError:
+            image_log.error(f"[image_extractor] chmod failed for {dest_file}")
+
+        yield dest_file, layer_ref
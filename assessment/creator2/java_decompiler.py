@@ -1,14 +1,35 @@
+import os
+import shutil
 import subprocess
-from pathlib import Path
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional
+from assessment.creator2.decompile_cache import DEFAULT_MAX_BYTES, DecompileCache, hash_class, open_cache
 
+# Loose .class files passed to one CFR process
+BATCH_SIZE = 500
+# Characters of class paths on one CFR command line; Windows allows 32767
+# for the whole command line, which also holds java, the CFR jar and the
+# output directory
+MAX_BATCH_CHARS = 24000
 
-def decompile_class_file(class_file: Path, cfr_jar: Path) -> Path:
+
+def decompile_class_file(class_file: Path, cfr_jar: Path, cache: Optional[DecompileCache] = None) -> Path:
     """
     Decompile a single .class file using CFR into the same directory.
     Returns the expected .java file path (whether or not CFR succeeded).
+    With a cache, a class decompiled before is taken from it instead.
     """
     class_file = class_file.resolve()
     output_dir = class_file.parent.resolve()
+    java_file = class_file.with_suffix(".java")
+
+    digest = hash_class(class_file, cfr_jar) if cache is not None else None
+    if digest is not None and cache.get(digest, java_file):
+        print(f"[CACHED] {class_file}")
+        return java_file
 
     result = subprocess.run(
         [
@@ -28,18 +49,196 @@ def decompile_class_file(class_file: Path, cfr_jar: Path) -> Path:
         print(result.stderr)
     else:
         print(f"[OK] Decompiled {class_file}")
+        if digest is not None and java_file.is_file():
+            cache.put(digest, java_file)
+
+    return java_file
+
+
+def _cfr_command(cfr_jar: Path, targets: List[Path], output_dir: Path) -> List[str]:
+    return ["java", "-jar", str(cfr_jar), *(str(target) for target in targets), "--outputdir", str(output_dir)]
+
+
+def _find_output(java_parts: tuple, outputs: Dict[PurePosixPath, Path]) -> Optional[Path]:
+    """
+    The decompiled file for a class whose path, with .java for .class, has
+    java_parts. CFR writes it under its package path, which is some tail of
+    the class's own path: the longest tail that was written is taken.
+    """
+    for i in range(len(java_parts)):
+        java_file = outputs.get(PurePosixPath(*java_parts[i:]))
+        if java_file is not None:
+            return java_file
+    return None
+
+
+def _collect_outputs(output_dir: Path) -> Dict[PurePosixPath, Path]:
+    return {PurePosixPath(path.relative_to(output_dir).as_posix()): path for path in output_dir.rglob("*.java")}
+
+
+def _batch_classes(class_files: List[Path], batch_size: int, max_chars: int = MAX_BATCH_CHARS) -> List[List[Path]]:
+    """
+    Split class_files into batches of at most batch_size, whose paths take
+    at most max_chars on the command line. Two classes with the same file
+    name never share a batch: they could be the same class name in the
+    same package, and CFR would write both to one .java file.
+    """
+    batches: List[List[Path]] = []
+    batch: List[Path] = []
+    names = set()
+    chars = 0
+    for class_file in class_files:
+        # The path and the space before it
+        length = len(str(class_file)) + 1
+        if batch and (len(batch) >= batch_size or class_file.name in names or chars + length > max_chars):
+            batches.append(batch)
+            batch, names, chars = [], set(), 0
+        batch.append(class_file)
+        names.add(class_file.name)
+        chars += length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def decompile_class_batch(class_files: List[Path], root: Path, cfr_jar: Path) -> Dict[Path, Optional[Path]]:
+    """
+    Decompile class_files, all under root, with a single CFR process. Each
+    .java file is moved next to its .class file, as decompile_class_file()
+    places it. Returns, for every class, its .java file or None if CFR did
+    not produce one.
+    """
+    with tempfile.TemporaryDirectory(dir=root, prefix=".cfr_") as tmp_dir:
+        output_dir = Path(tmp_dir)
+        result = subprocess.run(_cfr_command(cfr_jar, class_files, output_dir), capture_output=True, text=True)
+        outputs = _collect_outputs(output_dir)
+
+        results: Dict[Path, Optional[Path]] = {}
+        for class_file in class_files:
+            java_parts = class_file.with_suffix(".java").relative_to(root).parts
+            java_file = _find_output(java_parts, outputs)
+            if java_file is not None:
+                java_file = Path(shutil.move(str(java_file), class_file.with_suffix(".java")))
+            results[class_file] = java_file
+
+    failed = sum(java_file is None for java_file in results.values())
+    if failed:
+        print(f"[ERROR] Failed to decompile {failed} of {len(class_files)} classes in batch from {class_files[0].parent}")
+        if result.returncode != 0:
+            print(result.stderr)
+    else:
+        print(f"[OK] Decompiled {len(class_files)} classes in batch from {class_files[0].parent}")
+    return results
+
+
+def decompile_jar(jar: Path, cfr_jar: Path, output_dir: Optional[Path] = None) -> Dict[Path, Optional[Path]]:
+    """
+    Decompile every class in jar with a single CFR process, into output_dir
+    (<jar name without .jar>-decompiled next to it by default). Returns, for
+    every outer class (keyed jar/entry), its .java file or None.
+    """
+    jar = jar.resolve()
+    output_dir = jar.with_name(f"{jar.stem}-decompiled") if output_dir is None else output_dir
+    with zipfile.ZipFile(jar) as zf:
+        entries = [name for name in zf.namelist() if name.endswith(".class") and "$" not in PurePosixPath(name).stem]
+
+    result = subprocess.run(_cfr_command(cfr_jar, [jar], output_dir), capture_output=True, text=True)
+    outputs = _collect_outputs(output_dir) if output_dir.is_dir() else {}
+
+    results: Dict[Path, Optional[Path]] = {}
+    for entry in entries:
+        java_parts = PurePosixPath(entry).with_suffix(".java").parts
+        # Classes in a jar may sit under a prefix such as BOOT-INF/classes/
+        results[jar / entry] = _find_output(java_parts, outputs)
+
+    failed = sum(java_file is None for java_file in results.values())
+    if failed:
+        print(f"[ERROR] Failed to decompile {failed} of {len(entries)} classes in {jar}")
+        if result.returncode != 0:
+            print(result.stderr)
+    else:
+        print(f"[OK] Decompiled {len(entries)} classes in {jar}")
+    return results
 
-    return class_file.with_suffix(".java")
+
+def decompile_batches(
+    root: Path,
+    cfr_jar: Path,
+    workers: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+    jars: bool = False,
+    cache: Optional[DecompileCache] = None,
+) -> Dict[Path, Optional[Path]]:
+    """
+    Decompile the .class files under root in batches, one CFR process per
+    batch instead of one per class, running up to 'workers' batches at a
+    time (one per CPU by default). With jars, every .jar under root is
+    decompiled as one batch as well (see decompile_jar()).
+
+    With a cache, classes decompiled before are taken from it and only the
+    others are batched; what CFR generates for those is added to it.
+
+    Returns, for every class, its .java file or None if it failed.
+    """
+    class_files: List[Path] = []
+    jar_files: List[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = Path(dirpath, filename)
+            # Inner/anonymous classes like MyClass$1.class are decompiled with their outer class
+            if path.suffix == ".class" and "$" not in path.stem:
+                class_files.append(path)
+            elif jars and path.suffix == ".jar":
+                jar_files.append(path)
+
+    results: Dict[Path, Optional[Path]] = {}
+    digests: Dict[Path, str] = {}
+    if cache is not None:
+        missed = []
+        for class_file in class_files:
+            digests[class_file] = hash_class(class_file, cfr_jar)
+            java_file = class_file.with_suffix(".java")
+            if cache.get(digests[class_file], java_file):
+                results[class_file] = java_file
+            else:
+                missed.append(class_file)
+        print(f"[CACHED] {len(results)} of {len(class_files)} classes")
+        class_files = missed
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count(), thread_name_prefix="cfr") as executor:
+        futures = [executor.submit(decompile_class_batch, batch, root, cfr_jar)
+                   for batch in _batch_classes(class_files, batch_size)]
+        futures.extend(executor.submit(decompile_jar, jar, cfr_jar) for jar in jar_files)
+        for future in futures:
+            batch_results = future.result()
+            results.update(batch_results)
+            for class_file, java_file in batch_results.items():
+                if java_file is not None and class_file in digests:
+                    cache.put(digests[class_file], java_file)
+    return results
 
 
 def decompile_all_classes(
     root_dir: str,
     cfr_jar_path: str,
     delete_class_files: bool = False,
-) -> None:
+    batch: bool = False,
+    workers: Optional[int] = None,
+    jars: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+) -> Optional[Dict[Path, Optional[Path]]]:
     """
     Walk root_dir, look at every file, and only decompile those that are .class files.
     Optionally delete the .class file after successful decompile.
+
+    With batch, classes are decompiled by decompile_batches(), many per
+    CFR process and several processes at a time, and the result of every
+    class is returned. With jars as well, every .jar under root_dir is
+    decompiled whole, next to it (see decompile_jar()).
+
+    With cache_dir, generated sources are kept there, up to cache_max_bytes,
+    and classes decompiled before (in any run) are taken from it.
     """
     root = Path(root_dir).resolve()
     cfr_jar = Path(cfr_jar_path).resolve()
@@ -49,6 +248,21 @@ def decompile_all_classes(
 
     print(f"Root directory: {root}")
     print(f"Using CFR jar:  {cfr_jar}")
+    cache = open_cache(cache_dir, cache_max_bytes)
+
+    if batch:
+        results = decompile_batches(root, cfr_jar, workers, jars=jars, cache=cache)
+        if delete_class_files:
+            for path, java_file in results.items():
+                # Classes in a jar (keyed jar/entry) are not files of their own
+                if java_file is None or not path.is_file():
+                    continue
+                try:
+                    path.unlink()
+                    print(f"[DEL] Deleted original .class: {path}")
+                except Exception as e:
+                    print(f"[WARN] Could not delete {path}: {e}")
+        return results
 
     # Walk every file and selectively handle .class files
     for path in root.rglob("*"):
@@ -65,7 +279,7 @@ def decompile_all_classes(
             print(f"[SKIP] Inner/anonymous class: {path}")
             continue
 
-        java_file = decompile_class_file(path, cfr_jar)
+        java_file = decompile_class_file(path, cfr_jar, cache)
 
         if delete_class_files and java_file.is_file():
             try:
@@ -80,5 +294,9 @@ if __name__ == "__main__":
     ROOT_DIR = r"C:\Users\mattw\PycharmProjects\SLA\test\input\dot_class_files"
     CFR_JAR = r"C:\Users\mattw\Tools\cfr-0.152.jar"
     DELETE_CLASS_FILES = True  # set True if you want .class -> .java
+    BATCH = True  # one CFR process per batch of classes instead of per class
+    JARS = False  # with BATCH, also decompile every .jar whole, into <name>-decompiled next to it
+    CACHE_DIR = r"C:\Users\mattw\Tools\cfr-cache"  # None to always decompile
 
-    decompile_all_classes(ROOT_DIR, CFR_JAR, delete_class_files=DELETE_CLASS_FILES)
+    decompile_all_classes(ROOT_DIR, CFR_JAR, delete_class_files=DELETE_CLASS_FILES, batch=BATCH, jars=JARS,
+                          cache_dir=CACHE_DIR)
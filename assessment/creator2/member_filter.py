@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import hashlib
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, List, Optional, Tuple
+from assessment.creator2 import extraction_journal
+from configuration import Configuration as Config
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# (path the member would have been extracted to, size, SHA-256 if taken)
+FilteredMember = Tuple[Path, int, Optional[str]]
+
+
+class MemberFilter:
+    """
+    Decides which archive members (and source files) are not worth
+    extracting, because no scanner can do anything with them: by extension,
+    by path glob and by size. A size of 0 means no size limit.
+    """
+
+    def __init__(self, extensions: List[str] = (), globs: List[str] = (), max_size: int = 0):
+        self.extensions = {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions if ext}
+        self.globs = [glob for glob in globs if glob]
+        self.max_size = max_size
+
+    def is_filtered(self, name: str, size: Optional[int] = None) -> bool:
+        """
+        True if the member called name (its path inside the archive, '/'
+        separated) should not be extracted. Globs are matched from the right,
+        as PurePath.match() does: '*.png' matches at any depth, 'locale/*'
+        the files directly in any locale directory.
+        """
+        path = PurePosixPath(name.replace("\\", "/"))
+        if path.suffix.lower() in self.extensions:
+            return True
+        if self.max_size and size is not None and size > self.max_size:
+            return True
+        return any(path.match(glob) for glob in self.globs)
+
+
+def check_member(name: str, dest_file: Path, size: int,
+                 opener: Optional[Callable[[], BinaryIO]] = None) -> Optional[FilteredMember]:
+    """
+    If the member called name is filtered out, return it as it is recorded
+    in the inventory: dest_file (where it would have been extracted to), its
+    size, and its hash when FILTER_HASH is set and opener is given. opener
+    opens the member's content; it is only called to hash it. Returns None
+    if the member is to be extracted.
+    """
+    if not get_filter().is_filtered(name, size):
+        return None
+
+    file_hash = None
+    if Config.filter_hash and opener is not None:
+        digest = hashlib.sha256()
+        with opener() as src:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+    return dest_file, size, file_hash
+
+
+def record(filtered: List[FilteredMember]) -> None:
+    """Record filtered out members in the inventory, with their final paths."""
+    for dest_file, size, file_hash in filtered:
+        Config.file_data_manager.add_filtered_file(dest_file, size, file_hash)
+        extraction_journal.note("filtered", dest_file, size=size, sha256=file_hash)
+
+
+def filter_member(name: str, dest_file: Path, size: int, opener: Optional[Callable[[], BinaryIO]] = None) -> bool:
+    """check_member(), recording the member right away if it is filtered out. Returns True if it is."""
+    member = check_member(name, dest_file, size, opener)
+    if member is None:
+        return False
+    record([member])
+    return True
+
+
+# Filter of the current extraction run
+_filter = MemberFilter()
+
+
+def get_filter() -> MemberFilter:
+    return _filter
+
+
+def reset_filter() -> MemberFilter:
+    """Start a new extraction run with the configured filter."""
+    global _filter
+    _filter = MemberFilter(
+        extensions=Config.filter_extensions,
+        globs=Config.filter_globs,
+        max_size=Config.filter_max_size,
+    )
+    return _filter
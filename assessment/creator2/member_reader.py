@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from contextlib import nullcontext
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+from assessment.creator2 import archive_dedupe, extraction_budget, file_magic, image_extractor, member_filter
+from assessment.creator2.extraction_budget import ArchiveBudget, BudgetExceeded
+from assessment.creator2.extractor import archive_target_dir_rel, strip_multi_suffix, tar_top_levels, zip_top_levels
+from loggers.extraction_logger import ProgressLog, stage_logger
+from configuration import Configuration as Config
+
+# Per-member messages are logged at DEBUG
+direct_log = stage_logger("direct")
+
+# (path the file would have been extracted to, file content)
+ArchiveMember = Tuple[Path, bytes]
+
+# Errors from a corrupt or truncated archive or compressed stream
+_READ_ERRORS = (OSError, ValueError, EOFError, tarfile.TarError, zipfile.BadZipFile, lzma.LZMAError, zlib.error)
+
+_DECOMPRESSORS = {
+    file_magic.GZIP: lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    file_magic.BZIP2: lambda f: bz2.BZ2File(f, mode="rb"),
+    file_magic.XZ: lambda f: lzma.LZMAFile(f, mode="rb", format=lzma.FORMAT_XZ),
+    file_magic.LZMA: lambda f: lzma.LZMAFile(f, mode="rb", format=lzma.FORMAT_ALONE),
+}
+
+
+def _spool(src: BinaryIO, header: bytes = b"",
+           budget: Optional[ArchiveBudget] = None) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy a nested archive (header being the part already read from src) into
+    a seekable buffer. It stays in memory up to DIRECT_SCAN_SPOOL_SIZE bytes
+    and only spills larger archives to a temporary file. The bytes read from
+    src are counted against 'budget'.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=Config.direct_scan_spool_size)
+    try:
+        spooled.write(header)
+        if budget is None:
+            shutil.copyfileobj(src, spooled)
+        else:
+            budget.copy(src, spooled)
+    except BudgetExceeded:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def _stream_size(src: BinaryIO) -> int:
+    """Size of a seekable stream; leaves it at its start."""
+    size = src.seek(0, os.SEEK_END)
+    src.seek(0)
+    return size
+
+
+def _skip_archive(src: BinaryIO, dest_root: Path, rel_path: Path, e: BudgetExceeded) -> Iterator[ArchiveMember]:
+    """
+    Yield an archive that went over the extraction budget as a plain file
+    and record the reason, as extractor.copy_or_extract_file() does. Members
+    already yielded before the budget ran out stay yielded.
+    """
+    direct_log.error(f"[member_reader] Not reading {dest_root / rel_path}: {e}")
+    Config.file_data_manager.set_file_status(dest_root / rel_path, extraction_budget.skip_status(e))
+    src.seek(0)
+    yield dest_root / rel_path, src.read()
+
+
+def _read(src: BinaryIO, budget: Optional[ArchiveBudget], size: int = -1) -> bytes:
+    return src.read(size) if budget is None else budget.read(src, size)
+
+
+def _iter_member(src: BinaryIO, dest_root: Path, rel_path: Path, budget: Optional[ArchiveBudget],
+                 depth: int) -> Iterator[ArchiveMember]:
+    """
+    Yield a file read from inside an archive, or the files nested inside it.
+    Reading src counts against the budget of the enclosing archive, if it
+    was not counted already; an archive found in it is nested depth
+    archives deep.
+    """
+    header = _read(src, budget, file_magic.HEADER_SIZE)
+    kind, fmt = file_magic.classify_header(header, rel_path.name)
+    if kind == "none":
+        yield dest_root / rel_path, header + _read(src, budget)
+        return
+
+    with _spool(src, header, budget) as spooled:
+        yield from _iter_file(spooled, dest_root, rel_path, kind, fmt, depth)
+
+
+def _iter_file(src: BinaryIO, dest_root: Path, rel_path: Path, kind: str,
+               fmt: Optional[str], depth: int = 1) -> Iterator[ArchiveMember]:
+    """
+    Yield every plain file in src, which extractor.main() would place at
+    dest_root / rel_path. kind and fmt are src's file_magic classification
+    and depth is how many archives deep it is nested. src must be seekable
+    unless kind is "none".
+    """
+    if kind == "none":
+        yield dest_root / rel_path, src.read()
+    elif kind == "single":
+        yield from _iter_single(src, dest_root, rel_path, fmt, depth)
+    else:  # "multi"
+        yield from _iter_multi(src, dest_root, rel_path, fmt, depth)
+
+
+def _iter_single(src: BinaryIO, dest_root: Path, rel_path: Path, fmt: str, depth: int) -> Iterator[ArchiveMember]:
+    """Decompress a single-file compressed stream and yield its content."""
+    direct_log.debug(f"[member_reader] Decompress (single): {dest_root / rel_path}")
+    decompressor = _DECOMPRESSORS[fmt]
+    try:
+        budget = extraction_budget.get_budget().archive(dest_root / rel_path, depth, _stream_size(src))
+        with decompressor(src) as f_in, _spool(f_in, budget=budget) as decompressed:
+            # A decompressed file may itself be an archive (e.g. foo.jar.gz -> foo.jar)
+            dest_rel = rel_path.with_suffix("")
+            kind, inner_fmt = file_magic.classify_header(decompressed.read(file_magic.HEADER_SIZE), dest_rel.name)
+            decompressed.seek(0)
+            yield from _iter_file(decompressed, dest_root, dest_rel, kind, inner_fmt, depth + 1)
+        return
+    except BudgetExceeded as e:
+        yield from _skip_archive(src, dest_root, rel_path, e)
+        return
+    except _READ_ERRORS as e:
+        direct_log.error(f"[member_reader] Could not decompress {dest_root / rel_path}: {e}")
+
+    # Fallback: treat as plain file
+    src.seek(0)
+    yield dest_root / rel_path, src.read()
+
+
+def _member_rel(target_dir: Path, dest_root: Path, name: str) -> Path:
+    """Path of an archive member relative to dest_root, with path traversal protection."""
+    member_path = (target_dir / name).resolve()
+    if not str(member_path).startswith(str(target_dir)):
+        direct_log.exception(f"Unsafe path in archive (path traversal attempt) for path: {member_path}")
+        raise Exception("Unsafe path in archive (path traversal attempt)")
+    return member_path.relative_to(dest_root)
+
+
+def _iter_multi(src: BinaryIO, dest_root: Path, rel_path: Path, fmt: Optional[str],
+                depth: int) -> Iterator[ArchiveMember]:
+    """
+    Yield the members of a zip or tar archive, recursing into nested archives.
+    Members get the paths extractor.extract_multi() would extract them to.
+    An archive that goes over the extraction budget is yielded as a plain
+    file instead, from the point where it did.
+    """
+    direct_log.debug(f"[member_reader] Read (multi): {dest_root / rel_path}")
+    try:
+        budget = extraction_budget.get_budget().archive(dest_root / rel_path, depth, _stream_size(src))
+    except BudgetExceeded as e:
+        yield from _skip_archive(src, dest_root, rel_path, e)
+        return
+
+    # Byte-identical archives are read once; the others become aliases
+    digest = None
+    if Config.dedupe_archives:
+        digest = archive_dedupe.hash_stream(src)
+        if not archive_dedupe.get_registry().claim(digest, rel_path):
+            direct_log.debug(f"[member_reader] Duplicate of an earlier archive, not read: {dest_root / rel_path}")
+            return
+
+    try:
+        yield from _iter_archive_members(src, dest_root, rel_path, fmt, budget, depth, digest)
+    except BudgetExceeded as e:
+        if digest is not None:
+            archive_dedupe.get_registry().kept(digest, rel_path)
+        yield from _skip_archive(src, dest_root, rel_path, e)
+
+
+def _iter_archive_members(src: BinaryIO, dest_root: Path, rel_path: Path, fmt: Optional[str],
+                          budget: ArchiveBudget, depth: int, digest: Optional[str]) -> Iterator[ArchiveMember]:
+    """_iter_multi() for an archive claimed for reading, counting what is read against its budget."""
+    # As in extractor.extract_multi(), only probe for a zip if the content was not recognized
+    if fmt == file_magic.ZIP or (fmt is None and zipfile.is_zipfile(src)):
+        src.seek(0)
+        with zipfile.ZipFile(src, "r") as zf:
+            infos = zf.infolist()
+            top_levels = zip_top_levels([i.filename for i in infos if i.filename])
+            target_dir_rel = archive_target_dir_rel(rel_path, top_levels)
+            if digest is not None:
+                archive_dedupe.get_registry().extracted(digest, target_dir_rel, top_levels)
+            target_dir = (dest_root / target_dir_rel).resolve()
+            for info in infos:
+                budget.add_member()
+                if info.is_dir():
+                    continue
+                member_rel = _member_rel(target_dir, dest_root, info.filename)
+                if member_filter.filter_member(info.filename, dest_root / member_rel, info.file_size,
+                                               lambda: zf.open(info, "r")):
+                    continue
+                try:
+                    with zf.open(info, "r") as member:
+                        yield from _iter_member(member, dest_root, member_rel, budget, depth + 1)
+                except _READ_ERRORS as e:
+                    direct_log.error(f"[member_reader] Error for {info.filename}: {e}")
+        return
+
+    src.seek(0)
+    tar_src = src
+    try:
+        if fmt in _DECOMPRESSORS:
+            # Decompress a compressed tar once into a seekable buffer; listing
+            # the members of the compressed stream and then reading them would
+            # decompress it twice. Paths are yielded as soon as they are read,
+            # so the flattening must be known up front, unlike in extraction.
+            with _DECOMPRESSORS[fmt](src) as f_in:
+                tar_src = _spool(f_in, budget=budget)
+        tf = tarfile.open(fileobj=tar_src, mode="r:*")
+        members = tf.getmembers()
+    except _READ_ERRORS as e:
+        direct_log.error(f"[member_reader] Not a TAR or error reading {dest_root / rel_path}: {e}")
+        if tar_src is not src:
+            tar_src.close()
+        # Fallback: treat as plain file
+        if digest is not None:
+            archive_dedupe.get_registry().kept(digest, rel_path)
+        src.seek(0)
+        yield dest_root / rel_path, src.read()
+        return
+
+    # The decompressed buffer is ours to close; src belongs to the caller
+    with (tar_src if tar_src is not src else nullcontext()), tf:
+        top_levels = tar_top_levels([m.name for m in members if m.name])
+        target_dir_rel = archive_target_dir_rel(rel_path, top_levels)
+        if digest is not None:
+            archive_dedupe.get_registry().extracted(digest, target_dir_rel, top_levels)
+        target_dir = (dest_root / target_dir_rel).resolve()
+        # A decompressed tar was counted whole as it was spooled
+        member_budget = budget if tar_src is src else None
+        for member in members:
+            name = member.name
+            if not name:
+                continue
+            budget.add_member()
+
+            # On Windows, skip names with invalid characters, as extraction does
+            if os.name == "nt" and any(ch in name for ch in '<>:"|?*'):
+                direct_log.debug(f"[member_reader] Skipping invalid Windows name: {name}")
+                continue
+
+            member_rel = _member_rel(target_dir, dest_root, name)
+            if member.isdir():
+                continue
+            if not member.isreg():
+                # Skip symlinks, devices, fifos, etc.
+                direct_log.debug(f"[member_reader] Skipping special member: {name}")
+                continue
+            if member_filter.filter_member(name, dest_root / member_rel, member.size,
+                                           lambda: tf.extractfile(member)):
+                continue
+
+            try:
+                member_file = tf.extractfile(member)
+                if member_file is None:
+                    continue
+                with member_file:
+                    yield from _iter_member(member_file, dest_root, member_rel, member_budget, depth + 1)
+            except _READ_ERRORS as e:
+                direct_log.error(f"[member_reader] Error for {name}: {e}")
+
+
+def _iter_image(image: image_extractor.ImageLayout, dest_root: Path, rel_path: Path) -> Iterator[ArchiveMember]:
+    """Yield the files of a container image's final merged filesystem, as extractor.extract_image() writes them."""
+    direct_log.debug(f"[member_reader] Read (image): {image.source}")
+    image_root = (dest_root / strip_multi_suffix(rel_path)).resolve()
+    try:
+        budget = extraction_budget.get_budget().archive(image.source, 1, image.size())
+        for path, layer_ref, member, member_file in image_extractor.iter_image_files(image):
+            budget.add_member()
+            member_rel = _member_rel(image_root, dest_root, path)
+            if member_filter.filter_member(path, dest_root / member_rel, member.size, lambda: member_file):
+                continue
+            try:
+                with member_file:
+                    # Files nested in archives from the layer belong to it as well
+                    for file_path, content in _iter_member(member_file, dest_root, member_rel, budget, 2):
+                        Config.file_data_manager.add_file_layer(file_path, layer_ref)
+                        yield file_path, content
+            except _READ_ERRORS as e:
+                direct_log.error(f"[member_reader] Error for {path}: {e}")
+    except BudgetExceeded as e:
+        # As in extractor.extract_image(), the files read so far are kept
+        direct_log.error(f"[member_reader] Stopped reading {image.source}: {e}")
+        Config.file_data_manager.set_file_status(dest_root / rel_path, extraction_budget.skip_status(e))
+
+
+def _iter_source_file(src_file: Path, dest_root: Path, rel_path: Path) -> Iterator[ArchiveMember]:
+    image = image_extractor.open_image(src_file) if Config.image_mode else None
+    if image is not None:
+        with image:
+            yield from _iter_image(image, dest_root, rel_path)
+        return
+
+    kind, fmt = file_magic.classify_file(src_file)
+    if kind == "none" and member_filter.filter_member(rel_path.as_posix(), dest_root / rel_path,
+                                                      src_file.stat().st_size, lambda: open(src_file, "rb")):
+        return
+    with open(src_file, "rb") as src:
+        yield from _iter_file(src, dest_root, rel_path, kind, fmt)
+
+
+def _iter_source(source_dir: Path, dest_root: Path) -> Iterator[ArchiveMember]:
+    """The members of source_dir, as iter_members() yields them."""
+    image = image_extractor.open_image(source_dir) if Config.image_mode and source_dir.is_dir() else None
+
+    if image is not None:
+        with image:
+            yield from _iter_image(image, dest_root, Path(source_dir.name))
+
+    elif source_dir.is_dir():
+        for dirpath, dirnames, filenames in os.walk(source_dir):
+            for filename in filenames:
+                src_file = Path(dirpath, filename)
+                if src_file.is_file():
+                    yield from _iter_source_file(src_file, dest_root, src_file.relative_to(source_dir))
+
+    elif source_dir.is_file():
+        yield from _iter_source_file(source_dir, dest_root, Path(source_dir.name))
+
+    else:
+        direct_log.error(f"Source path {source_dir} is neither a file nor a directory")
+        raise ValueError(f"Source path {source_dir} is neither a file nor a directory")
+
+
+def iter_members(source_dir: Path, dest_dir: Path) -> Iterator[ArchiveMember]:
+    """
+    Yield (path, content) for every plain file in source_dir, reading archive
+    and compressed members straight from the archives, nested ones included,
+    instead of extracting them. Each path is where extractor.main() would
+    have written the file under dest_dir; nothing is written to disk.
+    """
+    dest_root = dest_dir.resolve()
+    archive_registry = archive_dedupe.reset_registry()
+    extraction_budget.reset_budget()
+    member_filter.reset_filter()
+    file_magic.clear_cache()
+
+    progress = ProgressLog(direct_log, "members read")
+    for member in _iter_source(source_dir, dest_root):
+        progress.add()
+        yield member
+
+    if Config.dedupe_archives:
+        archive_registry.resolve()
+        archive_registry.register_aliases(dest_root)
+    progress.done()
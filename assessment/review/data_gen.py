@@ -2,6 +2,7 @@ import csv
 import os.path
 from pathlib import Path
 from configuration import Configuration as Config
+from assessment.scanner import file_release_search
 
 
 def write_license_data_to_csv(csv_name):
@@ -18,24 +19,51 @@ def write_license_data_to_csv(csv_name):
         writer = csv.writer(f)
 
         # Write header row
-        writer.writerow(["File Name", "License", "Status", "Is Released", "Keywords", "Hash"])
+        writer.writerow(["File Name", "License", "Status", "Is Released", "Keywords", "Hash", "License Similarity",
+                         "Duplicate Of", "Layer"])
 
         # Write data rows
+        reported_statuses = set()
         for file_data in Config.file_data_manager.get_all_file_data():
+            # common_dir = os.path.commonpath([Config.root_dir, file_data.file_path])
+            # rel_file_dir = os.path.relpath(file_data.file_path, common_dir)
+            status = "N/A"
             if file_data.file_path:
-                p = Path(file_data.file_path)
+                status = Config.file_data_manager.get_file_status(file_data.file_path) or "N/A"
+                reported_statuses.add(Path(file_data.file_path).resolve())
+            writer.writerow([hyperlink_cell(file_data.file_path), file_data.license_name, status,
+                             file_data.is_released, file_data.keyword_matches, file_data.file_hash,
+                             file_data.license_similarity, "", file_data.layer])
 
-                # Excel likes file:// URLs; convert Windows backslashes to forward slashes
-                url = "file:///" + str(p).replace("\\", "/")
+            # Copies inside byte-identical archives that were only extracted once get the same findings
+            if not file_data.file_path:
+                continue
+            for alias_path in Config.file_data_manager.get_alias_paths(Path(file_data.file_path)):
+                writer.writerow([hyperlink_cell(alias_path), file_data.license_name, "N/A",
+                                 not file_release_search.is_ignored_dir(alias_path), file_data.keyword_matches,
+                                 file_data.file_hash, file_data.license_similarity, str(file_data.file_path),
+                                 Config.file_data_manager.get_file_layer(alias_path)])
 
-                # What the cell visibly shows (just the file name portion)
-                display_text = p.name
+        # Files that were not (fully) extracted, being over an extraction budget or filtered out, so not scanned either
+        for file_path, status in Config.file_data_manager.file_statuses.items():
+            if file_path not in reported_statuses:
+                # Filtered files were never extracted, but their hash may have been taken
+                file_hash = Config.file_data_manager.filtered_files.get(file_path, (0, None))[1]
+                writer.writerow([hyperlink_cell(file_path), "", status, "", "", file_hash or "", "", "",
+                                 Config.file_data_manager.get_file_layer(file_path)])
 
-                # Excel hyperlink formula
-                file_cell = f'=HYPERLINK("{url}", "{display_text}")'
-            else:
-                file_cell = ""
-            # common_dir = os.path.commonpath([Config.root_dir, file_data.file_path])
-            # rel_file_dir = os.path.relpath(file_data.file_path, common_dir)
-            writer.writerow([file_cell, file_data.license_name, "N/A", file_data.is_released,
-                             file_data.keyword_matches, file_data.file_hash])
+
+def hyperlink_cell(file_path) -> str:
+    """Excel hyperlink formula for a file, showing just its name."""
+    if not file_path:
+        return ""
+    p = Path(file_path)
+
+    # Excel likes file:// URLs; convert Windows backslashes to forward slashes
+    url = "file:///" + str(p).replace("\\", "/")
+
+    # What the cell visibly shows (just the file name portion)
+    display_text = p.name
+
+    # Excel hyperlink formula
+    return f'=HYPERLINK("{url}", "{display_text}")'
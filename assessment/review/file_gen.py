@@ -11,6 +11,28 @@ def is_ignored_dir(src_dir: Path) -> bool:
     return False
 
 
+def needs_review(file_data) -> bool:
+    """True if a released file has no detected header and must be reviewed by hand."""
+    return not is_ignored_dir(file_data.file_path) and not file_data.file_header
+
+
+def write_review_file(file_data, content: bytes, src_path: Path) -> bool:
+    """
+    Write content to the review directory if file_data needs review, keeping
+    its path relative to src_path. Used in direct-scan mode, where the file
+    only exists in memory and copy_unresolved_files has nothing to copy.
+
+    Returns True if a review file was written.
+    """
+    if not needs_review(file_data):
+        return False
+    target_path = Path(Config.review_file_dir).resolve() / file_data.file_path.relative_to(src_path)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(target_path, "wb") as f:
+        f.write(content)
+    return True
+
+
 def copy_unresolved_files(src_path) -> None:
     """
     Iterate each file in src_dir and copy it to dst_dir if condition(file_path) is True.
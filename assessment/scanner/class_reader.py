@@ -0,0 +1,128 @@
+import struct
+from typing import List, Optional, Tuple
+
+CLASS_MAGIC = b"\xca\xfe\xba\xbe"
+
+# Constant pool tag -> size of its data, for every tag but CONSTANT_Utf8 (1)
+_CONSTANT_SIZES = {
+    3: 4,  # Integer
+    4: 4,  # Float
+    5: 8,  # Long
+    6: 8,  # Double
+    7: 2,  # Class
+    8: 2,  # String
+    9: 4,  # Fieldref
+    10: 4,  # Methodref
+    11: 4,  # InterfaceMethodref
+    12: 4,  # NameAndType
+    15: 3,  # MethodHandle
+    16: 2,  # MethodType
+    17: 4,  # Dynamic
+    18: 4,  # InvokeDynamic
+    19: 2,  # Module
+    20: 2,  # Package
+}
+
+
+class ClassFormatError(ValueError):
+    pass
+
+
+def is_class_file(data: bytes) -> bool:
+    return data[:4] == CLASS_MAGIC
+
+
+def _decode_modified_utf8(raw: bytes) -> str:
+    """
+    Decode the 'modified UTF-8' of class files: NUL is encoded as C0 80 and
+    characters outside the BMP as two 3-byte surrogates.
+    """
+    text = raw.replace(b"\xc0\x80", b"\x00").decode("utf-8", errors="surrogatepass")
+    return text.encode("utf-16", errors="surrogatepass").decode("utf-16", errors="replace")
+
+
+def _read_constant_pool(data: bytes) -> Tuple[List[Optional[str]], int]:
+    """
+    The UTF8 constants of the class in data, by constant pool index (None
+    for every other constant), and the offset just after the pool.
+    """
+    count = struct.unpack_from(">H", data, 8)[0]
+    utf8: List[Optional[str]] = [None] * count
+    offset = 10
+    index = 1
+    while index < count:
+        tag = data[offset]
+        if tag == 1:
+            length = struct.unpack_from(">H", data, offset + 1)[0]
+            utf8[index] = _decode_modified_utf8(data[offset + 3:offset + 3 + length])
+            offset += 3 + length
+        elif tag in _CONSTANT_SIZES:
+            offset += 1 + _CONSTANT_SIZES[tag]
+        else:
+            raise ClassFormatError(f"Unknown constant pool tag {tag} at offset {offset}")
+        # Long and Double take two entries
+        index += 2 if tag in (5, 6) else 1
+    return utf8, offset
+
+
+def _skip_members(data: bytes, offset: int) -> int:
+    """Skip the fields or methods table at offset, returning the offset after it."""
+    count = struct.unpack_from(">H", data, offset)[0]
+    offset += 2
+    for _ in range(count):
+        # access_flags, name_index, descriptor_index, attributes_count
+        attributes_count = struct.unpack_from(">H", data, offset + 6)[0]
+        offset += 8
+        for _ in range(attributes_count):
+            offset += 6 + struct.unpack_from(">I", data, offset + 2)[0]
+    return offset
+
+
+def _source_file(data: bytes, offset: int, utf8: List[Optional[str]]) -> Optional[str]:
+    """The SourceFile attribute of the class, reading from just after the constant pool."""
+    # access_flags, this_class, super_class, interfaces
+    interfaces_count = struct.unpack_from(">H", data, offset + 6)[0]
+    offset += 8 + 2 * interfaces_count
+    offset = _skip_members(data, offset)  # fields
+    offset = _skip_members(data, offset)  # methods
+
+    attributes_count = struct.unpack_from(">H", data, offset)[0]
+    offset += 2
+    for _ in range(attributes_count):
+        name_index, length = struct.unpack_from(">HI", data, offset)
+        if utf8[name_index] == "SourceFile":
+            return utf8[struct.unpack_from(">H", data, offset + 6)[0]]
+        offset += 6 + length
+    return None
+
+
+def read_class_strings(data: bytes) -> List[str]:
+    """
+    The strings of a compiled Java class, without decompiling it: the
+    SourceFile attribute, if there is one, followed by every UTF8 constant
+    in the constant pool. The constants hold the string literals as well as
+    the class, member and type names.
+
+    Raises ClassFormatError if data is not a readable class file.
+    """
+    if not is_class_file(data):
+        raise ClassFormatError("Not a class file")
+    try:
+        utf8, offset = _read_constant_pool(data)
+        source_file = _source_file(data, offset, utf8)
+    except (struct.error, IndexError) as e:
+        raise ClassFormatError(f"Truncated class file: {e}") from e
+    except UnicodeDecodeError as e:
+        raise ClassFormatError(f"Malformed UTF8 constant: {e}") from e
+
+    strings = [source_file] if source_file is not None else []
+    strings.extend(constant for constant in utf8 if constant is not None)
+    return strings
+
+
+def class_text(data: bytes) -> Optional[str]:
+    """read_class_strings() one per line, or None if data is not a readable class file."""
+    try:
+        return "\n".join(read_class_strings(data))
+    except ClassFormatError:
+        return None
@@ -0,0 +1,124 @@
+import re
+from typing import List, Union
+from assessment.creator2 import file_magic
+
+TEXT = "text"
+BINARY = "binary"
+MEDIA = "media"
+ALL_TYPES = (TEXT, BINARY, MEDIA)
+
+# Bytes from the start of a file a content type is decided on
+SNIFF_SIZE = 8192
+
+# Above these shares of NUL / other control bytes, content is binary
+MAX_NUL_RATIO = 0.01
+MAX_CONTROL_RATIO = 0.1
+
+# Printable ASCII runs at least this long are taken from binaries, as `strings` does
+MIN_STRING_LENGTH = 6
+
+# (BOM, encoding), longest first: a UTF-32 LE BOM starts with the UTF-16 LE one
+_TEXT_BOMS = (
+    (b"\xff\xfe\x00\x00", "utf-32"),
+    (b"\x00\x00\xfe\xff", "utf-32"),
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+)
+
+# (offset, magic bytes) of images, audio, video and fonts
+_MEDIA_MAGIC = (
+    (0, b"\x89PNG\r\n\x1a\n"),
+    (0, b"\xff\xd8\xff"),  # JPEG
+    (0, b"GIF87a"),
+    (0, b"GIF89a"),
+    (0, b"\x00\x00\x01\x00"),  # ICO
+    (0, b"II*\x00"),  # TIFF, little-endian
+    (0, b"MM\x00*"),  # TIFF, big-endian
+    (0, b"8BPS"),  # Photoshop
+    (0, b"RIFF"),  # WebP, WAV, AVI
+    (0, b"OggS"),
+    (0, b"fLaC"),
+    (0, b"ID3"),  # MP3
+    (4, b"ftyp"),  # MP4, MOV, HEIC
+    (0, b"\x1aE\xdf\xa3"),  # Matroska, WebM
+    (0, b"wOFF"),
+    (0, b"wOF2"),
+    (0, b"OTTO"),
+    (0, b"\x00\x01\x00\x00\x00"),  # TrueType
+)
+
+# Executables, bytecode and other binaries worth extracting strings from
+_BINARY_MAGIC = (
+    b"\x7fELF",
+    b"MZ",  # PE
+    b"\xca\xfe\xba\xbe",  # Java class, Mach-O universal
+    b"\xfe\xed\xfa\xce",  # Mach-O
+    b"\xfe\xed\xfa\xcf",
+    b"\xce\xfa\xed\xfe",
+    b"\xcf\xfa\xed\xfe",
+    b"dex\n",
+    b"\x00asm",  # WebAssembly
+    b"SQLite format 3\x00",
+    b"%PDF-",
+)
+
+_CONTROL_BYTES = bytes(b for b in range(32) if b not in b"\t\n\f\r\x1b") + b"\x7f"
+_PRINTABLE_BYTES = bytes(range(0x20, 0x7f)) + b"\t\n\r"
+
+# Formats file_magic.sniff() recognizes by a text-like magic ("BZh")
+_TEXT_LIKE_FORMATS = (file_magic.BZIP2,)
+_STRING_RE = re.compile(rb"[\x20-\x7e\t]{%d,}" % MIN_STRING_LENGTH)
+
+
+def _text_like(magic: bytes) -> bool:
+    """Whether magic is short and printable, so a text file may start with it as well ("MZ", "ID3")."""
+    return len(magic) <= 4 and not magic.translate(None, _PRINTABLE_BYTES)
+
+
+def _has_binary_bytes(raw: bytes) -> bool:
+    """Whether the share of NUL or other control bytes in raw is above what text has."""
+    if raw.count(0) / len(raw) > MAX_NUL_RATIO:
+        return True
+    control = len(raw) - len(raw.translate(None, _CONTROL_BYTES))
+    return control / len(raw) > MAX_CONTROL_RATIO
+
+
+def sniff(prefix: Union[str, bytes]) -> str:
+    """
+    Content type (TEXT, BINARY or MEDIA) of a file from the start of its
+    content, as FileData.read_prefix() returns it: a byte order mark makes
+    it text, known magic bytes media or binary, and otherwise the share of
+    NUL and control bytes decides. A short printable magic only counts when
+    that share says binary too, so text starting with "MZ" stays text.
+    """
+    raw = prefix.encode("utf-8", errors="surrogatepass") if isinstance(prefix, str) else prefix
+    if not raw:
+        return TEXT
+    if any(raw.startswith(bom) for bom, _ in _TEXT_BOMS):
+        return TEXT
+
+    binary_bytes = _has_binary_bytes(raw[:SNIFF_SIZE])
+    for offset, magic in _MEDIA_MAGIC:
+        if raw[offset:offset + len(magic)] == magic and (binary_bytes or not _text_like(magic)):
+            return MEDIA
+    for magic in _BINARY_MAGIC:
+        if raw.startswith(magic) and (binary_bytes or not _text_like(magic)):
+            return BINARY
+    fmt = file_magic.sniff(raw)
+    if fmt is not None and (binary_bytes or fmt not in _TEXT_LIKE_FORMATS):
+        return BINARY
+    return BINARY if binary_bytes else TEXT
+
+
+def decode_text(content: bytes) -> str:
+    """Decode text content that is not UTF-8: by its byte order mark, if it has one."""
+    for bom, encoding in _TEXT_BOMS:
+        if content.startswith(bom):
+            return content.decode(encoding, errors="ignore")
+    return content.decode("utf-8", errors="ignore")
+
+
+def extract_strings(content: bytes) -> List[str]:
+    """The runs of at least MIN_STRING_LENGTH printable ASCII characters in binary content."""
+    return [match.decode("ascii") for match in _STRING_RE.findall(content)]
@@ -1,36 +1,183 @@
+import hashlib
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Dict, List, Optional, Tuple, Union
 from assessment.scanner import utils
 from models.FileData import FileData
 from configuration import Configuration as Config
 
 
-def read_all_files_in_directory(root_dir):
+def decode_content(raw: bytes) -> Union[str, bytes]:
     """
-    Iterates through all files in root_dir (including subdirectories),
-    reads their content, and creates FileData instances for each file.
+    Return raw as text when it decodes as UTF-8, with newlines translated the
+    way text-mode open() does, otherwise return the bytes unchanged.
     """
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw
+    return text.replace("\r\n", "\n").replace("\r", "\n")
 
-    # # Optional: start with a clean registry for each run
-    # FileData.clear_registry()
 
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        for filename in filenames:
-            file_path = Path(dirpath, filename).resolve()
+def decode_prefix(raw: bytes) -> Union[str, bytes]:
+    """decode_content() for the start of a file, which may end in the middle of a UTF-8 character."""
+    try:
+        raw.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.reason != "unexpected end of data":
+            return raw
+        raw = raw[:e.start]
+    return decode_content(raw)
 
-            try:
-                # Try reading as text
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content: Union[str, bytes] = f.read()
-            except UnicodeDecodeError:
-                # Fallback to binary
-                with open(file_path, "rb") as f:
-                    content = f.read()
-            except Exception as e:
-                print(f"Could not read {file_path}: {e}")
-                continue
 
-            file_extension = utils.get_file_extension(file_path)
-            file_data = FileData(file_path, content, file_extension)
-            Config.file_data_manager.add_file_data(file_data)
\ No newline at end of file
+class FileHandle:
+    """
+    How a FileData loads the content of its file on first access: through
+    Config.content_cache, so only recently used contents stay in memory.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+
+    def _read(self) -> Union[str, bytes]:
+        try:
+            with open(self.file_path, "rb") as f:
+                return decode_content(f.read())
+        except Exception as e:
+            print(f"Could not read {self.file_path}: {e}")
+            return b""
+
+    def load(self) -> Union[str, bytes]:
+        return Config.content_cache.get(self.file_path, self._read)
+
+    def load_prefix(self, size: int) -> Union[str, bytes]:
+        content = Config.content_cache.peek(self.file_path)
+        if content is not None:
+            return content[:size]
+        try:
+            with open(self.file_path, "rb") as f:
+                return decode_prefix(f.read(size))
+        except Exception as e:
+            print(f"Could not read {self.file_path}: {e}")
+            return b""
+
+
+def file_data_from_bytes(file_path: Path, raw: bytes) -> FileData:
+    """
+    Create a FileData instance for content that was never written to disk,
+    such as an archive member in direct-scan mode. The hash is taken from
+    the raw bytes here, since there is no file for the hash stage to read.
+    """
+    file_data = FileData(file_path, decode_content(raw), utils.get_file_extension(file_path))
+    file_data.file_hash = hashlib.sha256(raw).hexdigest()
+    return file_data
+
+
+def read_file(file_path: Path) -> Optional[FileData]:
+    """
+    Create a FileData instance for a single file. Its content is only read
+    on first access (see FileHandle): as text when it decodes as UTF-8,
+    otherwise as bytes. Returns None if the file can't be read.
+    """
+    try:
+        file_size = os.stat(file_path).st_size
+        if not os.access(file_path, os.R_OK):
+            raise PermissionError("Permission denied")
+    except Exception as e:
+        print(f"Could not read {file_path}: {e}")
+        return None
+
+    file_extension = utils.get_file_extension(file_path)
+    return FileData(file_path, None, file_extension, file_size=file_size, content_handle=FileHandle(file_path))
+
+
+def _read_entry(entry: os.DirEntry) -> Optional[FileData]:
+    """read_file() for a directory entry, taking the size from the entry's stat."""
+    # The directory is already resolved; only a symlink can lead elsewhere
+    file_path = Path(entry.path).resolve() if entry.is_symlink() else Path(entry.path)
+    try:
+        file_size = entry.stat().st_size
+        if not os.access(file_path, os.R_OK):
+            raise PermissionError("Permission denied")
+    except Exception as e:
+        print(f"Could not read {file_path}: {e}")
+        return None
+
+    file_extension = utils.get_file_extension(file_path)
+    return FileData(file_path, None, file_extension, file_size=file_size, content_handle=FileHandle(file_path))
+
+
+def _scan_directory(dir_path: str) -> Tuple[List[FileData], List[str]]:
+    """
+    The FileData of the files directly in dir_path and the subdirectories
+    to descend into, both in listing order, as os.walk() (which does not
+    follow directory symlinks) would see them.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+    except OSError as e:
+        # os.walk() skips directories it cannot list
+        print(f"Could not read {dir_path}: {e}")
+        return [], []
+
+    files: List[FileData] = []
+    subdirs: List[str] = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+            continue
+        file_data = _read_entry(entry)
+        if file_data is not None:
+            files.append(file_data)
+    return files, subdirs
+
+
+def read_all_files_in_directory(root_dir, workers: Optional[int] = None):
+    """
+    Iterates through all files in root_dir (including subdirectories) and
+    creates FileData instances for each file; their content is read when
+    it is first needed.
+
+    Directories are listed with os.scandir by up to INVENTORY_WORKERS
+    threads, so listing and stat round-trips (slow on network file
+    systems) overlap. A directory's subdirectories are queued as soon as
+    it is listed. The files are still added to FileDataManager in
+    os.walk() order.
+    """
+    root = str(Path(root_dir).resolve())
+    workers = Config.inventory_workers if workers is None else workers
+    listings: Dict[str, Future] = {}
+    listings_lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=workers or None, thread_name_prefix="inventory") as executor:
+        def submit(dir_path: str) -> None:
+            future = executor.submit(scan, dir_path)
+            with listings_lock:
+                listings[dir_path] = future
+
+        def scan(dir_path: str) -> Tuple[List[FileData], List[str]]:
+            files, subdirs = _scan_directory(dir_path)
+            # Queued before this listing is returned, so they are known when it is consumed
+            for subdir in subdirs:
+                submit(subdir)
+            return files, subdirs
+
+        submit(root)
+        # Consume the listings depth-first, in os.walk() order
+        pending = [root]
+        while pending:
+            dir_path = pending.pop()
+            with listings_lock:
+                future = listings.pop(dir_path)
+            files, subdirs = future.result()
+            for file_data in files:
+                Config.file_data_manager.add_file_data(file_data)
+            pending.extend(reversed(subdirs))
\ No newline at end of file
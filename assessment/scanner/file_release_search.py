@@ -1,4 +1,5 @@
 from pathlib import Path
+from assessment.scanner import pipeline
 from configuration import Configuration as Config
 
 
@@ -18,6 +19,11 @@ def set_file_release_status(file_data):
             file_data.is_released = True
 
 
+@pipeline.stage("release")
+def release_status_stage(file_data, views):
+    set_file_release_status(file_data)
+
+
 def scan_all_files():
     for file_data in Config.file_data_manager.get_all_file_data():
         set_file_release_status(file_data)
\ No newline at end of file
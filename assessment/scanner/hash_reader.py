@@ -3,6 +3,7 @@ import argparse
 import hashlib
 import os
 from pathlib import Path
+from assessment.scanner import pipeline
 from configuration import Configuration as Config
 from models.FileData import FileData
 
@@ -71,6 +72,17 @@ def compute_hash(file_data: FileData, algo: str = "sha256") -> str:
         raise ValueError(f"Path is neither file nor directory: {path}")
 
 
+@pipeline.stage("hash")
+def hash_stage(file_data, views):
+    # Already set for content that was hashed while it was read
+    if file_data.file_hash is not None:
+        return
+    try:
+        compute_hash(file_data, "sha256")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
 def main():
 
     algorithm = "sha256"
@@ -2,10 +2,13 @@ import csv
 import re
 from pathlib import Path
 from typing import Optional, List
+from assessment.scanner import content_type, pipeline
 from configuration import Configuration as Config
 from models.FileData import FileData
 from input import header_types
 
+# Headers are looked for in this much of the start of a file
+HEADER_PREFIX_BYTES = 64 * 1024
 
 
 def detect_file_header(file_data):
@@ -22,7 +25,7 @@ def detect_file_header(file_data):
         :param file_data:
     """
 
-    lines = file_data.file_content.strip().splitlines()
+    lines = file_data.read_prefix(HEADER_PREFIX_BYTES).strip().splitlines()
     if not lines:
         return
 
@@ -125,7 +128,7 @@ def detect_c_style_file_header(file_data: FileData) -> Optional[str]:
     :param file_data:
     :return: Header comment text (including comment markers) if present, else None.
     """
-    lines = file_data.file_content.splitlines()
+    lines = file_data.read_prefix(HEADER_PREFIX_BYTES).splitlines()
     n = len(lines)
     i = 0
 
@@ -194,7 +197,7 @@ def detect_xml_style_file_header(file_data: FileData) -> Optional[str]:
     :param file_data:
     :return: The header comment (including <!-- and -->) if present, otherwise None.
     """
-    lines = file_data.file_content.splitlines()
+    lines = file_data.read_prefix(HEADER_PREFIX_BYTES).splitlines()
     n = len(lines)
     i = 0
 
@@ -267,7 +270,7 @@ def detect_python_style_file_header(file_data: FileData) -> Optional[str]:
     :param file_data:
     :return: Header text (including '#' markers) if present, otherwise None.
     """
-    lines = file_data.file_content.splitlines()
+    lines = file_data.read_prefix(HEADER_PREFIX_BYTES).splitlines()
     n = len(lines)
     i = 0
 
@@ -321,7 +324,7 @@ def detect_csv_style_file_header(file_data: FileData) -> Optional[str]:
     :return: Header line text if a header is likely present, otherwise None.
     """
     # Split into lines and remove leading BOM from very first line if present
-    lines = file_data.file_content.splitlines()
+    lines = file_data.read_prefix(HEADER_PREFIX_BYTES).splitlines()
     if not lines:
         return None
 
@@ -372,7 +375,7 @@ def detect_txt_style_file_header(file_data: FileData, min_header_lines: int = 2)
     :param min_header_lines: Minimum number of lines required to consider it a header.
     :return: Header text (joined with '\n') if present, otherwise None.
     """
-    lines: List[str] = file_data.file_content.splitlines()
+    lines: List[str] = file_data.read_prefix(HEADER_PREFIX_BYTES).splitlines()
     if not lines:
         return None
 
@@ -419,7 +422,7 @@ def detect_sh_style_file_header(file_data: FileData) -> Optional[str]:
     :param file_data:
     :return: Header text (including '#' markers) if present, otherwise None.
     """
-    lines: List[str] = file_data.file_content.splitlines()
+    lines: List[str] = file_data.read_prefix(HEADER_PREFIX_BYTES).splitlines()
     if not lines:
         return None
 
@@ -458,26 +461,36 @@ def detect_sh_style_file_header(file_data: FileData) -> Optional[str]:
     return "\n".join(header_lines)
 
 
+def detect_header(file_data: FileData) -> None:
+    """Run the header detector that matches the file's extension or name."""
+    file_path = Path(file_data.file_path)
+    if file_data and file_data.file_size:
+        file_extension = file_data.file_extension.lower()
+        if file_extension in header_types.C_STYLE_HEADER_EXTENSIONS:
+            detect_c_style_file_header(file_data)
+        elif file_extension in header_types.XML_STYLE_HEADER_EXTENSIONS:
+            detect_xml_style_file_header(file_data)
+        elif file_extension in header_types.PYTHON_STYLE_HEADER_EXTENSIONS:
+            detect_python_style_file_header(file_data)
+        elif file_path.name in header_types.PYTHON_STYLE_HEADER_BASENAMES:
+            detect_python_style_file_header(file_data)
+        elif file_extension in header_types.CSV_STYLE_HEADER_EXTENSIONS:
+            detect_csv_style_file_header(file_data)
+        elif file_extension in header_types.TXT_STYLE_HEADER_EXTENSIONS:
+            detect_txt_style_file_header(file_data)
+        elif file_path.name in header_types.TXT_STYLE_HEADER_BASENAMES:
+            detect_txt_style_file_header(file_data)
+        elif file_extension in header_types.SH_STYLE_HEADER_EXTENSIONS:
+            detect_sh_style_file_header(file_data)
+        elif file_path.name in header_types.SH_STYLE_HEADER_BASENAMES:
+            detect_sh_style_file_header(file_data)
+
+
+@pipeline.stage("header", content_types=(content_type.TEXT,))
+def header_stage(file_data, views):
+    detect_header(file_data)
+
+
 def scan_all_files_for_headers():
     for file_data in Config.file_data_manager.get_all_file_data():
-        file_path = Path(file_data.file_path)
-        if file_data and file_data.file_content:
-            file_extension = file_data.file_extension.lower()
-            if file_extension in header_types.C_STYLE_HEADER_EXTENSIONS:
-                detect_c_style_file_header(file_data)
-            elif file_extension in header_types.XML_STYLE_HEADER_EXTENSIONS:
-                detect_xml_style_file_header(file_data)
-            elif file_extension in header_types.PYTHON_STYLE_HEADER_EXTENSIONS:
-                detect_python_style_file_header(file_data)
-            elif file_path.name in header_types.PYTHON_STYLE_HEADER_BASENAMES:
-                detect_python_style_file_header(file_data)
-            elif file_extension in header_types.CSV_STYLE_HEADER_EXTENSIONS:
-                detect_csv_style_file_header(file_data)
-            elif file_extension in header_types.TXT_STYLE_HEADER_EXTENSIONS:
-                detect_txt_style_file_header(file_data)
-            elif file_path.name in header_types.TXT_STYLE_HEADER_BASENAMES:
-                detect_txt_style_file_header(file_data)
-            elif file_extension in header_types.SH_STYLE_HEADER_EXTENSIONS:
-                detect_sh_style_file_header(file_data)
-            elif file_path.name in header_types.SH_STYLE_HEADER_BASENAMES:
-                detect_sh_style_file_header(file_data)
+        detect_header(file_data)
@@ -1,5 +1,6 @@
 # match_scanner.py
 from typing import Dict, List, Union
+from assessment.scanner import content_type, rule_pack, pipeline
 from assessment.scanner.utils import to_text
 from configuration import Configuration as Config
 from input.file_search_strings import copyright_matches, license_matches, prohibitive_matches, general_matches, \
@@ -25,15 +26,21 @@ def _find_matches_in_content(content: Union[str, bytes]) -> Dict[str, List[str]]
     - Based on full strings from the lists (e.g. we look specifically
       for 'Eclipse Public License', not just 'Eclipse').
     """
-    text = to_text(content)
-    text_lower = text.lower()
+    return _find_matches_in_lowercase_text(to_text(content).lower())
 
+
+def _find_matches_in_lowercase_text(text_lower: str) -> Dict[str, List[str]]:
+    """
+    Same as _find_matches_in_content, for content that is already decoded
+    and lowercased.
+    """
     matches: Dict[str, List[str]] = {}
 
-    for category, terms in ALL_MATCH_LISTS.items():
+    # The rule pack holds ALL_MATCH_LISTS with every term already lowercased
+    for category, terms in rule_pack.get_rule_pack().keywords.items():
         found_terms: List[str] = []
-        for term in terms:
-            if term.lower() in text_lower:
+        for term, term_lower in terms:
+            if term_lower in text_lower:
                 # Full string from the list is present in the content
                 found_terms.append(term)
 
@@ -43,6 +50,13 @@ def _find_matches_in_content(content: Union[str, bytes]) -> Dict[str, List[str]]
     return matches
 
 
+@pipeline.stage("keyword", content_types=(content_type.TEXT, content_type.BINARY))
+def keyword_stage(file_data, views):
+    file_matches = _find_matches_in_lowercase_text(views.text_lower)
+    if file_matches:
+        file_data.keyword_matches = file_matches
+
+
 def scan_all_files_for_matches():
     for file_data in Config.file_data_manager.get_all_file_data():
         file_matches = _find_matches_in_content(file_data.file_content)
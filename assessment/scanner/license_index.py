@@ -0,0 +1,226 @@
+# license_index.py
+import re
+from array import array
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+# MinHash / LSH settings for approximate matching. 32 bands of 4 rows put the
+# LSH threshold (1/32) ** (1/4) at ~0.42 estimated Jaccard similarity.
+MINHASH_SHINGLE_SIZE = 3
+MINHASH_BANDS = 32
+MINHASH_ROWS = 4
+MINHASH_SIZE = MINHASH_BANDS * MINHASH_ROWS
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Placeholders written into input/licenses_normalized by placeholder_to_regex
+_REGEX_PLACEHOLDER_RE = re.compile(r"\\\\d\\\{4\\\}|\\d\{4\}|\.\+\?")
+_REGEX_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+_MASK_64 = (1 << 64) - 1
+_GOLDEN_64 = 0x9E3779B97F4A7C15
+_BIN_SHIFT = 64 - (MINHASH_SIZE - 1).bit_length()
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+
+
+def shingle_hashes(tokens: List[str], shingle_size: int) -> Set[int]:
+    """
+    Return the set of CRC32 hashes of every run of shingle_size consecutive
+    tokens. CRC32 is stable across processes, unlike hash() on str.
+    """
+    return {
+        zlib.crc32(" ".join(tokens[i:i + shingle_size]).encode("utf-8"))
+        for i in range(len(tokens) - shingle_size + 1)
+    }
+
+
+class LicenseAnchorIndex:
+    """
+    Multi-pattern index over the normalized license corpus.
+
+    Every normalized license is a run of lines joined with "\\n". If a license
+    is contained in a normalized file text, each of its *interior* lines (all
+    lines except the first and last) must appear as a complete line of that
+    file, because it is delimited by newlines on both sides. Each license is
+    therefore registered under one interior "anchor" line, preferring the line
+    shared by the fewest other licenses.
+
+    A file is scanned once: its lines are looked up in the anchor table, and
+    only the licenses whose anchor was hit get the full containment check.
+    Licenses with fewer than three lines have no interior line and are always
+    checked.
+
+    Narrowing the hits further (e.g. by shingles) costs more than it saves:
+    the containment check is a C-level substring search, and even a file
+    holding every license text hits fewer than a thousand anchors.
+    """
+
+    def __init__(self, normalized_licenses: Dict[Path, str]):
+        self._licenses: List[Tuple[Path, str]] = [
+            (path, text) for path, text in normalized_licenses.items() if text
+        ]
+        self._anchors: Dict[str, List[int]] = {}
+        self._unanchored: List[int] = []
+
+        interior_lines: List[Set[str]] = []
+        line_frequency: Dict[str, int] = {}
+        for _, license_text in self._licenses:
+            lines = set(license_text.split("\n")[1:-1])
+            interior_lines.append(lines)
+            for line in lines:
+                line_frequency[line] = line_frequency.get(line, 0) + 1
+
+        for license_id, lines in enumerate(interior_lines):
+            if not lines:
+                self._unanchored.append(license_id)
+                continue
+            # Rarest line first, then the longest, then lexical for a stable choice
+            anchor = min(lines, key=lambda line: (line_frequency[line], -len(line), line))
+            self._anchors.setdefault(anchor, []).append(license_id)
+
+    def __len__(self) -> int:
+        return len(self._licenses)
+
+    def license(self, license_id: int) -> Tuple[Path, str]:
+        """Return the (license_path, normalized_license_text) pair for an id."""
+        return self._licenses[license_id]
+
+    def _anchor_hits(self, normalized_text: str) -> Set[int]:
+        """Return the ids of all anchored licenses whose anchor line is in normalized_text."""
+        license_ids: Set[int] = set()
+        anchors = self._anchors
+        for line in normalized_text.split("\n"):
+            hits = anchors.get(line)
+            if hits:
+                license_ids.update(hits)
+        return license_ids
+
+    def candidates(self, normalized_text: str) -> List[int]:
+        """
+        Return the ids of all licenses that could be contained in
+        normalized_text, in corpus order.
+        """
+        license_ids = self._anchor_hits(normalized_text)
+        license_ids.update(self._unanchored)
+        return sorted(license_ids)
+
+    def find_matches(self, normalized_text: str) -> List[Tuple[Path, str]]:
+        """
+        Return every (license_path, normalized_license_text) pair whose full
+        text is contained in normalized_text, in corpus order.
+        """
+        matches: List[Tuple[Path, str]] = []
+        for license_id in self.candidates(normalized_text):
+            license_path, license_text = self._licenses[license_id]
+            if license_text in normalized_text:
+                matches.append((license_path, license_text))
+        return matches
+
+
+def regex_license_to_text(regex_text: str) -> str:
+    """
+    Turn a license written by utils.placeholder_to_regex (the files in
+    input/licenses_normalized) back into plain text: placeholders are dropped
+    and regex escapes are removed.
+    """
+    text = _REGEX_PLACEHOLDER_RE.sub(" ", regex_text)
+    return _REGEX_ESCAPE_RE.sub(r"\1", text)
+
+
+def minhash_signature(text: str, shingle_size: int = MINHASH_SHINGLE_SIZE) -> Optional[array]:
+    """
+    Compute a MinHash signature of the lowercase word shingles of text using
+    one-permutation hashing: every shingle is hashed once and lands in one of
+    MINHASH_SIZE bins, and each bin keeps its minimum. Empty bins borrow the
+    value of the next non-empty bin (rotation densification) so that short
+    texts still produce comparable signatures.
+
+    Returns None when text has no shingles.
+    """
+    tokens = _WORD_RE.findall(text.lower())
+    if len(tokens) < shingle_size:
+        return None
+
+    bins: List[Optional[int]] = [None] * MINHASH_SIZE
+    for shingle in shingle_hashes(tokens, shingle_size):
+        mixed = (shingle * _GOLDEN_64) & _MASK_64
+        bin_id = mixed >> _BIN_SHIFT
+        value = mixed & _VALUE_MASK
+        current = bins[bin_id]
+        if current is None or value < current:
+            bins[bin_id] = value
+
+    signature = array("Q")
+    for bin_id in range(MINHASH_SIZE):
+        distance = 0
+        value = bins[bin_id]
+        while value is None:
+            distance += 1
+            value = bins[(bin_id + distance) % MINHASH_SIZE]
+        signature.append(value + distance * (_VALUE_MASK + 1))
+    return signature
+
+
+def _band_key(signature: array, band: int) -> bytes:
+    """Return the LSH bucket key of one band of a signature."""
+    return signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS].tobytes()
+
+
+class LicenseMinHashIndex:
+    """
+    Approximate license identification.
+
+    Every license gets a MinHash signature, and every signature is split into
+    MINHASH_BANDS bands that are stored in LSH buckets. A file is looked up by
+    computing its own signature and collecting the licenses that share at
+    least one band bucket with it, so a lookup only touches the licenses that
+    are likely to be similar instead of the whole corpus. Each candidate is
+    scored with the fraction of equal signature positions, which estimates the
+    Jaccard similarity of the two shingle sets.
+    """
+
+    def __init__(self, license_texts: Dict[Path, str]):
+        # Signatures are kept as unsigned 64-bit arrays and band keys as their
+        # raw bytes, which keeps the index compact and fast to unpickle
+        self._paths: List[Path] = []
+        self._signatures: List[array] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(MINHASH_BANDS)]
+
+        for path, text in license_texts.items():
+            signature = minhash_signature(text)
+            if signature is None:
+                continue
+            license_id = len(self._paths)
+            self._paths.append(path)
+            self._signatures.append(signature)
+            for band, bucket in enumerate(self._buckets):
+                bucket.setdefault(_band_key(signature, band), []).append(license_id)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def find_similar(self, text: str, threshold: float) -> List[Tuple[Path, float]]:
+        """
+        Return (license_path, similarity) for every license whose estimated
+        similarity to text is at least threshold, best match first.
+        """
+        signature = minhash_signature(text)
+        if signature is None:
+            return []
+
+        license_ids: Set[int] = set()
+        for band, bucket in enumerate(self._buckets):
+            hits = bucket.get(_band_key(signature, band))
+            if hits:
+                license_ids.update(hits)
+
+        similar: List[Tuple[Path, float]] = []
+        for license_id in sorted(license_ids):
+            license_signature = self._signatures[license_id]
+            equal = sum(1 for a, b in zip(signature, license_signature) if a == b)
+            similarity = equal / MINHASH_SIZE
+            if similarity >= threshold:
+                similar.append((self._paths[license_id], similarity))
+
+        similar.sort(key=lambda match: -match[1])
+        return similar
@@ -2,8 +2,9 @@
 import os
 from pathlib import Path
 from typing import Dict, List
-from assessment.scanner import utils
+from assessment.scanner import content_type, utils, license_index, rule_pack, pipeline
 from configuration import Configuration as Config
+from models.FileData import FileData
 
 
 def load_license_texts(license_dirs: List[Path]) -> Dict[Path, str]:
@@ -49,6 +50,34 @@ def load_license_texts(license_dirs: List[Path]) -> Dict[Path, str]:
     return licenses
 
 
+def build_license_index() -> license_index.LicenseAnchorIndex:
+    """
+    Build the exact-match index from the license texts in input/licenses and
+    input/manual_licenses, normalized the same way file texts are.
+    """
+    licenses = load_license_texts(Config.all_licenses_dir)
+
+    # Pre-normalize all patterns once
+    normalized_licenses: Dict[Path, str] = {
+        path: utils.normalize_without_empty_lines_and_dates(text)
+        for path, text in licenses.items()
+    }
+    return license_index.LicenseAnchorIndex(normalized_licenses)
+
+
+def build_license_similarity_index() -> license_index.LicenseMinHashIndex:
+    """
+    Build the MinHash/LSH index used for approximate license matching from the
+    regex-normalized license texts (input/licenses_normalized and the manual
+    equivalent).
+    """
+    normalized_licenses = load_license_texts(Config.all_licenses_normalized_dir)
+    return license_index.LicenseMinHashIndex({
+        path: license_index.regex_license_to_text(text)
+        for path, text in normalized_licenses.items()
+    })
+
+
 def search_full_license_text_in_files():
     """
     For each pattern (full text from a pattern file), check whether it
@@ -62,27 +91,39 @@ def search_full_license_text_in_files():
 
     Only patterns actually found in at least one file will have
     non-empty lists. Patterns with no matches will have an empty list.
-    """
-
-    licenses = load_license_texts(Config.all_licenses_dir)
 
-    # Pre-normalize all patterns once
-    normalized_licenses: Dict[Path, str] = {
-        path: utils.normalize_without_empty_lines_and_dates(text)
-        for path, text in licenses.items()
-    }
+    When FUZZY_LICENSE_MATCH is enabled, text files without an exact match
+    (and with at most FUZZY_LICENSE_MAX_SIZE characters of normalized text)
+    get a list of (license_name, similarity) pairs for every license whose
+    estimated similarity is at least FUZZY_LICENSE_THRESHOLD.
+    """
 
-    # Iterate over all files you've already read into FileData
     for file_data in Config.file_data_manager.get_all_file_data():
-        file_text = utils.to_text(file_data.file_content)
-        normalized_file_text = utils.normalize_without_empty_lines_and_dates(file_text)
-        license_matches = Dict[str, str]
-
-        for license_path, license_text in normalized_licenses.items():
-            # Full-text match: we look for the entire content of the pattern file
-            # inside the file's text. Leading/trailing whitespace of the pattern
-            # has already been stripped.
-            if license_text and license_text in normalized_file_text:
-                license_name = utils.get_file_name_from_path_without_extension(license_path)
-                license_matches = {"License_name": license_name, "License_text": license_text}
-                file_data.license_matches = license_matches
\ No newline at end of file
+        license_stage(file_data, pipeline.FileViews(file_data))
+
+
+@pipeline.stage("license", content_types=(content_type.TEXT, content_type.BINARY))
+def license_stage(file_data: FileData, views: pipeline.FileViews) -> None:
+    """Search a single file for full license texts (see search_full_license_text_in_files)."""
+    # Both indexes come prebuilt from the compiled rule pack
+    pack = rule_pack.get_rule_pack()
+    normalized_file_text = views.normalized_text
+
+    # Full-text match: the index only returns licenses whose entire
+    # normalized text is contained in the file's normalized text.
+    for license_path, license_text in pack.licenses.find_matches(normalized_file_text):
+        license_name = utils.get_file_name_from_path_without_extension(license_path)
+        license_matches = {"License_name": license_name, "License_text": license_text}
+        file_data.license_matches = license_matches
+
+    # Approximate match: only for text files without an exact match, e.g. a
+    # LICENSE file whose paragraphs were reflowed. A text much longer than
+    # any license is not one, and MinHashing it is pure Python.
+    if Config.fuzzy_license_match and not file_data.license_matches and isinstance(views.content, str) \
+            and len(normalized_file_text) <= Config.fuzzy_license_max_size:
+        similar_licenses = pack.license_similarity.find_similar(normalized_file_text, Config.fuzzy_license_threshold)
+        if similar_licenses:
+            file_data.license_similarity = [
+                (utils.get_file_name_from_path_without_extension(license_path), round(similarity, 3))
+                for license_path, similarity in similar_licenses
+            ]
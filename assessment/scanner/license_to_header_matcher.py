@@ -2,8 +2,7 @@ import os
 import re
 from pathlib import Path
 from typing import Dict, List
-from assessment.scanner import utils
-from input import license_header_keys
+from assessment.scanner import content_type, utils, rule_pack, pipeline
 from configuration import Configuration as Config
 
 
@@ -118,32 +117,46 @@ def load_normalized_license_header_texts(normalized_license_header_dirs: List[Pa
 
 
 
+def match_header_to_license(file_data) -> None:
+    """Name the license a file's detected header refers to, if any."""
+    if not file_data.file_header:
+        return
+
+    # Identifier tables come from the rule pack already lowercased
+    header_keys = rule_pack.get_rule_pack().header_keys
+    file_header = str(file_data.file_header).lower()
+    for license_name, license_identifiers in header_keys["dual_license_keys"].items():
+        if all(identifier in file_header for identifier in license_identifiers):
+            file_data.header_is_license = True
+            file_data.license_name = license_name
+            break
+    if not file_data.license_name:
+        for license_name, license_identifiers in header_keys["multi_license_keys"].items():
+            if any(identifier in file_header for identifier in license_identifiers):
+                file_data.header_is_license = True
+                file_data.license_name = license_name
+                break
+    if not file_data.license_name:
+        for license_name, license_identifiers in header_keys["multi_license_inclusive_keys"].items():
+            if all(identifier in file_header for identifier in license_identifiers):
+                file_data.header_is_license = True
+                file_data.license_name = license_name
+                break
+    if not file_data.license_name:
+        for license_name, license_identifier in header_keys["license_keys"].items():
+            if license_identifier in file_header:
+                file_data.header_is_license = True
+                file_data.license_name = license_name
+
+
+@pipeline.stage("header_license", depends_on=("header",), content_types=(content_type.TEXT,))
+def header_license_stage(file_data, views):
+    match_header_to_license(file_data)
+
+
 def search_file_data_headers_for_licenses():
     for file_data in Config.file_data_manager.get_all_file_data():
-        if file_data.file_header:
-            file_header = str(file_data.file_header).lower()
-            for license_name, license_identifiers in license_header_keys.dual_license_keys.items():
-                if all(identifier.lower() in file_header for identifier in license_identifiers):
-                    file_data.header_is_license = True
-                    file_data.license_name = license_name
-                    break
-            if not file_data.license_name:
-                for license_name, license_identifiers in license_header_keys.multi_license_keys.items():
-                    if any(identifier.lower() in file_header for identifier in license_identifiers):
-                        file_data.header_is_license = True
-                        file_data.license_name = license_name
-                        break
-            if not file_data.license_name:
-                for license_name, license_identifiers in license_header_keys.multi_license_inclusive_keys.items():
-                    if all(identifier.lower() in file_header for identifier in license_identifiers):
-                        file_data.header_is_license = True
-                        file_data.license_name = license_name
-                        break
-            if not file_data.license_name:
-                for license_name, license_identifier in license_header_keys.license_keys.items():
-                    if license_identifier.lower() in file_header:
-                        file_data.header_is_license = True
-                        file_data.license_name = license_name
+        match_header_to_license(file_data)
 
 
 
@@ -151,7 +164,7 @@ def search_file_data_headers_for_licenses():
 
 
 def search_file_data_headers_for_licenses2():
-    normalized_license_headers = load_normalized_license_header_texts(Config.all_license_headers_normalized_dir)
+    normalized_license_headers = rule_pack.get_rule_pack().license_headers_normalized
 
     for file_data in Config.file_data_manager.get_all_file_data():
         if file_data.file_header:
@@ -0,0 +1,105 @@
+# parallel_scan.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from configuration import Configuration as Config
+from models.FileData import FileData
+from assessment.review import file_gen
+# The scanner modules are imported for their @pipeline.stage registrations,
+# which worker processes need as well
+from assessment.scanner import (pipeline, file_reader, file_release_search, hash_reader, license_search,
+                                header_search, license_to_header_matcher, keyword_search, rule_pack)
+
+# FileData attributes a worker sends back for every scanned file
+RESULT_FIELDS = (
+    "file_header",
+    "keyword_matches",
+    "license_matches",
+    "license_similarity",
+    "header_is_license",
+    "license_name",
+    "is_released",
+    "file_hash",
+)
+
+# (file_path, (value for each RESULT_FIELDS entry))
+ResultRecord = Tuple[Path, Tuple[Any, ...]]
+
+# Stages resolved once per worker process by init_worker
+_worker_stages: Optional[List[pipeline.Stage]] = None
+
+
+def get_worker_count() -> int:
+    """SCAN_WORKERS from app-config.properties; 0 means one worker per CPU."""
+    return Config.scan_workers if Config.scan_workers > 0 else (os.cpu_count() or 1)
+
+
+def init_worker() -> None:
+    """Process pool initializer: resolve the pipeline stages once per worker."""
+    global _worker_stages
+    _worker_stages = pipeline.ordered_stages()
+
+
+def scan_shard(file_paths: List[Path]) -> List[ResultRecord]:
+    """
+    Worker entry point: read and scan every file of a shard and return one
+    compact result record per file.
+    """
+    results: List[ResultRecord] = []
+    for file_path in file_paths:
+        file_data = file_reader.read_file(file_path)
+        if file_data is None:
+            continue
+        pipeline.run_stages_on_file(file_data, _worker_stages)
+        results.append((file_path, tuple(getattr(file_data, field) for field in RESULT_FIELDS)))
+    return results
+
+
+def scan_member_shard(members: List[Tuple[Path, bytes]], review_root: Path) -> List[ResultRecord]:
+    """
+    Worker entry point for direct-scan mode: scan in-memory file contents and
+    write the files that need review under Config.review_file_dir.
+    """
+    results: List[ResultRecord] = []
+    for file_path, content in members:
+        file_data = file_reader.file_data_from_bytes(file_path, content)
+        pipeline.run_stages_on_file(file_data, _worker_stages)
+        file_gen.write_review_file(file_data, content, review_root)
+        results.append((file_path, tuple(getattr(file_data, field) for field in RESULT_FIELDS)))
+    return results
+
+
+def merge_result(file_data: FileData, values: Tuple[Any, ...]) -> None:
+    """Copy a worker's result record onto the FileData in this process."""
+    for field, value in zip(RESULT_FIELDS, values):
+        setattr(file_data, field, value)
+
+
+def scan_all_files(workers: Optional[int] = None, shard_size: Optional[int] = None) -> None:
+    """
+    Run every pipeline stage on every file in Config.file_data_manager.
+
+    With one worker this is the in-process fused pipeline. With more, the
+    files are cut into fixed-size shards in FileDataManager order and scanned
+    by a process pool. Each result only depends on its own file, and results
+    are merged back by path, so the output is the same for any worker count.
+    """
+    workers = get_worker_count() if workers is None else workers
+    shard_size = Config.scan_shard_size if shard_size is None else shard_size
+
+    if workers <= 1:
+        pipeline.run_all_stages()
+        return
+
+    # Loaded (and rebuilt if stale) here first, so the workers find an
+    # up-to-date pack instead of all rebuilding it at once
+    rule_pack.get_rule_pack()
+
+    file_paths = [file_data.file_path for file_data in Config.file_data_manager.get_all_file_data()]
+    shards = [file_paths[i:i + shard_size] for i in range(0, len(file_paths), shard_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        for shard_results in executor.map(scan_shard, shards):
+            for file_path, values in shard_results:
+                merge_result(Config.file_data_manager.get_file_data(file_path), values)
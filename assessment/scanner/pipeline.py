@@ -0,0 +1,155 @@
+# pipeline.py
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+from assessment.scanner import class_reader, content_type, utils
+from configuration import Configuration as Config
+from models.FileData import FileData
+
+
+class FileViews:
+    """
+    Derived views of one file's content, computed on first use and shared by
+    every stage that runs on the file, so the text is decoded, lowercased and
+    normalized at most once per file.
+    """
+
+    def __init__(self, file_data: FileData):
+        self.file_data = file_data
+        self._content: Optional[Union[str, bytes]] = None
+        self._content_type: Optional[str] = None
+        self._text: Optional[str] = None
+        self._text_lower: Optional[str] = None
+        self._normalized_text: Optional[str] = None
+
+    @property
+    def content(self) -> Union[str, bytes]:
+        """The file's content, loaded once per pass even when it is too large to stay cached."""
+        if self._content is None:
+            self._content = self.file_data.file_content
+        return self._content
+
+    @property
+    def content_type(self) -> str:
+        """
+        content_type.TEXT, BINARY or MEDIA, sniffed from the start of the
+        file without loading all of it. Everything is text without
+        CONTENT_ROUTING.
+        """
+        if self._content_type is None:
+            if not Config.content_routing:
+                self._content_type = content_type.TEXT
+            else:
+                prefix = self.file_data.read_prefix(content_type.SNIFF_SIZE)
+                self._content_type = content_type.sniff(prefix) if prefix is not None else content_type.TEXT
+        return self._content_type
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            content = self.content
+            if isinstance(content, bytes):
+                if Config.scan_class_constants and class_reader.is_class_file(content):
+                    # A compiled class is scanned by its constant pool strings, one per line
+                    self._text = class_reader.class_text(content)
+                if self._text is None and self.content_type == content_type.BINARY:
+                    # Other binaries by the strings in them, one per line
+                    self._text = "\n".join(content_type.extract_strings(content))
+                elif self._text is None:
+                    self._text = content_type.decode_text(content)
+            else:
+                self._text = utils.to_text(content)
+        return self._text
+
+    @property
+    def text_lower(self) -> str:
+        if self._text_lower is None:
+            self._text_lower = self.text.lower()
+        return self._text_lower
+
+    @property
+    def normalized_text(self) -> str:
+        if self._normalized_text is None:
+            self._normalized_text = utils.normalize_without_empty_lines_and_dates(self.text)
+        return self._normalized_text
+
+
+StageFunc = Callable[[FileData, FileViews], None]
+
+
+class Stage:
+    def __init__(self, name: str, func: StageFunc, depends_on: Sequence[str] = (),
+                 content_types: Sequence[str] = content_type.ALL_TYPES):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.content_types = tuple(content_types)
+
+
+# Registered stages, in registration order
+_stages: Dict[str, Stage] = {}
+
+
+def stage(name: str, depends_on: Sequence[str] = (),
+          content_types: Sequence[str] = content_type.ALL_TYPES) -> Callable[[StageFunc], StageFunc]:
+    """
+    Decorator registering a per-file scanner stage. depends_on names the
+    stages whose results this stage reads; they always run first on a file.
+    content_types are the content types (see FileViews.content_type) of the
+    files the stage runs on; it should not take one its dependencies skip.
+    """
+    def register(func: StageFunc) -> StageFunc:
+        if name in _stages:
+            raise ValueError(f"Pipeline stage already registered: {name}")
+        _stages[name] = Stage(name, func, depends_on, content_types)
+        return func
+
+    return register
+
+
+def ordered_stages(names: Optional[Iterable[str]] = None) -> List[Stage]:
+    """
+    Return the requested stages (default: all registered stages) plus their
+    dependencies, ordered so every stage comes after the stages it depends
+    on. Independent stages keep their registration order.
+    """
+    wanted = list(_stages) if names is None else list(names)
+    ordered: List[Stage] = []
+    visiting = set()
+    done = set()
+
+    def visit(stage_name: str) -> None:
+        if stage_name in done:
+            return
+        if stage_name in visiting:
+            raise ValueError(f"Pipeline stage dependency cycle at: {stage_name}")
+        if stage_name not in _stages:
+            raise ValueError(f"Unknown pipeline stage: {stage_name}")
+        visiting.add(stage_name)
+        for dependency in _stages[stage_name].depends_on:
+            visit(dependency)
+        visiting.discard(stage_name)
+        done.add(stage_name)
+        ordered.append(_stages[stage_name])
+
+    for stage_name in wanted:
+        visit(stage_name)
+    return ordered
+
+
+def run_stages_on_file(file_data: FileData, stages: List[Stage]) -> None:
+    """Run stages, in order, on a single file while its views are hot, skipping those not for its content type."""
+    views = FileViews(file_data)
+    for pipeline_stage in stages:
+        if pipeline_stage.content_types != content_type.ALL_TYPES and \
+                views.content_type not in pipeline_stage.content_types:
+            continue
+        pipeline_stage.func(file_data, views)
+
+
+def run_all_stages(names: Optional[Iterable[str]] = None) -> None:
+    """
+    Visit every FileData once and run all requested stages on it, instead of
+    one pass over all files per scanner.
+    """
+    stages = ordered_stages(names)
+    for file_data in Config.file_data_manager.get_all_file_data():
+        run_stages_on_file(file_data, stages)
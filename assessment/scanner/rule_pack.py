@@ -0,0 +1,262 @@
+# rule_pack.py
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from assessment.scanner import license_index
+from configuration import Configuration as Config
+from input import license_header_keys, file_search_strings
+
+# Bump whenever the payload layout changes. Changes to the code that builds
+# the pack are picked up on their own because its modules are inputs too.
+RULE_PACK_VERSION = 1
+
+# Modules next to this one whose code shapes the pickled payload: the pack
+# itself, the scanners' build functions, the indexes and the normalization
+_BUILD_MODULES = ("rule_pack.py", "license_index.py", "license_search.py", "license_to_header_matcher.py",
+                  "keyword_search.py", "utils.py")
+
+_MAGIC = b"SLARULES"
+# magic, version, manifest length, payload length
+_HEADER = struct.Struct("<8sIQQ")
+
+# Module-level cache so every scanner in a run shares one loaded pack
+_rule_pack: Optional["RulePack"] = None
+
+
+class RulePack:
+    """
+    Everything the scanners derive from the input/ rule files, compiled once:
+
+      - licenses:                  LicenseAnchorIndex over the normalized license texts
+      - license_similarity:        LicenseMinHashIndex over input/licenses_normalized
+      - license_headers_normalized: { header_path: regex-normalized header text }
+      - header_keys:               license_header_keys tables with lowercased identifiers
+      - keywords:                  { category: [(term, term_lower), ...] }
+    """
+
+    def __init__(self, licenses, license_similarity, license_headers_normalized, header_keys, keywords):
+        self.licenses: license_index.LicenseAnchorIndex = licenses
+        self.license_similarity: license_index.LicenseMinHashIndex = license_similarity
+        self.license_headers_normalized: Dict[Path, str] = license_headers_normalized
+        self.header_keys: Dict[str, Dict[str, Union[str, List[str]]]] = header_keys
+        self.keywords: Dict[str, List[Tuple[str, str]]] = keywords
+
+
+def get_input_files() -> List[Path]:
+    """
+    Return every input file the rule pack is compiled from, in a stable
+    order: the rule files and the modules that turn them into the pack.
+    """
+    input_files: List[Path] = []
+    input_dirs = (Config.all_licenses_dir + Config.all_licenses_normalized_dir +
+                  Config.all_license_headers_dir + Config.all_license_headers_normalized_dir)
+    for base_dir in input_dirs:
+        if not os.path.isdir(base_dir):
+            continue
+        for dirpath, dirnames, filenames in os.walk(base_dir):
+            for filename in filenames:
+                if filename.lower().endswith(".txt"):
+                    input_files.append(Path(dirpath, filename))
+
+    input_files.append(Path(license_header_keys.__file__).resolve())
+    input_files.append(Path(file_search_strings.__file__).resolve())
+    scanner_dir = Path(__file__).resolve().parent
+    input_files.extend(scanner_dir / module for module in _BUILD_MODULES)
+    return sorted(input_files)
+
+
+def hash_file(file_path: Path) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _build_manifest(input_files: List[Path], previous: Optional[Dict] = None) -> Dict:
+    """
+    Fingerprint every input file by size, mtime and SHA-256. Hashes from a
+    previous manifest are reused for files whose size and mtime are unchanged.
+    """
+    previous_files = previous["files"] if previous else {}
+    files: Dict[str, List] = {}
+    for input_file in input_files:
+        stat = input_file.stat()
+        known = previous_files.get(str(input_file))
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            digest = known[2]
+        else:
+            digest = hash_file(input_file)
+        files[str(input_file)] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    return {
+        "version": RULE_PACK_VERSION,
+        "python": sys.version_info[:2],
+        "files": files,
+    }
+
+
+def _is_stale(manifest: Dict, input_files: List[Path]) -> Tuple[bool, bool]:
+    """
+    Compare a stored manifest with the current inputs.
+
+    Returns (stale, touched): stale means an input was added, removed or has
+    different content; touched means only mtimes moved while the content
+    hashes still match, so the manifest should be refreshed.
+    """
+    if manifest.get("version") != RULE_PACK_VERSION or tuple(manifest.get("python", ())) != sys.version_info[:2]:
+        return True, False
+
+    stored_files = manifest.get("files", {})
+    if set(stored_files) != {str(input_file) for input_file in input_files}:
+        return True, False
+
+    touched = False
+    for input_file in input_files:
+        size, mtime_ns, digest = stored_files[str(input_file)]
+        stat = input_file.stat()
+        if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+            continue
+        if stat.st_size != size or hash_file(input_file) != digest:
+            return True, False
+        touched = True
+
+    return False, touched
+
+
+def compile_rule_pack() -> RulePack:
+    """Read, normalize and index every rule input file."""
+    # Imported here because these scanners load the rule pack themselves
+    from assessment.scanner import license_search, license_to_header_matcher, keyword_search
+
+    license_headers_normalized = license_to_header_matcher.load_normalized_license_header_texts(
+        Config.all_license_headers_normalized_dir)
+
+    header_keys = {
+        "dual_license_keys": {
+            name: [identifier.lower() for identifier in identifiers]
+            for name, identifiers in license_header_keys.dual_license_keys.items()
+        },
+        "multi_license_keys": {
+            name: [identifier.lower() for identifier in identifiers]
+            for name, identifiers in license_header_keys.multi_license_keys.items()
+        },
+        "multi_license_inclusive_keys": {
+            name: [identifier.lower() for identifier in identifiers]
+            for name, identifiers in license_header_keys.multi_license_inclusive_keys.items()
+        },
+        "license_keys": {
+            name: identifier.lower()
+            for name, identifier in license_header_keys.license_keys.items()
+        },
+    }
+
+    keywords = {category: [(term, term.lower()) for term in terms] for category, terms in
+                keyword_search.ALL_MATCH_LISTS.items()}
+
+    return RulePack(
+        licenses=license_search.build_license_index(),
+        license_similarity=license_search.build_license_similarity_index(),
+        license_headers_normalized=license_headers_normalized,
+        header_keys=header_keys,
+        keywords=keywords,
+    )
+
+
+def _write_pack_file(pack_path: Path, manifest: Dict, payload: bytes) -> None:
+    """
+    Atomically write header, manifest and payload to pack_path. Every writer
+    gets its own temporary file, so processes rebuilding the pack at the same
+    time cannot collide; the last one to finish wins.
+    """
+    manifest_bytes = json.dumps(manifest).encode("utf-8")
+    pack_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=pack_path.parent, prefix=pack_path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, RULE_PACK_VERSION, len(manifest_bytes), len(payload)))
+            f.write(manifest_bytes)
+            f.write(payload)
+        os.replace(tmp_path, pack_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_rule_pack(pack_path: Path) -> RulePack:
+    """Compile the rule inputs and write them to pack_path."""
+    input_files = get_input_files()
+    rule_pack = compile_rule_pack()
+    payload = pickle.dumps(rule_pack, protocol=pickle.HIGHEST_PROTOCOL)
+    _write_pack_file(pack_path, _build_manifest(input_files), payload)
+    print(f"Built rule pack {pack_path} from {len(input_files)} input files")
+    return rule_pack
+
+
+def _read_pack(pack_path: Path, input_files: List[Path]) -> Optional[Tuple[RulePack, Dict, Optional[bytes]]]:
+    """
+    Read the pack at pack_path: its RulePack, its manifest and, when only
+    input mtimes moved, its payload for rewriting under a refreshed
+    manifest. Returns None if the pack is from another version or stale.
+
+    The file and its mapping are closed when this returns, so the pack can
+    be replaced (Windows cannot replace a mapped file).
+    """
+    with open(pack_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        magic, version, manifest_len, payload_len = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != RULE_PACK_VERSION:
+            return None
+
+        manifest_start = _HEADER.size
+        payload_start = manifest_start + manifest_len
+        manifest = json.loads(bytes(mm[manifest_start:payload_start]))
+        stale, touched = _is_stale(manifest, input_files)
+        if stale:
+            return None
+
+        # Both views are released even if unpickling fails; the mapping
+        # cannot be closed while one is left
+        with memoryview(mm) as view, view[payload_start:payload_start + payload_len] as payload_view:
+            rule_pack = pickle.loads(payload_view)
+            # Same content under new mtimes: refresh the manifest only
+            payload = bytes(payload_view) if touched else None
+    return rule_pack, manifest, payload
+
+
+def load_rule_pack(pack_path: Path) -> RulePack:
+    """
+    Memory-map pack_path and return its RulePack. The pack is rebuilt when it
+    is missing, unreadable, from another version, or when any input file was
+    added, removed or changed content since it was built.
+    """
+    input_files = get_input_files()
+
+    try:
+        loaded = _read_pack(pack_path, input_files)
+    # ImportError, AttributeError and TypeError come from unpickling classes
+    # that were moved, renamed or changed since the pack was built
+    except (OSError, ValueError, struct.error, pickle.UnpicklingError, EOFError, AttributeError, BufferError,
+            ImportError, TypeError) as e:
+        if pack_path.exists():
+            print(f"Could not load rule pack {pack_path}: {e}")
+        loaded = None
+    if loaded is None:
+        return build_rule_pack(pack_path)
+
+    rule_pack, manifest, payload = loaded
+    if payload is not None:
+        _write_pack_file(pack_path, _build_manifest(input_files, manifest), payload)
+
+    return rule_pack
+
+
+def get_rule_pack() -> RulePack:
+    """Return the rule pack for this run, loading (or rebuilding) it on first use."""
+    global _rule_pack
+    if _rule_pack is None:
+        _rule_pack = load_rule_pack(Config.rule_pack_path)
+    return _rule_pack
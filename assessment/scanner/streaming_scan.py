@@ -0,0 +1,275 @@
+# streaming_scan.py
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, List, Optional, Tuple
+from assessment.creator2 import extractor, member_reader
+from assessment.review import file_gen
+from assessment.scanner import file_reader, parallel_scan, pipeline, rule_pack, utils
+from configuration import Configuration as Config
+from models.FileData import FileData
+
+# Put on the queue by the producer thread once it has finished
+_DONE = object()
+
+# Seconds a blocked put waits before it checks whether to stop
+_PUT_POLL_INTERVAL = 0.1
+
+
+class _Stopped(Exception):
+    """Raised by a producer's put() once the scanners have stopped taking files."""
+
+
+class _ContentBudget:
+    """
+    Bytes of member content held on the scanning side in direct-scan mode:
+    queued, in the shard being filled, or in a shard a worker has not
+    finished yet. A member larger than max_bytes is let in once nothing
+    else is held.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int, timeout: float) -> bool:
+        """Take size bytes, waiting up to timeout for room. Returns False if there was none."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: not self.used or self.used + size <= self.max_bytes, timeout):
+                return False
+            self.used += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class _ProducerThread(threading.Thread):
+    """
+    Runs produce(put), which puts every finished file on file_queue. The
+    queue is bounded, so the producer waits whenever the scanners fall behind
+    instead of filling the disk (or memory) far ahead of them. With a
+    budget, (path, content) members also wait for room in it.
+
+    Once stop() is called, put() raises _Stopped, so a scanner error or
+    Ctrl-C abandons extraction at the next file instead of after all of it.
+    """
+
+    def __init__(self, produce: Callable[[Callable[[Any], None]], None], file_queue: "queue.Queue",
+                 budget: Optional[_ContentBudget] = None):
+        super().__init__(name="extraction", daemon=True)
+        self.produce = produce
+        self.file_queue = file_queue
+        self.budget = budget
+        self.error: Optional[BaseException] = None
+        self._stop_event = threading.Event()
+
+    def put(self, item: Any) -> None:
+        if self.budget is not None and item is not _DONE:
+            while not self.budget.acquire(len(item[1]), _PUT_POLL_INTERVAL):
+                if self._stop_event.is_set():
+                    raise _Stopped()
+        while not self._stop_event.is_set():
+            try:
+                self.file_queue.put(item, timeout=_PUT_POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+        raise _Stopped()
+
+    def run(self) -> None:
+        try:
+            self.produce(self.put)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self.error = e
+        finally:
+            try:
+                self.put(_DONE)
+            except _Stopped:
+                pass
+
+    def stop(self) -> None:
+        """Make put() raise _Stopped and wait for produce() to give up."""
+        self._stop_event.set()
+        self.join()
+
+
+def _iter_queue(file_queue: "queue.Queue", scan_root: Path, direct: bool, budget: Optional[_ContentBudget],
+                on_idle: Optional[Callable[[], None]] = None):
+    """
+    Yield the queued files under scan_root until the producer is done: resolved
+    paths, or (path, content) members in direct-scan mode. on_idle is called
+    whenever the queue runs empty, before waiting for the next file.
+    """
+    while True:
+        try:
+            item = file_queue.get_nowait()
+        except queue.Empty:
+            if on_idle is not None:
+                on_idle()
+            item = file_queue.get()
+        if item is _DONE:
+            return
+        if direct:
+            file_path = item[0]
+        else:
+            item = file_path = Path(item).resolve()
+        if file_path.is_relative_to(scan_root):
+            yield item
+        elif budget is not None:
+            budget.release(len(item[1]))
+
+
+def _scan_in_process(file_queue: "queue.Queue", scan_root: Path, direct: bool,
+                     budget: Optional[_ContentBudget]) -> None:
+    stages = pipeline.ordered_stages()
+    for item in _iter_queue(file_queue, scan_root, direct, budget):
+        if direct:
+            file_path, content = item
+            file_data = file_reader.file_data_from_bytes(file_path, content)
+        else:
+            file_data = file_reader.read_file(item)
+            if file_data is None:
+                continue
+        Config.file_data_manager.add_file_data(file_data)
+        pipeline.run_stages_on_file(file_data, stages)
+        if direct:
+            file_gen.write_review_file(file_data, content, scan_root)
+            budget.release(len(content))
+
+
+def _merge_shard(future: "Future", shard: List[Path]) -> None:
+    """
+    Merge a finished shard into FileDataManager. Files the worker could not
+    read have no result record, and their placeholder is dropped.
+    """
+    scanned = set()
+    for file_path, values in future.result():
+        parallel_scan.merge_result(Config.file_data_manager.get_file_data(file_path), values)
+        scanned.add(file_path)
+    for file_path in shard:
+        if file_path not in scanned:
+            Config.file_data_manager.remove_file_data(file_path)
+
+
+def _scan_with_pool(file_queue: "queue.Queue", scan_root: Path, direct: bool, budget: Optional[_ContentBudget],
+                    workers: int, shard_size: int) -> None:
+    # Bounded like the file queue: once this many shards are queued or
+    # running, the oldest is merged before another one is submitted. In
+    # direct-scan mode, a shard's contents count against the budget until
+    # its worker is done with them.
+    max_in_flight = workers * 2
+    in_flight: Deque[Tuple["Future", List[Path]]] = deque()
+    # Loaded before the pool starts, as in parallel_scan.scan_all_files()
+    rule_pack.get_rule_pack()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=parallel_scan.init_worker) as executor:
+        def submit(shard: List) -> None:
+            while len(in_flight) >= max_in_flight:
+                _merge_shard(*in_flight.popleft())
+            if direct:
+                future = executor.submit(parallel_scan.scan_member_shard, shard, scan_root)
+                shard_bytes = sum(len(content) for _, content in shard)
+                future.add_done_callback(lambda _: budget.release(shard_bytes))
+                in_flight.append((future, [file_path for file_path, _ in shard]))
+            else:
+                in_flight.append((executor.submit(parallel_scan.scan_shard, shard), shard))
+
+        shard: List = []
+
+        def flush() -> None:
+            # Contents held in a part-filled shard could otherwise keep the
+            # producer waiting for budget while this waits for the producer
+            nonlocal shard
+            if shard:
+                submit(shard)
+                shard = []
+
+        for item in _iter_queue(file_queue, scan_root, direct, budget, flush if direct else None):
+            file_path = item[0] if direct else item
+            # Registered now so FileDataManager keeps extraction order; the
+            # content is only read by the worker
+            Config.file_data_manager.add_file_data(
+                FileData(file_path, None, utils.get_file_extension(file_path)))
+            shard.append(item)
+            if len(shard) >= shard_size:
+                submit(shard)
+                shard = []
+        if shard:
+            submit(shard)
+
+        while in_flight:
+            _merge_shard(*in_flight.popleft())
+
+
+def _produce_and_scan(produce: Callable[[Callable[[Any], None]], None], scan_root: Path, direct: bool,
+                      workers: Optional[int], shard_size: Optional[int]) -> None:
+    workers = parallel_scan.get_worker_count() if workers is None else workers
+    shard_size = Config.scan_shard_size if shard_size is None else shard_size
+    scan_root = scan_root.resolve()
+
+    file_queue: "queue.Queue" = queue.Queue(maxsize=Config.scan_queue_size)
+    budget = _ContentBudget(Config.scan_queue_bytes) if direct else None
+    producer = _ProducerThread(produce, file_queue, budget)
+    producer.start()
+
+    try:
+        if workers <= 1:
+            _scan_in_process(file_queue, scan_root, direct, budget)
+        else:
+            _scan_with_pool(file_queue, scan_root, direct, budget, workers, shard_size)
+    finally:
+        # Once the scanners are done this returns at once; if they failed,
+        # the producer is stopped at its next file
+        producer.stop()
+
+    if producer.error is not None:
+        raise producer.error
+
+
+def extract_and_scan(source_dir: Path, dest_dir: Path, scan_root: Path,
+                     workers: Optional[int] = None, shard_size: Optional[int] = None) -> None:
+    """
+    Extract source_dir into dest_dir and scan the extracted files under
+    scan_root while extraction is still running.
+
+    Extraction runs on its own thread and hands each finished file to the
+    scanners through a queue of SCAN_QUEUE_SIZE entries. Files are scanned in
+    this process, or in shards of shard_size by a pool of workers when there
+    is more than one. The results are the same as extracting everything first
+    and then calling parallel_scan.scan_all_files().
+    """
+    def produce(put: Callable[[Path], None]) -> None:
+        extractor.main(source_dir, dest_dir, on_file=put)
+
+    _produce_and_scan(produce, scan_root, False, workers, shard_size)
+
+
+def scan_in_memory(source_dir: Path, dest_dir: Path, scan_root: Path,
+                   workers: Optional[int] = None, shard_size: Optional[int] = None) -> None:
+    """
+    Direct-scan mode: scan the files of source_dir straight out of their
+    archives, without extracting anything to dest_dir.
+
+    Files keep the paths extraction would have given them, so FileData and
+    the CSV look the same as in the other modes. The member contents waiting
+    for or being scanned are kept under SCAN_QUEUE_BYTES. Only the files under
+    scan_root that need review are written, to the review directory, in
+    place of file_gen.copy_unresolved_files().
+    """
+    def produce(put: Callable[[member_reader.ArchiveMember], None]) -> None:
+        for member in member_reader.iter_members(source_dir, dest_dir):
+            put(member)
+
+    _produce_and_scan(produce, scan_root, True, workers, shard_size)
+
+    review_file_count = sum(1 for file_data in Config.file_data_manager.get_all_file_data()
+                            if file_gen.needs_review(file_data))
+    print(f"Review file count: {review_file_count}")
@@ -0,0 +1,15 @@
+from assessment.scanner import rule_pack
+from configuration import Configuration as Config
+from pathlib import Path
+
+p = Path(__file__).resolve()
+
+
+def main(pack_path) -> None:
+    rule_pack.build_rule_pack(pack_path)
+
+
+if __name__ == "__main__":
+    # Scanners rebuild the pack on their own when an input changes; run this to
+    # build it ahead of time (e.g. after downloading new SPDX licenses)
+    main(Config.rule_pack_path)
@@ -2,7 +2,7 @@ import os
 from jproperties import Properties
 from dotenv import load_dotenv
 from pathlib import Path
-from models.FileData import FileDataManager
+from models.FileData import ContentCache, FileDataManager
 
 p = Path(__file__).resolve()
 
@@ -33,8 +33,45 @@ class Configuration:
     all_license_headers_dir = [license_headers_dir, manual_license_headers_dir]
     all_license_headers_normalized_dir = [license_headers_normalized_dir, manual_license_headers_normalized_dir]
     project_name = configs.get("PROJECT_NAME").data
+    rule_pack_path = Path(configs.get("RULE_PACK_PATH").data).resolve()
+    scan_workers = int(configs.get("SCAN_WORKERS").data)
+    scan_shard_size = int(configs.get("SCAN_SHARD_SIZE").data)
+    inventory_workers = int(configs.get("INVENTORY_WORKERS").data)
+    fuzzy_license_match = configs.get("FUZZY_LICENSE_MATCH").data.strip().lower() == "true"
+    fuzzy_license_threshold = float(configs.get("FUZZY_LICENSE_THRESHOLD").data)
+    fuzzy_license_max_size = int(configs.get("FUZZY_LICENSE_MAX_SIZE").data)
+    scan_class_constants = configs.get("SCAN_CLASS_CONSTANTS").data.strip().lower() == "true"
+    content_routing = configs.get("CONTENT_ROUTING").data.strip().lower() == "true"
+    prefer_sources_jars = configs.get("PREFER_SOURCES_JARS").data.strip().lower() == "true"
+    streaming_scan = configs.get("STREAMING_SCAN").data.strip().lower() == "true"
+    scan_queue_size = int(configs.get("SCAN_QUEUE_SIZE").data)
+    extraction_workers = int(configs.get("EXTRACTION_WORKERS").data)
+    dedupe_archives = configs.get("DEDUPE_ARCHIVES").data.strip().lower() == "true"
+    image_mode = configs.get("IMAGE_MODE").data.strip().lower() == "true"
+    max_archive_bytes = int(configs.get("MAX_ARCHIVE_BYTES").data)
+    max_total_bytes = int(configs.get("MAX_TOTAL_BYTES").data)
+    max_compression_ratio = float(configs.get("MAX_COMPRESSION_RATIO").data)
+    max_archive_members = int(configs.get("MAX_ARCHIVE_MEMBERS").data)
+    max_nesting_depth = int(configs.get("MAX_NESTING_DEPTH").data)
+    filter_extensions = [part.strip() for part in configs.get("FILTER_EXTENSIONS").data.split(",") if part.strip()]
+    filter_globs = [part.strip() for part in configs.get("FILTER_GLOBS").data.split(",") if part.strip()]
+    filter_max_size = int(configs.get("FILTER_MAX_SIZE").data)
+    filter_hash = configs.get("FILTER_HASH").data.strip().lower() == "true"
+    extraction_journal = configs.get("EXTRACTION_JOURNAL").data.strip().lower() == "true"
+    log_file_level = configs.get("LOG_FILE_LEVEL").data.strip().upper()
+    log_console_level = configs.get("LOG_CONSOLE_LEVEL").data.strip().upper()
+    log_stage_levels = {stage.strip(): level.strip().upper()
+                        for stage, _, level in (part.partition(":") for part in
+                                                configs.get("LOG_STAGE_LEVELS").data.split(","))
+                        if stage.strip()}
+    log_progress_every = int(configs.get("LOG_PROGRESS_EVERY").data)
+    direct_scan = configs.get("DIRECT_SCAN").data.strip().lower() == "true"
+    direct_scan_spool_size = int(configs.get("DIRECT_SCAN_SPOOL_SIZE").data)
+    scan_queue_bytes = int(configs.get("SCAN_QUEUE_BYTES").data)
     root_dir = p.parent
 
     # Global instance of file data manager
     file_data_manager = FileDataManager()
+    # File contents FileData loads on demand, up to CONTENT_CACHE_BYTES
+    content_cache = ContentCache(int(configs.get("CONTENT_CACHE_BYTES").data))
 
@@ -1,6 +1,12 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from pathlib import Path
+from typing import Optional
+from configuration import Configuration as Config
 
 p = Path(__file__).resolve()
 
@@ -14,14 +20,53 @@ file_handler = logging.FileHandler(file_hander_path, mode='w')
 console_handler = logging.StreamHandler()
 
 # Set the logging level for each handler
-file_handler.setLevel(logging.INFO)
-console_handler.setLevel(logging.DEBUG)
+file_handler.setLevel(Config.log_file_level)
+console_handler.setLevel(Config.log_console_level)
 
 # Create a logging format
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
-# Add the handlers to the logger
-extraction_logger.addHandler(file_handler)
-extraction_logger.addHandler(console_handler)
\ No newline at end of file
+# The logger only puts records on a queue; a listener thread writes them to
+# the file and console, so extraction threads never wait on that I/O
+log_queue = queue.SimpleQueue()
+extraction_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+
+def stage_logger(stage: str) -> logging.Logger:
+    """
+    Logger of one extraction stage, a child of extraction_logger, at the
+    level LOG_STAGE_LEVELS gives the stage (INFO if it is not listed).
+    """
+    logger = extraction_logger.getChild(stage)
+    logger.setLevel(Config.log_stage_levels.get(stage, logging.INFO))
+    return logger
+
+
+class ProgressLog:
+    """
+    Counts the files a stage handles and logs the count every
+    LOG_PROGRESS_EVERY files, instead of a line per file. Thread-safe.
+    """
+
+    def __init__(self, logger: logging.Logger, what: str, every: Optional[int] = None):
+        self.logger = logger
+        self.what = what
+        self.every = Config.log_progress_every if every is None else every
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, n: int = 1) -> None:
+        with self._lock:
+            before = self.count
+            self.count += n
+            count = self.count
+        if self.every and count // self.every != before // self.every:
+            self.logger.info(f"{count} {self.what}")
+
+    def done(self) -> None:
+        self.logger.info(f"{self.count} {self.what} in total")
@@ -9,7 +9,7 @@ from assessment.review import file_gen, data_gen
 from assessment import print_utils
 from configuration import Configuration as Config
 from assessment.scanner import (file_reader, keyword_search, license_search, header_search, license_to_header_matcher,
-                                file_release_search, hash_reader)
+                                file_release_search, hash_reader, pipeline, parallel_scan, streaming_scan)
 
 p = Path(__file__).resolve()
 
@@ -19,15 +19,20 @@ timer.start()
 
 def main() -> None:
     Config.dest_dir.mkdir(parents=True, exist_ok=True)
-    extractor.main(Config.source_dir, Config.dest_dir)
-    file_reader.read_all_files_in_directory(Path(Config.dest_dir, Config.project_name))
-    file_release_search.scan_all_files()
-    hash_reader.main()
-    license_search.search_full_license_text_in_files()
+    # One pass over all files running every registered scanner stage (release status, hashing, license search,
+    # header detection, header -> license matching, keyword search); the order comes from each stage's depends_on.
+    # Files are sharded across SCAN_WORKERS processes.
+    if Config.direct_scan:
+        # Archive members are scanned in memory; only review files are written
+        streaming_scan.scan_in_memory(Config.source_dir, Config.dest_dir, Path(Config.dest_dir, Config.project_name))
+    elif Config.streaming_scan:
+        # Files are scanned as soon as they are extracted
+        streaming_scan.extract_and_scan(Config.source_dir, Config.dest_dir, Path(Config.dest_dir, Config.project_name))
+    else:
+        extractor.main(Config.source_dir, Config.dest_dir)
+        file_reader.read_all_files_in_directory(Path(Config.dest_dir, Config.project_name))
+        parallel_scan.scan_all_files()
     # SEARCH FULL HEADER TEXT IN FILE, SOME FILES ARE ONLY THE HEADER LICENSE TEXT WITHOUT A HEADER (output/review/logback-v_1.5.21/logback-core-blackbox/LICENSE.txt)
-    header_search.scan_all_files_for_headers()
-    license_to_header_matcher.search_file_data_headers_for_licenses()
-    keyword_search.scan_all_files_for_matches()
     # FULL LICENSE OR FULL HEADER MATCHES = EXACT LICENSE MATCH
     # HEADER MATCH = STRONG MATCH
     # KEYWORD MATCH = WEAK MATCH
@@ -38,7 +43,8 @@ def main() -> None:
     # DIFF COMPARE SHOULD OUTPUT TOTAL NUMBER OF NEW FILES AND NUMBER OF FILES CHANGED
     # ASSIGN LICENSES VALUES OF PERMISSIBLE AND IMPERMISSIBLE
 
-    file_gen.copy_unresolved_files(Path(Config.dest_dir, Config.project_name))
+    if not Config.direct_scan:
+        file_gen.copy_unresolved_files(Path(Config.dest_dir, Config.project_name))
     data_gen.write_license_data_to_csv("assessment_data.csv")
 
 
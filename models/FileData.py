@@ -1,10 +1,61 @@
+import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict, Tuple, Union
+
+
+class ContentCache:
+    """
+    LRU cache of file contents loaded on demand, holding at most max_bytes
+    (as counted by sys.getsizeof, so decoded text counts what it takes in
+    memory). A content larger than max_bytes is returned but not kept.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Any, Tuple[Union[str, bytes], int]] = OrderedDict()
+        self._size = 0
+
+    def get(self, key, loader: Callable[[], Union[str, bytes]]) -> Union[str, bytes]:
+        """The content cached under key, loaded with loader() on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        content = loader()
+        size = sys.getsizeof(content)
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (content, size)
+                    self._size += size
+                while self._size > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._size -= evicted_size
+        return content
+
+    def peek(self, key) -> Optional[Union[str, bytes]]:
+        """The content cached under key, without loading it or marking it as used."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def size(self) -> int:
+        return self._size
+
 
 class FileData:
-    def __init__(self, file_path, file_content, file_extension):
+    def __init__(self, file_path, file_content, file_extension, file_size=None, content_handle=None):
         self._file_path = file_path
+        # Either the content itself, or None with a handle to load it on
+        # first access (see file_reader.FileHandle)
         self._file_content = file_content
+        self._content_handle = content_handle
+        self._file_size = file_size
         self._file_extension = file_extension
         self._file_header = None
         self._keyword_matches = None
@@ -15,6 +66,9 @@ class FileData:
         self._is_released = False
         self._exact_license_match = None
         self._file_hash = None
+        self._license_similarity = None
+        # Container image layer the file came from, if it came from an image
+        self._layer = None
         # self._header_data = header_data if header_data is not None else []
         # self._file_entry = file_entry if file_entry is not None else []
         # self._file_search_data = file_search_data if file_search_data is not None else []
@@ -35,12 +89,31 @@ class FileData:
 
     @property
     def file_content(self):
+        if self._file_content is None and self._content_handle is not None:
+            # Not kept here: the handle's cache decides how long it stays in memory
+            return self._content_handle.load()
         return self._file_content
 
     @file_content.setter
     def file_content(self, file_content):
         self._file_content = file_content
 
+    def read_prefix(self, size: int):
+        """
+        The start of the file's content, covering its first size bytes, for
+        stages that only look at the top of a file. Only that much is read
+        from disk unless the whole content is already in memory.
+        """
+        if self._file_content is None and self._content_handle is not None:
+            return self._content_handle.load_prefix(size)
+        return self._file_content[:size] if self._file_content is not None else None
+
+    @property
+    def file_size(self):
+        if self._file_size is None and self._file_content is not None:
+            return len(self._file_content)
+        return self._file_size
+
     @property
     def file_extension(self):
         return self._file_extension
@@ -112,6 +185,22 @@ class FileData:
     @file_hash.setter
     def file_hash(self, file_hash):
         self._file_hash = file_hash
+
+    @property
+    def license_similarity(self):
+        return self._license_similarity
+
+    @license_similarity.setter
+    def license_similarity(self, license_similarity):
+        self._license_similarity = license_similarity
+
+    @property
+    def layer(self):
+        return self._layer
+
+    @layer.setter
+    def layer(self, layer):
+        self._layer = layer
     #
     # @property
     # def header_data(self):
@@ -189,15 +278,73 @@ class FileData:
 class FileDataManager:
     def __init__(self):
         self.file_data_dict: Dict[Path, FileData] = {}
+        # canonical path -> paths holding an identical copy that was not extracted
+        self.path_aliases: Dict[Path, List[Path]] = {}
+        # path of a file taken from a container image -> layer it came from
+        self.file_layers: Dict[Path, str] = {}
+        # path of a file that was not extracted or not read -> status reported for it
+        self.file_statuses: Dict[Path, str] = {}
+        # path of a file that was filtered out instead of extracted -> (size, hash if taken)
+        self.filtered_files: Dict[Path, Tuple[int, Optional[str]]] = {}
 
     def add_file_data(self, file_info: FileData):
         """Adds a File instance to the manager."""
+        if file_info.layer is None and self.file_layers and file_info.file_path:
+            file_info.layer = self.get_file_layer(Path(file_info.file_path).resolve())
         self.file_data_dict[file_info.file_path] = file_info
 
     def get_file_data(self, file_path: Path) -> Optional[FileData]:
         """Retrieves a FileData instance by file path."""
         return self.file_data_dict.get(file_path)
 
+    def remove_file_data(self, file_path: Path) -> None:
+        """Removes the FileData instance for a file path, if present."""
+        self.file_data_dict.pop(file_path, None)
+
+    def add_path_alias(self, alias_path: Path, canonical_path: Path):
+        """Records that everything at or under canonical_path also exists under alias_path."""
+        self.path_aliases.setdefault(canonical_path, []).append(alias_path)
+
+    def get_alias_paths(self, file_path: Path) -> List[Path]:
+        """Returns every other path file_path occurs at, following aliases of aliases."""
+        alias_paths = []
+        for canonical_path in (file_path, *file_path.parents):
+            for alias_path in self.path_aliases.get(canonical_path, ()):
+                alias_file_path = alias_path / file_path.relative_to(canonical_path)
+                alias_paths.append(alias_file_path)
+                alias_paths.extend(self.get_alias_paths(alias_file_path))
+        return alias_paths
+
+    def add_file_layer(self, file_path: Path, layer: str):
+        """Records the container image layer a file came from."""
+        self.file_layers[file_path] = layer
+
+    def get_file_layer(self, file_path: Path) -> Optional[str]:
+        """Returns the image layer a file came from, if any."""
+        return self.file_layers.get(file_path)
+
+    def inherit_file_layer(self, archive_path: Path, file_paths: List[Path]):
+        """Records the files extracted from archive_path as coming from the archive's layer."""
+        layer = self.file_layers.get(archive_path)
+        if layer is None:
+            return
+        for file_path in file_paths:
+            self.file_layers[file_path] = layer
+
+    def set_file_status(self, file_path: Path, status: str):
+        """Records why a file (e.g. an archive over an extraction budget) was not extracted or read."""
+        self.file_statuses[Path(file_path).resolve()] = status
+
+    def add_filtered_file(self, file_path: Path, size: int, file_hash: Optional[str] = None):
+        """Records a file that was filtered out instead of extracted, so it is still reported."""
+        file_path = Path(file_path).resolve()
+        self.filtered_files[file_path] = (size, file_hash)
+        self.file_statuses[file_path] = "Filtered"
+
+    def get_file_status(self, file_path: Path) -> Optional[str]:
+        """Returns the status recorded for a file, if any."""
+        return self.file_statuses.get(Path(file_path).resolve())
+
     def get_all_file_data(self) -> List[FileData]:
         """Returns a list of all FileData instances."""
         return list(self.file_data_dict.values())
\ No newline at end of file
@@ -0,0 +1,86 @@
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+from assessment.creator2 import extractor
+from assessment.creator2.archive_dedupe import ALIAS_MANIFEST_NAME, ArchiveRegistry
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+
+class TestArchiveDedupe(unittest.TestCase):
+
+    def test_registry_resolves_alias_directories(self):
+        registry = ArchiveRegistry()
+        self.assertTrue(registry.claim("aaa", Path("layer1/lib.jar")))
+        registry.extracted("aaa", Path("layer1/lib"), {"META-INF", "org"})
+        self.assertFalse(registry.claim("aaa", Path("layer2/app/lib-copy.jar")))
+        # Retrying the same file (kept as a plain file) is not an alias
+        self.assertTrue(registry.claim("bbb", Path("bad.zip")))
+        registry.kept("bbb", Path("bad.zip"))
+        self.assertTrue(registry.claim("bbb", Path("bad.zip")))
+        self.assertFalse(registry.claim("bbb", Path("other/bad.zip")))
+
+        self.assertEqual({
+            Path("layer2/app/lib-copy"): (Path("layer1/lib"), "aaa"),
+            Path("other/bad.zip"): (Path("bad.zip"), "bbb"),
+        }, registry.resolve())
+
+    def test_alias_paths_follow_aliases_of_aliases(self):
+        manager = FileDataManager()
+        manager.add_path_alias(Path("/dest/b/lib"), Path("/dest/a/lib"))
+        # a/app contains a nested copy of c/inner, and a/app itself is duplicated at d/app
+        manager.add_path_alias(Path("/dest/a/app/inner"), Path("/dest/c/inner"))
+        manager.add_path_alias(Path("/dest/d/app"), Path("/dest/a/app"))
+
+        self.assertEqual([Path("/dest/b/lib/LICENSE")], manager.get_alias_paths(Path("/dest/a/lib/LICENSE")))
+        self.assertEqual([Path("/dest/a/app/inner/A.java"), Path("/dest/d/app/inner/A.java")],
+                         manager.get_alias_paths(Path("/dest/c/inner/A.java")))
+        self.assertEqual([], manager.get_alias_paths(Path("/dest/c/other.txt")))
+
+    def test_canonical_copy_does_not_depend_on_thread_timing(self):
+        jar = io.BytesIO()
+        with zipfile.ZipFile(jar, "w") as zf:
+            zf.writestr("META-INF/LICENSE", "Licensed under the Apache License, Version 2.0")
+            zf.writestr("pkg/A.java", "class A {}\n")
+        wrapper = io.BytesIO()
+        with zipfile.ZipFile(wrapper, "w") as zf:
+            zf.writestr("lib.jar", jar.getvalue())
+        # Identical jars in several directories, and one a level deeper inside a zip
+        files = {f"proj/{name}/lib.jar": jar.getvalue() for name in ("z", "m", "c", "b", "x", "d")}
+        files["proj/a/wrap.zip"] = wrapper.getvalue()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir, "proj.tar")
+            with tarfile.open(source, "w") as tf:
+                for name, content in files.items():
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    tf.addfile(info, io.BytesIO(content))
+
+            self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+            manifests = set()
+            with mock.patch.object(Config, "dedupe_archives", True):
+                for run, workers in enumerate((1, 4, 4, 4, 8, 8)):
+                    Config.file_data_manager = FileDataManager()
+                    dest_dir = Path(tmp_dir, f"dest{run}")
+                    with mock.patch.object(Config, "extraction_workers", workers):
+                        extractor.main(source, dest_dir)
+                    self.assertTrue(Path(dest_dir, "proj/b/lib/pkg/A.java").is_file())
+                    manifests.add(Path(dest_dir, ALIAS_MANIFEST_NAME).read_text(encoding="utf-8"))
+
+        self.assertEqual(1, len(manifests))
+        aliases = json.loads(manifests.pop())["aliases"]
+        self.assertEqual({"proj/b/lib"}, {alias["canonical"] for alias in aliases})
+        self.assertEqual(["proj/a/wrap/lib", "proj/c/lib", "proj/d/lib", "proj/m/lib", "proj/x/lib", "proj/z/lib"],
+                         [alias["alias"] for alias in aliases])
+
+
+if __name__ == "__main__":
+    unittest.main()
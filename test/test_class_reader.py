@@ -0,0 +1,78 @@
+import struct
+import unittest
+from pathlib import Path
+from assessment.scanner import class_reader
+from assessment.scanner.pipeline import FileViews
+from configuration import Configuration as Config
+from models.FileData import FileData
+
+p = Path(__file__).resolve()
+
+NOTICE = "Licensed under the Apache License, Version 2.0"
+# "a<NUL>b<U+1F600>" in the modified UTF-8 of class files
+MODIFIED_UTF8 = b"a\xc0\x80b\xed\xa0\xbd\xed\xb8\x80"
+
+
+def _utf8(raw: bytes) -> bytes:
+    return b"\x01" + struct.pack(">H", len(raw)) + raw
+
+
+def _class_bytes(source_file: bool = True) -> bytes:
+    """A minimal class Foo with a String constant, a long, a field and a SourceFile attribute."""
+    pool = [
+        _utf8(b"Foo"),                                   # 1
+        b"\x07" + struct.pack(">H", 1),                  # 2 Class Foo
+        _utf8(b"java/lang/Object"),                      # 3
+        b"\x07" + struct.pack(">H", 3),                  # 4 Class Object
+        _utf8(NOTICE.encode()),                          # 5
+        b"\x08" + struct.pack(">H", 5),                  # 6 String
+        b"\x05" + struct.pack(">q", 42),                 # 7 (and 8) Long
+        _utf8(b"SourceFile"),                            # 9
+        _utf8(b"Foo.java"),                              # 10
+        _utf8(MODIFIED_UTF8),                            # 11
+    ]
+    attribute = struct.pack(">HIH", 9, 2, 10)
+    return b"".join([
+        class_reader.CLASS_MAGIC, struct.pack(">HHH", 0, 52, 12), *pool,
+        struct.pack(">HHHH", 0x21, 2, 4, 0),             # access, this, super, no interfaces
+        struct.pack(">HHHHH", 1, 0, 1, 3, 1),            # one field with one attribute
+        struct.pack(">HI", 9, 3), b"xyz",
+        struct.pack(">H", 0),                            # no methods
+        struct.pack(">H", 1) + attribute if source_file else struct.pack(">H", 0),
+    ])
+
+
+class TestClassReader(unittest.TestCase):
+
+    def test_read_class_strings(self):
+        strings = class_reader.read_class_strings(_class_bytes())
+        self.assertEqual("Foo.java", strings[0])
+        self.assertEqual(["Foo", "java/lang/Object", NOTICE, "SourceFile", "Foo.java", "a\x00b\U0001F600"], strings[1:])
+        self.assertEqual(["Foo", "java/lang/Object"], class_reader.read_class_strings(_class_bytes(False))[:2])
+
+    def test_modified_utf8(self):
+        self.assertEqual("a\x00b\U0001F600", class_reader._decode_modified_utf8(MODIFIED_UTF8))
+
+    def test_unreadable(self):
+        with self.assertRaises(class_reader.ClassFormatError):
+            class_reader.read_class_strings(b"PK\x03\x04")
+        self.assertIsNone(class_reader.class_text(_class_bytes()[:40]))
+        # A UTF8 constant that is not (modified) UTF-8
+        malformed = class_reader.CLASS_MAGIC + struct.pack(">HHH", 0, 52, 2) + _utf8(b"\xff\xfe")
+        with self.assertRaises(class_reader.ClassFormatError):
+            class_reader.read_class_strings(malformed)
+        self.assertIsNone(class_reader.class_text(malformed))
+
+    def test_views(self):
+        file_data = FileData(Path("Foo.class"), _class_bytes(), ".class")
+        self.assertIn(f"\n{NOTICE}\n", FileViews(file_data).text)
+
+        Config.scan_class_constants, scan_class_constants = False, Config.scan_class_constants
+        try:
+            self.assertNotIn(f"\n{NOTICE}\n", FileViews(file_data).text)
+        finally:
+            Config.scan_class_constants = scan_class_constants
+
+
+if __name__ == "__main__":
+    unittest.main()
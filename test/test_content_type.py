@@ -0,0 +1,57 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.scanner import content_type, pipeline
+from models.FileData import FileData
+
+p = Path(__file__).resolve()
+
+
+class TestContentType(unittest.TestCase):
+
+    def test_sniff(self):
+        self.assertEqual(content_type.TEXT, content_type.sniff("Copyright (c) ACME\n"))
+        self.assertEqual(content_type.TEXT, content_type.sniff(b"caf\xe9 latin-1 text\n"))
+        self.assertEqual(content_type.TEXT, content_type.sniff("License".encode("utf-16")))
+        self.assertEqual(content_type.TEXT, content_type.sniff(b""))
+        self.assertEqual(content_type.MEDIA, content_type.sniff(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"))
+        self.assertEqual(content_type.MEDIA, content_type.sniff(b"\x00\x00\x00\x18ftypmp42"))
+        self.assertEqual(content_type.BINARY, content_type.sniff(b"\x7fELF\x02\x01\x01"))
+        self.assertEqual(content_type.BINARY, content_type.sniff(b"PK\x03\x04\x14\x00"))
+        self.assertEqual(content_type.BINARY, content_type.sniff(b"data\x00\x01\x02\x00\x00more data"))
+        # Short printable magics ("MZ", "ID3", "BZh") only count in binary content
+        self.assertEqual(content_type.TEXT, content_type.sniff(b"MZ is the DOS executable signature\n"))
+        self.assertEqual(content_type.TEXT, content_type.sniff(b"ID3 tags are read by the player\n"))
+        self.assertEqual(content_type.TEXT, content_type.sniff(b"BZh\n"))
+        self.assertEqual(content_type.BINARY, content_type.sniff(b"MZ\x90\x00\x03\x00\x00\x00\x04\x00"))
+        self.assertEqual(content_type.MEDIA, content_type.sniff(b"ID3\x04\x00\x00\x00\x00\x01\x00"))
+        # Valid UTF-8, but mostly control characters
+        self.assertEqual(content_type.BINARY, content_type.sniff("\x01\x02\x03\x04 abc"))
+
+    def test_text_views(self):
+        binary = FileData(Path("lib.so"), b"\x7fELF\x00\x01GPL v2 or later\x00\x02\x03ab\x00", ".so")
+        self.assertEqual("GPL v2 or later", pipeline.FileViews(binary).text)
+        utf16 = FileData(Path("NOTICE"), "\ufeffApache License".encode("utf-16-le"), "notice")
+        self.assertEqual("Apache License", pipeline.FileViews(utf16).text)
+
+    def test_routing(self):
+        calls = []
+        with mock.patch.dict(pipeline._stages, clear=True):
+            pipeline.stage("hash")(lambda fd, views: calls.append(("hash", fd.file_extension)))
+            pipeline.stage("keyword", content_types=(content_type.TEXT, content_type.BINARY))(
+                lambda fd, views: calls.append(("keyword", fd.file_extension)))
+            pipeline.stage("header", content_types=(content_type.TEXT,))(
+                lambda fd, views: calls.append(("header", fd.file_extension)))
+            stages = pipeline.ordered_stages()
+            for file_data in (FileData(Path("a.txt"), "text", ".txt"),
+                              FileData(Path("a.dll"), b"MZ\x90\x00\x03\x00", ".dll"),
+                              FileData(Path("a.gif"), b"GIF89a\x01\x00", ".gif")):
+                pipeline.run_stages_on_file(file_data, stages)
+
+        self.assertEqual([("hash", ".txt"), ("keyword", ".txt"), ("header", ".txt"),
+                          ("hash", ".dll"), ("keyword", ".dll"),
+                          ("hash", ".gif")], calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
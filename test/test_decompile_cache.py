@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.creator2.decompile_cache import DecompileCache, hash_class
+
+p = Path(__file__).resolve()
+
+
+class TestDecompileCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            java_file = Path(tmp_dir, "Foo.java")
+            java_file.write_text("class Foo {}")
+            cache = DecompileCache(Path(tmp_dir, "cache"))
+            dest = Path(tmp_dir, "out.java")
+
+            self.assertFalse(cache.get("ab" * 32, dest))
+            cache.put("ab" * 32, java_file)
+            # Persistent: another run sees the entry
+            cache = DecompileCache(Path(tmp_dir, "cache"))
+            self.assertEqual(12, cache.size())
+            self.assertTrue(cache.get("ab" * 32, dest))
+            self.assertEqual("class Foo {}", dest.read_text())
+
+            # Writing the hit in place, as a CFR rerun does, leaves the entry alone
+            dest.write_text("class Bar {}")
+            self.assertEqual("class Foo {}", cache._entry("ab" * 32).read_text())
+
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            java_file = Path(tmp_dir, "Foo.java")
+            java_file.write_bytes(b"x" * 100)
+            cache = DecompileCache(Path(tmp_dir, "cache"), max_bytes=250)
+            digests = [f"{i:02x}" * 32 for i in range(3)]
+            for age, digest in enumerate(digests[:2]):
+                cache.put(digest, java_file)
+                os.utime(cache._entry(digest), (1000 + age, 1000 + age))
+
+            # Using the oldest entry makes the other one the least recently used
+            self.assertTrue(cache.get(digests[0], Path(tmp_dir, "out.java")))
+            cache.put(digests[2], java_file)
+
+            self.assertEqual(200, cache.size())
+            self.assertTrue(cache._entry(digests[0]).is_file())
+            self.assertFalse(cache._entry(digests[1]).is_file())
+            self.assertTrue(cache._entry(digests[2]).is_file())
+
+    def test_eviction_makes_room_for_many_puts(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            java_file = Path(tmp_dir, "Foo.java")
+            java_file.write_bytes(b"x" * 10)
+            cache = DecompileCache(Path(tmp_dir, "cache"), max_bytes=1000)
+
+            with mock.patch.object(cache, "_entries", wraps=cache._entries) as entries:
+                for i in range(200):
+                    cache.put(f"{i:04x}" * 16, java_file)
+
+            self.assertLessEqual(cache.size(), 1000)
+            # Over max_bytes at the 101st put, evicted down to 900, and over again 11 puts later
+            self.assertEqual(10, entries.call_count)
+
+    def test_hash_includes_inner_classes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            class_file = Path(tmp_dir, "Foo.class")
+            class_file.write_bytes(b"\xca\xfe\xba\xbe")
+            cfr_jar = Path("cfr-0.152.jar")
+            before = hash_class(class_file, cfr_jar)
+            Path(tmp_dir, "Foo$1.class").write_bytes(b"\xca\xfe\xba\xbe")
+            self.assertNotEqual(before, hash_class(class_file, cfr_jar))
+            self.assertNotEqual(before, hash_class(class_file, Path("cfr-0.151.jar")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from assessment.creator2 import extraction_budget, extractor, member_reader
+from assessment.creator2.extraction_budget import BudgetExceeded, ExtractionBudget
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+_LIMITS = ("max_archive_bytes", "max_total_bytes", "max_compression_ratio", "max_archive_members",
+           "max_nesting_depth")
+
+
+def _zip_bytes(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestExtractionBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.limits = {name: getattr(Config, name) for name in _LIMITS}
+        for name in _LIMITS:
+            setattr(Config, name, 0)
+        self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+        Config.file_data_manager = FileDataManager()
+
+    def tearDown(self):
+        for name, value in self.limits.items():
+            setattr(Config, name, value)
+
+    def _extract(self, source_dir: Path, dest_dir: Path) -> dict:
+        extractor.main(source_dir, dest_dir)
+        return {path.relative_to(dest_dir): path.read_bytes() for path in dest_dir.rglob("*") if path.is_file()}
+
+    def test_archive_over_budget_is_kept_and_reported(self):
+        Config.max_archive_bytes = 1000
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = Path(tmp_dir, "source")
+            source_dir.mkdir()
+            bomb = _zip_bytes({"small.txt": b"small", "zeros.bin": b"\0" * 5000})
+            Path(source_dir, "bomb.zip").write_bytes(bomb)
+            Path(source_dir, "ok.zip").write_bytes(_zip_bytes({"LICENSE": b"MIT License"}))
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            in_memory_dir = Path(tmp_dir, "in_memory").resolve()
+
+            on_disk = self._extract(source_dir, dest_dir)
+
+            # Nothing of the bomb is left but the archive itself
+            self.assertEqual({Path("bomb.zip"): bomb, Path("ok", "LICENSE"): b"MIT License"}, on_disk)
+            status = Config.file_data_manager.get_file_status(Path(dest_dir, "bomb.zip"))
+            self.assertTrue(status.startswith("Skipped"), status)
+
+            members = dict(member_reader.iter_members(source_dir, in_memory_dir))
+            self.assertEqual(bomb, members[Path(in_memory_dir, "bomb.zip")])
+            self.assertIsNotNone(Config.file_data_manager.get_file_status(Path(in_memory_dir, "bomb.zip")))
+
+    def test_nesting_depth(self):
+        Config.max_nesting_depth = 2
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = Path(tmp_dir, "source")
+            source_dir.mkdir()
+            inner = _zip_bytes({"C.java": b"class C {}"})
+            middle = _zip_bytes({"c.jar": inner, "B.java": b"class B {}"})
+            Path(source_dir, "a.jar").write_bytes(_zip_bytes({"b.jar": middle, "A.java": b"class A {}"}))
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            in_memory_dir = Path(tmp_dir, "in_memory").resolve()
+
+            on_disk = self._extract(source_dir, dest_dir)
+            members = {path.relative_to(in_memory_dir): content
+                       for path, content in member_reader.iter_members(source_dir, in_memory_dir)}
+
+            self.assertEqual({
+                Path("a", "A.java"): b"class A {}",
+                Path("a", "b", "B.java"): b"class B {}",
+                Path("a", "b", "c.jar"): inner,
+            }, on_disk)
+            self.assertEqual(on_disk, members)
+            self.assertIsNotNone(Config.file_data_manager.get_file_status(Path(dest_dir, "a", "b", "c.jar")))
+
+    def test_limits(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive = Path(tmp_dir, "archive")
+            archive.write_bytes(b"x" * 1000)
+
+            budget = ExtractionBudget(max_compression_ratio=10).archive(archive, 1)
+            budget.add_bytes(extraction_budget.RATIO_MIN_BYTES)
+            with self.assertRaises(BudgetExceeded):
+                budget.add_bytes(1)
+
+            budget = ExtractionBudget(max_members=2).archive(archive, 1)
+            budget.add_member()
+            budget.add_member()
+            with self.assertRaises(BudgetExceeded):
+                budget.add_member()
+
+            # The total is shared by every archive of the run
+            run_budget = ExtractionBudget(max_total_bytes=100)
+            run_budget.archive(archive, 1).add_bytes(60)
+            with self.assertRaises(BudgetExceeded):
+                run_budget.archive(archive, 1).add_bytes(60)
+            with self.assertRaises(BudgetExceeded):
+                run_budget.archive(archive, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
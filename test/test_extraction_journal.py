@@ -0,0 +1,123 @@
+import io
+import json
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+from assessment.creator2 import extraction_journal, extractor
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+
+def _zip_bytes(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestExtractionJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = (Config.extraction_journal, Config.filter_extensions)
+        Config.extraction_journal = True
+        Config.filter_extensions = [".png"]
+        self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+        Config.file_data_manager = FileDataManager()
+
+    def tearDown(self):
+        Config.extraction_journal, Config.filter_extensions = self.settings
+
+    @staticmethod
+    def _make_source(tmp_dir: str) -> Path:
+        source_dir = Path(tmp_dir, "source")
+        source_dir.mkdir()
+        for i in range(3):
+            inner = _zip_bytes({f"C{i}.java": f"class C{i} {{}}"})
+            Path(source_dir, f"lib{i}.jar").write_bytes(
+                _zip_bytes({"inner.jar": inner, "LICENSE": "MIT License", "icon.png": b"\x89PNG"}))
+        return source_dir
+
+    @staticmethod
+    def _tree(dest_dir: Path) -> dict:
+        return {path.relative_to(dest_dir): path.read_bytes() for path in dest_dir.rglob("*") if path.is_file()}
+
+    def test_rerun_uses_finished_archives(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = self._make_source(tmp_dir)
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            first = []
+            extractor.main(source_dir, dest_dir, on_file=first.append)
+            tree = self._tree(dest_dir)
+
+            Config.file_data_manager = FileDataManager()
+            second = []
+            with mock.patch.object(extractor, "extract_multi", wraps=extractor.extract_multi) as extract_multi:
+                extractor.main(source_dir, dest_dir, on_file=second.append)
+
+            extract_multi.assert_not_called()
+            self.assertEqual(tree, self._tree(dest_dir))
+            self.assertEqual(sorted(first), sorted(second))
+            # Bookkeeping from the first run is restored from the journal
+            self.assertEqual("Filtered", Config.file_data_manager.get_file_status(Path(dest_dir, "lib0", "icon.png")))
+            self.assertTrue(Path(tmp_dir, "dest" + extraction_journal.JOURNAL_SUFFIX).is_file())
+
+    def test_other_settings_start_over(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = self._make_source(tmp_dir)
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            extractor.main(source_dir, dest_dir)
+            self.assertFalse(Path(dest_dir, "lib0", "icon.png").exists())
+
+            Config.file_data_manager = FileDataManager()
+            Config.filter_extensions = []
+            with mock.patch.object(extractor, "extract_multi", wraps=extractor.extract_multi) as extract_multi:
+                extractor.main(source_dir, dest_dir)
+
+            self.assertEqual(6, extract_multi.call_count)
+            self.assertTrue(Path(dest_dir, "lib0", "icon.png").is_file())
+            self.assertIsNone(Config.file_data_manager.get_file_status(Path(dest_dir, "lib0", "icon.png")))
+            journal_path = Path(tmp_dir, "dest" + extraction_journal.JOURNAL_SUFFIX)
+            with open(journal_path, encoding="utf-8") as f:
+                self.assertEqual({"settings": extraction_journal.current_settings()}, json.loads(f.readline()))
+
+    def test_resume_after_crash(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = self._make_source(tmp_dir)
+            expected_dir = Path(tmp_dir, "expected").resolve()
+            extractor.main(source_dir, expected_dir)
+
+            dest_dir = Path(tmp_dir, "dest").resolve()
+
+            def crash(path: Path):
+                if path.name == "C1.java":
+                    raise RuntimeError("killed")
+
+            Config.extraction_workers, workers = 1, Config.extraction_workers
+            try:
+                with self.assertRaises(RuntimeError):
+                    extractor.main(source_dir, dest_dir, on_file=crash)
+            finally:
+                Config.extraction_workers = workers
+            journal_path = Path(tmp_dir, "dest" + extraction_journal.JOURNAL_SUFFIX)
+            with open(journal_path, "a", encoding="utf-8") as f:
+                f.write('{"archive": "lib2/inner.jar", "sha2')  # cut off mid-line
+
+            emitted = []
+            with mock.patch.object(extractor, "extract_multi", wraps=extractor.extract_multi) as extract_multi:
+                extractor.main(source_dir, dest_dir, on_file=emitted.append)
+
+            self.assertEqual(self._tree(expected_dir), self._tree(dest_dir))
+            self.assertEqual(sorted(path.relative_to(dest_dir) for path in emitted), sorted(self._tree(dest_dir)))
+            # The source jars were finished before the crash; only nested jars are left to extract
+            extracted = {call.args[2] for call in extract_multi.call_args_list}
+            self.assertFalse(extracted & {Path("lib0.jar"), Path("lib1.jar"), Path("lib2.jar")})
+            self.assertTrue(journal_path.read_text(encoding="utf-8").endswith("\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import logging
+import threading
+import unittest
+from pathlib import Path
+from configuration import Configuration as Config
+from loggers.extraction_logger import ProgressLog, extraction_logger, stage_logger
+
+p = Path(__file__).resolve()
+
+
+class TestExtractionLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.stage_levels = Config.log_stage_levels
+
+    def tearDown(self):
+        Config.log_stage_levels = self.stage_levels
+
+    def test_stage_levels(self):
+        Config.log_stage_levels = {"archive": "DEBUG"}
+        self.assertEqual(logging.DEBUG, stage_logger("archive").level)
+        self.assertEqual(logging.INFO, stage_logger("copy").level)
+        self.assertIs(extraction_logger, stage_logger("copy").parent)
+
+    def test_progress_every(self):
+        logger = logging.getLogger("test_extraction_logger.progress")
+        with self.assertLogs(logger, logging.INFO) as logs:
+            progress = ProgressLog(logger, "files", every=100)
+            threads = [threading.Thread(target=lambda: [progress.add() for _ in range(50)]) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            progress.done()
+
+        messages = [record.getMessage() for record in logs.records]
+        self.assertEqual(["100 files", "200 files", "250 files in total"], messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
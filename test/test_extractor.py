@@ -0,0 +1,188 @@
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from assessment.creator2 import extractor, member_reader
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+
+class TestExtractor(unittest.TestCase):
+
+    @staticmethod
+    def _make_source(tmp_dir: str) -> Path:
+        source_dir = Path(tmp_dir, "source")
+        Path(source_dir, "nested").mkdir(parents=True)
+        Path(source_dir, "README.md").write_text("readme", encoding="utf-8")
+        with zipfile.ZipFile(Path(source_dir, "lib.zip"), "w") as zf:
+            zf.writestr("LICENSE", "MIT License")
+            zf.writestr("pkg/A.java", "class A {}")
+        # A jar inside a gzip-compressed jar inside a directory
+        inner_jar = io.BytesIO()
+        with zipfile.ZipFile(inner_jar, "w") as zf:
+            zf.writestr("B.java", "class B {}")
+        Path(source_dir, "nested", "inner.jar.gz").write_bytes(gzip.compress(inner_jar.getvalue()))
+        # Not a zip at all; kept as a plain file
+        Path(source_dir, "bad.zip").write_text("not a zip", encoding="utf-8")
+        return source_dir
+
+    def test_on_file_receives_every_extracted_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = self._make_source(tmp_dir)
+            dest_dir = Path(tmp_dir, "dest").resolve()
+
+            emitted = []
+            extractor.main(source_dir, dest_dir, on_file=emitted.append)
+
+            on_disk = sorted(path.resolve() for path in dest_dir.rglob("*") if path.is_file())
+            self.assertEqual(on_disk, sorted(path.resolve() for path in emitted))
+            self.assertIn(Path(dest_dir, "bad.zip"), on_disk)
+            self.assertIn(Path(dest_dir, "lib", "pkg", "A.java"), on_disk)
+            self.assertIn(Path(dest_dir, "nested", "inner", "B.java"), on_disk)
+
+    def test_parallel_nested_extraction_matches_sequential(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            trees = []
+            for workers in (1, 4):
+                dest_dir = Path(tmp_dir, f"dest{workers}")
+                Path(dest_dir, "libs").mkdir(parents=True)
+                # Several independent jars, each holding a nested jar
+                for i in range(8):
+                    inner_jar = io.BytesIO()
+                    with zipfile.ZipFile(inner_jar, "w") as zf:
+                        zf.writestr(f"C{i}.java", f"class C{i} {{}}")
+                    with zipfile.ZipFile(Path(dest_dir, "libs", f"lib{i}.jar").resolve(), "w") as zf:
+                        zf.writestr("inner.jar", inner_jar.getvalue())
+                        zf.writestr("LICENSE", "MIT License")
+                extractor.extract_nested_archives(dest_dir, workers=workers)
+                trees.append(sorted(path.relative_to(dest_dir) for path in dest_dir.rglob("*") if path.is_file()))
+
+            self.assertEqual(trees[0], trees[1])
+            self.assertIn(Path("libs", "lib7", "inner", "C7.java"), trees[1])
+            self.assertEqual(16, len(trees[1]))
+            # The per-target locks are dropped once their extractions are done
+            self.assertEqual({}, extractor._target_locks)
+
+    def test_streamed_tar_flattening(self):
+        def tar_gz(path: Path, files: dict):
+            with tarfile.open(path, "w:gz") as tf:
+                for name, content in files.items():
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    tf.addfile(info, io.BytesIO(content))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = Path(tmp_dir, "source")
+            source_dir.mkdir()
+            # Only top-level entry is named like the archive: flattened
+            tar_gz(Path(source_dir, "foo.tar.gz"), {"foo/src/A.java": b"class A {}", "foo/LICENSE": b"MIT"})
+            # A second top-level entry turns up after files were written: not flattened
+            tar_gz(Path(source_dir, "bar.tgz"), {"bar/src/B.java": b"class B {}", "README": b"readme"})
+            tar_gz(Path(source_dir, "baz.tar.gz"), {"baz": b"baz", "NOTICE": b"notice"})
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            in_memory_dir = Path(tmp_dir, "in_memory").resolve()
+
+            extractor.main(source_dir, dest_dir)
+            on_disk = {path.relative_to(dest_dir): path.read_bytes()
+                       for path in dest_dir.rglob("*") if path.is_file()}
+            members = {path.relative_to(in_memory_dir): content
+                       for path, content in member_reader.iter_members(source_dir, in_memory_dir)}
+
+            self.assertEqual({
+                Path("foo", "src", "A.java"): b"class A {}",
+                Path("foo", "LICENSE"): b"MIT",
+                Path("bar", "bar", "src", "B.java"): b"class B {}",
+                Path("bar", "README"): b"readme",
+                Path("baz", "baz"): b"baz",
+                Path("baz", "NOTICE"): b"notice",
+            }, on_disk)
+            self.assertEqual(on_disk, members)
+            # Directories emptied by moving files back under bar/ are removed
+            self.assertFalse(Path(dest_dir, "bar", "src").exists())
+
+    def test_truncated_tar_keeps_finished_members(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = Path(tmp_dir, "source")
+            source_dir.mkdir()
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w:gz") as tf:
+                for i, size in enumerate((1000, 200000)):
+                    # Random content, so the compressed stream is about as long as the tar
+                    content = os.urandom(size)
+                    info = tarfile.TarInfo(f"pkg{i}/f{i}.txt")
+                    info.size = len(content)
+                    tf.addfile(info, io.BytesIO(content))
+            # Cut off in the middle of the second member
+            Path(source_dir, "a.tar.gz").write_bytes(buffer.getvalue()[:100000])
+            dest_dir = Path(tmp_dir, "dest").resolve()
+
+            emitted = []
+            extractor.main(source_dir, dest_dir, on_file=emitted.append)
+
+            on_disk = sorted(path.resolve() for path in dest_dir.rglob("*") if path.is_file())
+            self.assertEqual([Path(dest_dir, "a", "pkg0", "f0.txt")], on_disk)
+            self.assertEqual(on_disk, sorted(path.resolve() for path in emitted))
+
+    def test_member_reader_matches_extraction(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = self._make_source(tmp_dir)
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            in_memory_dir = Path(tmp_dir, "in_memory").resolve()
+
+            extractor.main(source_dir, dest_dir)
+            on_disk = {path.relative_to(dest_dir): path.read_bytes()
+                       for path in dest_dir.rglob("*") if path.is_file()}
+            members = {path.relative_to(in_memory_dir): content
+                       for path, content in member_reader.iter_members(source_dir, in_memory_dir)}
+
+            self.assertEqual(on_disk, members)
+            self.assertFalse(in_memory_dir.exists())
+
+    def test_sources_jar_covers_classes(self):
+        self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            Config.file_data_manager = FileDataManager()
+            source_dir = Path(tmp_dir, "source")
+            source_dir.mkdir()
+
+            def jar(members: dict) -> bytes:
+                buffer = io.BytesIO()
+                with zipfile.ZipFile(buffer, "w") as zf:
+                    for member, content in members.items():
+                        zf.writestr(member, content)
+                return buffer.getvalue()
+
+            def write_pair(directory: Path, version: str) -> None:
+                Path(directory, "foo-1.2.jar").write_bytes(
+                    jar({"pkg/A.class": b"\xca\xfe\xba\xbe" + version.encode(), "META-INF/LICENSE": b"MIT"}))
+                Path(directory, "foo-1.2-sources.jar").write_bytes(jar({"pkg/A.java": f"class A {{}} // {version}"}))
+
+            write_pair(source_dir, "1")
+            Path(source_dir, "bar.jar").write_bytes(jar({"pkg/B.class": b"\xca\xfe\xba\xbe"}))
+            # The same kind of pair nested in an archive, where the sources jar may be extracted (and removed) first
+            Path(tmp_dir, "lib").mkdir()
+            write_pair(Path(tmp_dir, "lib"), "2")
+            with zipfile.ZipFile(Path(source_dir, "dist.zip"), "w") as zf:
+                for name in ("foo-1.2-sources.jar", "foo-1.2.jar"):
+                    zf.write(Path(tmp_dir, "lib", name), f"lib/{name}")
+            dest_dir = Path(tmp_dir, "dest").resolve()
+
+            extractor.main(source_dir, dest_dir)
+
+            for jar_dir in (Path(dest_dir, "foo-1.2"), Path(dest_dir, "dist", "lib", "foo-1.2")):
+                self.assertFalse(Path(jar_dir, "pkg", "A.class").exists())
+                self.assertTrue(Path(jar_dir, "META-INF", "LICENSE").is_file())
+                self.assertTrue(Path(jar_dir.with_name("foo-1.2-sources"), "pkg", "A.java").is_file())
+                self.assertEqual("Filtered", Config.file_data_manager.get_file_status(Path(jar_dir, "pkg", "A.class")))
+            # No sources jar: classes are extracted
+            self.assertTrue(Path(dest_dir, "bar", "pkg", "B.class").is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
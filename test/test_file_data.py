@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.scanner import file_reader
+from configuration import Configuration as Config
+from models.FileData import ContentCache, FileDataManager
+
+p = Path(__file__).resolve()
+
+
+class TestFileData(unittest.TestCase):
+
+    def setUp(self):
+        self.content_cache = Config.content_cache
+        Config.content_cache = ContentCache(1024 * 1024)
+
+    def tearDown(self):
+        Config.content_cache = self.content_cache
+
+    def test_content_is_loaded_on_first_access(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = Path(tmp_dir, "NOTICE.txt")
+            file_path.write_bytes(b"Copyright (c) Example\r\nAll rights reserved\n")
+            file_data = file_reader.read_file(file_path)
+            self.assertEqual(43, file_data.file_size)
+            self.assertIsNone(Config.content_cache.peek(file_path))
+
+            self.assertEqual("Copyright (c) Example\nAll rights reserved\n", file_data.file_content)
+            with mock.patch("builtins.open", side_effect=AssertionError("read again")):
+                self.assertEqual("Copyright (c) Example\nAll rights reserved\n", file_data.file_content)
+                self.assertEqual("Copyright", file_data.read_prefix(9))
+
+    def test_read_prefix(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = Path(tmp_dir, "a.txt")
+            file_path.write_bytes("abécd".encode("utf-8") + b"\xff")
+            file_data = file_reader.read_file(file_path)
+            # Cut in the middle of the two-byte character
+            self.assertEqual("ab", file_data.read_prefix(3))
+            self.assertEqual("abéc", file_data.read_prefix(5))
+            self.assertIsNone(Config.content_cache.peek(file_path))
+            # The whole file is not UTF-8
+            self.assertIsInstance(file_data.file_content, bytes)
+
+    def test_lru_eviction(self):
+        cache = ContentCache(3 * sys.getsizeof(b"x" * 100))
+        for key in "abc":
+            cache.get(key, lambda: b"x" * 100)
+        cache.get("a", lambda: b"")
+        cache.get("d", lambda: b"x" * 100)
+
+        self.assertIsNone(cache.peek("b"))
+        self.assertEqual(b"x" * 100, cache.peek("a"))
+        # Larger than the whole cache: returned, not kept
+        self.assertEqual(1000, len(cache.get("e", lambda: b"x" * 1000)))
+        self.assertIsNone(cache.peek("e"))
+        self.assertEqual(3 * sys.getsizeof(b"x" * 100), cache.size())
+
+    def test_inventory_order(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir, "root")
+            for i, rel in enumerate(["a.txt", "d1/b.txt", "d1/e/c.txt", "d1/e/f/g.txt", "d2/h.txt", "d2/d3/i.txt",
+                                     "z.txt"]):
+                Path(root, rel).parent.mkdir(parents=True, exist_ok=True)
+                Path(root, rel).write_text(str(i))
+            os.symlink(Path(root, "d2"), Path(root, "d1", "linked_dir"))
+            os.symlink(Path(root, "z.txt"), Path(root, "d1", "linked.txt"))
+
+            # linked.txt resolves to z.txt, which FileDataManager holds once, where it was first added
+            expected = list(dict.fromkeys(Path(dirpath, filename).resolve()
+                                          for dirpath, dirnames, filenames in os.walk(root) for filename in filenames))
+            self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+            for workers in (1, 4):
+                Config.file_data_manager = FileDataManager()
+                file_reader.read_all_files_in_directory(root, workers=workers)
+                file_datas = Config.file_data_manager.get_all_file_data()
+                self.assertEqual(expected, [file_data.file_path for file_data in file_datas])
+                for file_data in file_datas:
+                    self.assertEqual(file_data.file_path.read_text(), file_data.file_content)
+
+
+if __name__ == "__main__":
+    unittest.main()
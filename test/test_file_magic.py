@@ -0,0 +1,88 @@
+import bz2
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from assessment.creator2 import file_magic
+
+p = Path(__file__).resolve()
+
+
+def _tar_bytes(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tf:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def _zip_bytes(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestFileMagic(unittest.TestCase):
+
+    def test_classify_header(self):
+        tar = _tar_bytes({"README": b"readme"})
+        jar = _zip_bytes({"LICENSE": "MIT License"})
+        cases = [
+            (jar, "lib.war", ("multi", file_magic.ZIP)),
+            (jar, "plugin.hpi", ("multi", file_magic.ZIP)),
+            # A small tar whose last member is an uncompressed jar passes zipfile.is_zipfile()
+            (_tar_bytes({"app.jar": jar}), "bundle.tar", ("multi", file_magic.TAR)),
+            # Compressed tars are recognized by the tar header inside, whatever their name
+            (gzip.compress(tar), "0123abcd", ("multi", file_magic.GZIP)),
+            (gzip.compress(b"plain text"), "notes.txt.gz", ("single", file_magic.GZIP)),
+            (gzip.compress(b"<svg/>"), "icon.svgz", ("none", file_magic.GZIP)),
+            (bz2.compress(tar), "src.tbz2", ("multi", file_magic.BZIP2)),
+            (bz2.compress(b"plain text"), "notes.bz2", ("single", file_magic.BZIP2)),
+            # No magic: only the zip's central directory can tell
+            (b"not a zip", "bad.zip", ("multi", None)),
+            # Executable jar: launcher script before the zip entries
+            (b"#!/bin/sh\nexec java -jar $0\n" + jar, "app.jar", ("multi", None)),
+            (b"\x28\xb5\x2f\xfd" + b"\x00" * 16, "layer", ("none", file_magic.ZSTD)),
+            (b"!<arch>\ndebian-binary   ", "pkg.deb", ("none", file_magic.AR)),
+            (b'{"schemaVersion": 2}', "a" * 64, ("none", None)),
+        ]
+        for content, name, expected in cases:
+            with self.subTest(name=name):
+                self.assertEqual(expected, file_magic.classify_header(content[:file_magic.HEADER_SIZE], name))
+
+    def test_classify_file_is_cached_until_the_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, "archive")
+            path.write_bytes(_zip_bytes({"A.java": "class A {}"}))
+            self.assertEqual(("multi", file_magic.ZIP), file_magic.classify_file(path))
+
+            # Same size and modification time: the cached result is used
+            stat = path.stat()
+            path.write_bytes(b"x" * stat.st_size)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual(("multi", file_magic.ZIP), file_magic.classify_file(path))
+
+            path.write_bytes(b"plain text")
+            self.assertEqual(("none", None), file_magic.classify_file(path))
+
+    def test_classify_file_probes_zips_without_magic(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bad_zip = Path(tmp_dir, "bad.zip")
+            bad_zip.write_bytes(b"not a zip")
+            executable_jar = Path(tmp_dir, "app.jar")
+            executable_jar.write_bytes(b"#!/bin/sh\nexec java -jar $0\n" + _zip_bytes({"A.class": b"\xca\xfe"}))
+
+            self.assertEqual(("none", None), file_magic.classify_file(bad_zip))
+            self.assertEqual(("multi", file_magic.ZIP), file_magic.classify_file(executable_jar))
+
+
+if __name__ == "__main__":
+    unittest.main()
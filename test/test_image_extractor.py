@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import io
+import json
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional
+from assessment.creator2 import extractor, member_reader
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+
+def _layer(files: Dict[str, Optional[bytes]], compress: bool = False) -> bytes:
+    """Layer tar from {path: content}; a None content is an empty file (whiteouts)."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tf:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content or b"")
+            tf.addfile(info, io.BytesIO(content or b""))
+    return gzip.compress(buffer.getvalue()) if compress else buffer.getvalue()
+
+
+def _add(tf: tarfile.TarFile, name: str, content: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(content)
+    tf.addfile(info, io.BytesIO(content))
+
+
+class TestImageExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+        Config.file_data_manager = FileDataManager()
+        jar = io.BytesIO()
+        with zipfile.ZipFile(jar, "w") as zf:
+            zf.writestr("LICENSE", "Apache License 2.0")
+        self.layers = [
+            _layer({
+                "usr/lib/a.txt": b"a v1",
+                "usr/lib/b.txt": b"b",
+                "etc/conf/old.txt": b"old",
+                "opt/app/lib.jar": jar.getvalue(),
+                "var/cache/data.bin": b"cache",
+            }),
+            _layer({
+                "usr/lib/a.txt": b"a v2",
+                "usr/lib/.wh.b.txt": None,
+                "etc/conf/.wh..wh..opq": None,
+                "etc/conf/new.txt": b"new",
+                "./.wh.var": None,
+            }),
+            _layer({"usr/share/c.txt": b"c"}, compress=True),
+        ]
+        self.expected = {
+            Path("image", "usr", "lib", "a.txt"): b"a v2",
+            Path("image", "etc", "conf", "new.txt"): b"new",
+            Path("image", "usr", "share", "c.txt"): b"c",
+            Path("image", "opt", "app", "lib", "LICENSE"): b"Apache License 2.0",
+        }
+
+    def _docker_image(self, tmp_dir: str) -> Path:
+        image = Path(tmp_dir, "image.tar")
+        with tarfile.open(image, "w") as tf:
+            layer_names = []
+            for i, layer in enumerate(self.layers):
+                layer_names.append(f"layer{i}/layer.tar")
+                _add(tf, layer_names[-1], layer)
+            _add(tf, "manifest.json", json.dumps([{"Config": "config.json", "Layers": layer_names}]).encode())
+        return image
+
+    def _oci_image(self, tmp_dir: str) -> Path:
+        image = Path(tmp_dir, "image.tar")
+        with tarfile.open(image, "w") as tf:
+            descriptors = []
+            for layer in self.layers:
+                digest = hashlib.sha256(layer).hexdigest()
+                _add(tf, f"blobs/sha256/{digest}", layer)
+                descriptors.append({"digest": f"sha256:{digest}", "size": len(layer)})
+            manifest = json.dumps({"schemaVersion": 2, "layers": descriptors}).encode()
+            manifest_digest = hashlib.sha256(manifest).hexdigest()
+            _add(tf, f"blobs/sha256/{manifest_digest}", manifest)
+            _add(tf, "index.json", json.dumps({"manifests": [{"digest": f"sha256:{manifest_digest}"}]}).encode())
+            _add(tf, "oci-layout", b'{"imageLayoutVersion": "1.0.0"}')
+        return image
+
+    def test_only_merged_filesystem_is_extracted(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image = self._docker_image(tmp_dir)
+            dest_dir = Path(tmp_dir, "dest").resolve()
+
+            extractor.main(image, dest_dir)
+            on_disk = {path.relative_to(dest_dir): path.read_bytes()
+                       for path in dest_dir.rglob("*") if path.is_file()}
+
+            self.assertEqual(self.expected, on_disk)
+            self.assertEqual("layer1/layer.tar",
+                             Config.file_data_manager.get_file_layer(Path(dest_dir, "image", "usr", "lib", "a.txt")))
+            # Files extracted from a jar belong to the jar's layer
+            self.assertEqual("layer0/layer.tar", Config.file_data_manager.get_file_layer(
+                Path(dest_dir, "image", "opt", "app", "lib", "LICENSE")))
+
+    def test_member_reader_reads_oci_image(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image = self._oci_image(tmp_dir)
+            in_memory_dir = Path(tmp_dir, "in_memory").resolve()
+
+            members = {path.relative_to(in_memory_dir): content
+                       for path, content in member_reader.iter_members(image, in_memory_dir)}
+
+            self.assertEqual(self.expected, members)
+            self.assertEqual(f"blobs/sha256/{hashlib.sha256(self.layers[2]).hexdigest()}",
+                             Config.file_data_manager.get_file_layer(
+                                 Path(in_memory_dir, "image", "usr", "share", "c.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.creator2 import java_decompiler
+from assessment.creator2.decompile_cache import DecompileCache
+
+p = Path(__file__).resolve()
+
+
+def _fake_cfr(command, **kwargs):
+    """Stands in for CFR: writes <package>/<Name>.java for every class but Broken.class."""
+    output_dir = Path(command[command.index("--outputdir") + 1])
+    for target in command[3:command.index("--outputdir")]:
+        class_file = Path(target)
+        if class_file.name == "Broken.class":
+            continue
+        package = class_file.parts[class_file.parts.index("classes") + 1:-1]
+        java_file = output_dir.joinpath(*package, class_file.stem + ".java")
+        java_file.parent.mkdir(parents=True, exist_ok=True)
+        java_file.write_text(f"// {class_file}")
+    return subprocess.CompletedProcess(command, 0, "", "")
+
+
+class TestJavaDecompiler(unittest.TestCase):
+
+    def test_batches(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir).resolve()
+            class_files = [
+                root / "app" / "classes" / "com" / "x" / "Foo.class",
+                root / "app" / "classes" / "com" / "x" / "Bar.class",
+                root / "app" / "classes" / "com" / "x" / "Bar$1.class",
+                root / "app" / "classes" / "Broken.class",
+                root / "lib" / "classes" / "com" / "x" / "Foo.class",
+            ]
+            for class_file in class_files:
+                class_file.parent.mkdir(parents=True, exist_ok=True)
+                class_file.write_bytes(b"\xca\xfe\xba\xbe")
+
+            with mock.patch.object(java_decompiler.subprocess, "run", side_effect=_fake_cfr) as run:
+                results = java_decompiler.decompile_batches(root, root / "cfr.jar", workers=2)
+
+            # The two Foo.class files cannot share a batch
+            self.assertEqual(2, run.call_count)
+            self.assertNotIn(class_files[2], results)
+            self.assertIsNone(results[class_files[3]])
+            for class_file in (class_files[0], class_files[1], class_files[4]):
+                java_file = class_file.with_suffix(".java")
+                self.assertEqual(java_file, results[class_file])
+                self.assertEqual(f"// {class_file}", java_file.read_text())
+            self.assertEqual([], list(root.glob(".cfr_*")))
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir, "root").resolve()
+            class_file = root / "classes" / "com" / "x" / "Foo.class"
+            class_file.parent.mkdir(parents=True)
+            class_file.write_bytes(b"\xca\xfe\xba\xbe")
+            cache = DecompileCache(Path(tmp_dir, "cache"))
+
+            with mock.patch.object(java_decompiler.subprocess, "run", side_effect=_fake_cfr) as run:
+                java_decompiler.decompile_batches(root, root / "cfr.jar", cache=cache)
+                class_file.with_suffix(".java").unlink()
+                results = java_decompiler.decompile_batches(root, root / "cfr.jar", cache=cache)
+
+            self.assertEqual(1, run.call_count)
+            self.assertEqual(f"// {class_file}", results[class_file].read_text())
+
+    def test_batch_classes(self):
+        paths = [Path("a", f"C{i}.class") for i in range(3)] + [Path("b", "C0.class"), Path("b", "C1.class")]
+        self.assertEqual([paths[:2], paths[2:4], paths[4:]], java_decompiler._batch_classes(paths, 2))
+        self.assertEqual([paths[:3], paths[3:]], java_decompiler._batch_classes(paths, 10))
+        # "a/C0.class" and the space before it take 11 characters
+        self.assertEqual([paths[:2], paths[2:3]], java_decompiler._batch_classes(paths[:3], 10, 22))
+        # A path longer than max_chars still gets a batch, on its own
+        self.assertEqual([[path] for path in paths[:3]], java_decompiler._batch_classes(paths[:3], 10, 5))
+
+    def test_jars(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir).resolve()
+            Path(root, "lib").mkdir()
+            jar = Path(root, "lib", "foo.jar")
+            jar.write_bytes(b"PK")
+            cfr_jar = Path(root, "cfr.jar")
+            cfr_jar.write_bytes(b"PK")
+
+            with mock.patch.object(java_decompiler, "decompile_jar", return_value={jar / "A.class": None}) as decompile:
+                results = java_decompiler.decompile_all_classes(str(root / "lib"), str(cfr_jar), True, batch=True,
+                                                                jars=True)
+
+            decompile.assert_called_once_with(jar, cfr_jar)
+            self.assertEqual({jar / "A.class": None}, results)
+            self.assertTrue(jar.is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from pathlib import Path
+from assessment.scanner.license_index import LicenseAnchorIndex, LicenseMinHashIndex, regex_license_to_text
+from assessment.scanner.utils import placeholder_to_regex
+from assessment.scanner.utils import normalize_without_empty_lines_and_dates
+
+p = Path(__file__).resolve()
+
+LICENSES = {
+    Path("MIT.txt"): normalize_without_empty_lines_and_dates(
+        "MIT License\n\nPermission is hereby granted, free of charge\n"
+        "The above copyright notice shall be included\nTHE SOFTWARE IS PROVIDED \"AS IS\""
+    ),
+    Path("Short.txt"): "Short license line",
+    Path("Other.txt"): normalize_without_empty_lines_and_dates(
+        "Other License\nThe above copyright notice shall be included\nsome other terms\nend"
+    ),
+}
+
+
+class TestLicenseIndex(unittest.TestCase):
+
+    def test_anchor_index_matches_naive_containment(self):
+        index = LicenseAnchorIndex(LICENSES)
+        file_text = normalize_without_empty_lines_and_dates(
+            "/*\n * " + LICENSES[Path("MIT.txt")] + " */\nShort license line here"
+        )
+        naive = [path for path, text in LICENSES.items() if text in file_text]
+        found = [path for path, _ in index.find_matches(file_text)]
+        self.assertEqual(naive, found)
+        self.assertEqual([Path("MIT.txt"), Path("Short.txt")], found)
+
+    def test_anchor_index_skips_unrelated_files(self):
+        index = LicenseAnchorIndex(LICENSES)
+        file_text = "public class Example {\n}\n"
+        self.assertEqual([], index.find_matches(file_text))
+
+    def test_minhash_index_scores_reflowed_license(self):
+        mit = LICENSES[Path("MIT.txt")] + "\nwithout warranty of any kind express or implied including"
+        index = LicenseMinHashIndex({Path("MIT.txt"): mit, Path("Other.txt"): LICENSES[Path("Other.txt")]})
+        reflowed = " ".join(mit.split()).replace("charge ", "charge\n")
+        similar = index.find_similar(reflowed, 0.8)
+        self.assertEqual(Path("MIT.txt"), similar[0][0])
+        self.assertEqual(1.0, similar[0][1])
+        self.assertEqual([], index.find_similar("public class Example { int value; }", 0.8))
+
+    def test_regex_license_to_text(self):
+        regex_text = placeholder_to_regex("Copyright (c) <year> <owner>\nAll rights reserved.")
+        self.assertEqual("All rights reserved.", regex_license_to_text(regex_text).split("\n")[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
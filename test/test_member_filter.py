@@ -0,0 +1,85 @@
+import hashlib
+import io
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from assessment.creator2 import extractor, member_reader
+from assessment.creator2.member_filter import MemberFilter
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+_SETTINGS = ("filter_extensions", "filter_globs", "filter_max_size", "filter_hash")
+
+
+class TestMemberFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = {name: getattr(Config, name) for name in _SETTINGS}
+        Config.filter_extensions = [".png", "so"]
+        Config.filter_globs = ["locale/*"]
+        Config.filter_max_size = 0
+        Config.filter_hash = True
+        self.addCleanup(setattr, Config, "file_data_manager", Config.file_data_manager)
+        Config.file_data_manager = FileDataManager()
+
+    def tearDown(self):
+        for name, value in self.settings.items():
+            setattr(Config, name, value)
+
+    def test_is_filtered(self):
+        member_filter = MemberFilter(extensions=[".PNG", "so"], globs=["locale/*"], max_size=100)
+        self.assertTrue(member_filter.is_filtered("res/icons/app.png"))
+        self.assertTrue(member_filter.is_filtered("lib/native.so", 10))
+        self.assertTrue(member_filter.is_filtered("share/locale/de.mo"))
+        self.assertTrue(member_filter.is_filtered("data.bin", 101))
+        self.assertFalse(member_filter.is_filtered("locale/de/LC_MESSAGES"))
+        self.assertFalse(member_filter.is_filtered("src/A.java", 100))
+
+    def test_filtered_members_are_recorded_not_written(self):
+        icon = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source_dir = Path(tmp_dir, "source")
+            source_dir.mkdir()
+            Path(source_dir, "logo.png").write_bytes(icon)
+            with zipfile.ZipFile(Path(source_dir, "app.jar"), "w") as zf:
+                zf.writestr("A.java", "class A {}")
+                zf.writestr("res/icon.png", icon)
+                zf.writestr("locale/de.properties", "hallo")
+            with tarfile.open(Path(source_dir, "pkg.tar.gz"), "w:gz") as tf:
+                # Filtered while pkg/ is still flattened; moved along when README turns up
+                for name, content in (("pkg/lib/native.so", b"\x7fELF"), ("pkg/NOTICE", b"notice"),
+                                      ("README", b"readme")):
+                    info = tarfile.TarInfo(name)
+                    info.size = len(content)
+                    tf.addfile(info, io.BytesIO(content))
+            dest_dir = Path(tmp_dir, "dest").resolve()
+            in_memory_dir = Path(tmp_dir, "in_memory").resolve()
+
+            extractor.main(source_dir, dest_dir)
+            on_disk = sorted(path.relative_to(dest_dir) for path in dest_dir.rglob("*") if path.is_file())
+            filtered = {path.relative_to(dest_dir): entry
+                        for path, entry in Config.file_data_manager.filtered_files.items()}
+
+            self.assertEqual([Path("app", "A.java"), Path("pkg", "README"), Path("pkg", "pkg", "NOTICE")], on_disk)
+            self.assertEqual({
+                Path("logo.png"): (len(icon), hashlib.sha256(icon).hexdigest()),
+                Path("app", "res", "icon.png"): (len(icon), hashlib.sha256(icon).hexdigest()),
+                Path("app", "locale", "de.properties"): (5, hashlib.sha256(b"hallo").hexdigest()),
+                Path("pkg", "pkg", "lib", "native.so"): (4, hashlib.sha256(b"\x7fELF").hexdigest()),
+            }, filtered)
+            self.assertEqual("Filtered", Config.file_data_manager.get_file_status(Path(dest_dir, "logo.png")))
+
+            Config.file_data_manager = FileDataManager()
+            members = sorted(path.relative_to(in_memory_dir)
+                             for path, content in member_reader.iter_members(source_dir, in_memory_dir))
+            self.assertEqual(on_disk, members)
+            self.assertEqual(set(filtered), {path.relative_to(in_memory_dir)
+                                             for path in Config.file_data_manager.filtered_files})
+
+
+if __name__ == "__main__":
+    unittest.main()
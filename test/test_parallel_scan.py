@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.scanner import file_reader, parallel_scan, rule_pack
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+FILES = {
+    "NOTICE.txt": b"Copyright (c) 2024 Example Corp\nAll rights reserved\n",
+    "src/Main.java": b"/*\n * Licensed under the Apache License, Version 2.0\n */\npublic class Main {}\n",
+    "src/util/helper.py": b"# SPDX-License-Identifier: MIT\nprint('hello')\n",
+    "lib/blob.bin": b"\x00\x01\x02\x03" * 64 + b"Copyright Example Corp" + b"\x00" * 64,
+    "README.md": b"# Example\n\nReleased under the MIT License.\n",
+}
+
+
+class TestParallelScan(unittest.TestCase):
+
+    def _scan(self, root: Path, **kwargs):
+        with mock.patch.object(Config, "file_data_manager", FileDataManager()):
+            file_reader.read_all_files_in_directory(root)
+            parallel_scan.scan_all_files(**kwargs)
+            return {file_data.file_path: tuple(getattr(file_data, field) for field in parallel_scan.RESULT_FIELDS)
+                    for file_data in Config.file_data_manager.get_all_file_data()}
+
+    def test_same_results_for_any_worker_count(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root = Path(tmp_dir, "root")
+            for rel, content in FILES.items():
+                Path(root, rel).parent.mkdir(parents=True, exist_ok=True)
+                Path(root, rel).write_bytes(content)
+
+            with mock.patch.object(Config, "rule_pack_path", Path(tmp_dir, "rule_pack.bin")), \
+                    mock.patch.object(rule_pack, "_rule_pack", None):
+                in_process = self._scan(root, workers=1)
+                sharded = self._scan(root, workers=2, shard_size=1)
+
+            self.assertEqual(len(FILES), len(in_process))
+            self.assertEqual(in_process, sharded)
+
+
+if __name__ == "__main__":
+    unittest.main()
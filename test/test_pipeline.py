@@ -0,0 +1,37 @@
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.scanner import pipeline
+from models.FileData import FileData
+
+p = Path(__file__).resolve()
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_stages_run_after_their_dependencies(self):
+        calls = []
+        with mock.patch.dict(pipeline._stages, clear=True):
+            pipeline.stage("match", depends_on=("detect",))(lambda fd, views: calls.append("match"))
+            pipeline.stage("detect")(lambda fd, views: calls.append("detect"))
+            pipeline.stage("hash")(lambda fd, views: calls.append("hash"))
+            stages = pipeline.ordered_stages()
+            pipeline.run_stages_on_file(FileData(Path("a.txt"), "text", ".txt"), stages)
+        self.assertEqual(["detect", "match", "hash"], calls)
+
+    def test_dependency_cycle_is_rejected(self):
+        with mock.patch.dict(pipeline._stages, clear=True):
+            pipeline.stage("a", depends_on=("b",))(lambda fd, views: None)
+            pipeline.stage("b", depends_on=("a",))(lambda fd, views: None)
+            with self.assertRaises(ValueError):
+                pipeline.ordered_stages()
+
+    def test_views_are_computed_once(self):
+        views = pipeline.FileViews(FileData(Path("a.txt"), b"Copyright  2024 ACME\n\n", ".txt"))
+        self.assertEqual("copyright  2024 acme\n\n", views.text_lower)
+        self.assertEqual("Copyright ACME", views.normalized_text)
+        self.assertIs(views.text, views.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
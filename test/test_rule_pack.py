@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+from assessment.scanner import rule_pack, utils
+from assessment.scanner.rule_pack import _HEADER, _build_manifest, _is_stale, _write_pack_file, get_input_files
+
+p = Path(__file__).resolve()
+
+
+class TestRulePack(unittest.TestCase):
+
+    def test_manifest_tracks_content_not_mtime(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_file = Path(tmp_dir, "MIT.txt")
+            input_file.write_text("MIT License", encoding="utf-8")
+            manifest = _build_manifest([input_file])
+            self.assertEqual((False, False), _is_stale(manifest, [input_file]))
+
+            # Same content, new mtime: only the manifest needs refreshing
+            stat = input_file.stat()
+            os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertEqual((False, True), _is_stale(manifest, [input_file]))
+
+            input_file.write_text("MIT License v2", encoding="utf-8")
+            self.assertEqual((True, False), _is_stale(manifest, [input_file]))
+
+    def test_manifest_detects_added_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = Path(tmp_dir, "a.txt")
+            second = Path(tmp_dir, "b.txt")
+            first.write_text("a", encoding="utf-8")
+            second.write_text("b", encoding="utf-8")
+            manifest = _build_manifest([first])
+            self.assertEqual((True, False), _is_stale(manifest, [first, second]))
+
+    def test_build_code_is_an_input(self):
+        input_files = get_input_files()
+        self.assertIn(Path(utils.__file__).resolve(), input_files)
+        self.assertTrue(all(input_file.is_file() for input_file in input_files))
+
+    def test_unreadable_payload_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pack_path = Path(tmp_dir, "rules.pack")
+            manifest = _build_manifest(get_input_files())
+            for payload in (b"garbage", b"\x80\x04\x95\x00\x00\x00\x00\x00\x00\x00\x00\x8c\x0bno_such_mod\x94"
+                                        b"\x8c\x01X\x94\x93\x94."):
+                _write_pack_file(pack_path, manifest, payload)
+                with mock.patch.object(rule_pack, "build_rule_pack", return_value="rebuilt") as build:
+                    self.assertEqual("rebuilt", rule_pack.load_rule_pack(pack_path))
+                build.assert_called_once_with(pack_path)
+
+    def test_concurrent_writers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pack_path = Path(tmp_dir, "rules.pack")
+            payload = b"x" * 100000
+            errors = []
+
+            def write():
+                try:
+                    _write_pack_file(pack_path, {"version": 1}, payload)
+                except OSError as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=write) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual([], errors)
+            self.assertEqual(["rules.pack"], os.listdir(tmp_dir))
+            self.assertEqual(_HEADER.size + len(b'{"version": 1}') + len(payload), pack_path.stat().st_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
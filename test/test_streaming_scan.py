@@ -0,0 +1,119 @@
+import io
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+from assessment.creator2 import extractor
+from assessment.scanner import file_reader, parallel_scan, pipeline, rule_pack, streaming_scan
+from configuration import Configuration as Config
+from models.FileData import FileDataManager
+
+p = Path(__file__).resolve()
+
+
+def _make_source(tmp_dir: str, file_count: int = 3) -> Path:
+    """proj.tar, which extracts to proj/, with plain files and a jar in it."""
+    jar = io.BytesIO()
+    with zipfile.ZipFile(jar, "w") as zf:
+        zf.writestr("META-INF/LICENSE", "Licensed under the Apache License, Version 2.0")
+        zf.writestr("pkg/A.java", "// Copyright (c) 2024 Example Corp\nclass A {}\n")
+    files = {f"proj/src/f{i}.py": f"# SPDX-License-Identifier: MIT\nprint({i})\n".encode() for i in range(file_count)}
+    files["proj/NOTICE.txt"] = b"Copyright (c) 2024 Example Corp\nAll rights reserved\n"
+    files["proj/lib/a.jar"] = jar.getvalue()
+
+    source = Path(tmp_dir, "proj.tar")
+    with tarfile.open(source, "w") as tf:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tf.addfile(info, io.BytesIO(content))
+    return source
+
+
+class TestStreamingScan(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        for patcher in (mock.patch.object(Config, "rule_pack_path", Path(self.tmp_dir, "rule_pack.bin")),
+                        mock.patch.object(rule_pack, "_rule_pack", None),
+                        mock.patch.object(Config, "file_data_manager", FileDataManager()),
+                        mock.patch.object(Config, "review_file_dir", str(Path(self.tmp_dir, "review")))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _results():
+        return {file_data.file_path: tuple(getattr(file_data, field) for field in parallel_scan.RESULT_FIELDS)
+                for file_data in Config.file_data_manager.get_all_file_data()}
+
+    def test_same_results_as_extracting_first(self):
+        source = _make_source(self.tmp_dir)
+
+        dest_dir = Path(self.tmp_dir, "dest").resolve()
+        extractor.main(source, dest_dir)
+        file_reader.read_all_files_in_directory(dest_dir / "proj")
+        parallel_scan.scan_all_files(workers=1)
+        expected = {path.relative_to(dest_dir): values for path, values in self._results().items()}
+        self.assertIn(Path("proj", "lib", "a", "pkg", "A.java"), expected)
+
+        for workers, shard_size in ((1, None), (2, 1)):
+            Config.file_data_manager = FileDataManager()
+            dest_dir = Path(self.tmp_dir, f"dest{workers}").resolve()
+            streaming_scan.extract_and_scan(source, dest_dir, dest_dir / "proj", workers=workers,
+                                            shard_size=shard_size)
+            results = {path.relative_to(dest_dir): values for path, values in self._results().items()}
+            self.assertEqual(expected, results)
+
+    def test_direct_scan_holds_contents_within_budget(self):
+        source = _make_source(self.tmp_dir, file_count=50)
+        dest_dir = Path(self.tmp_dir, "dest").resolve()
+        streaming_scan.scan_in_memory(source, dest_dir, dest_dir / "proj", workers=1)
+        expected = self._results()
+
+        acquire = streaming_scan._ContentBudget.acquire
+        held = []
+
+        def record(budget, size, timeout):
+            acquired = acquire(budget, size, timeout)
+            held.append(budget.used)
+            return acquired
+
+        # Room for about five of the members
+        with mock.patch.object(Config, "scan_queue_bytes", 250), \
+                mock.patch.object(streaming_scan._ContentBudget, "acquire", autospec=True, side_effect=record):
+            for workers in (1, 2):
+                Config.file_data_manager = FileDataManager()
+                streaming_scan.scan_in_memory(source, dest_dir, dest_dir / "proj", workers=workers)
+                self.assertEqual(expected, self._results())
+
+        self.assertGreater(len(held), 100)
+        self.assertLessEqual(max(held), 250)
+
+    def test_scanner_error_stops_extraction(self):
+        source = _make_source(self.tmp_dir, file_count=200)
+        dest_dir = Path(self.tmp_dir, "dest")
+        extract_main = extractor.main
+        emitted = []
+
+        def main(source_dir, dest_dir, on_file):
+            def put(path):
+                emitted.append(path)
+                on_file(path)
+            extract_main(source_dir, dest_dir, on_file=put)
+
+        with mock.patch.object(Config, "scan_queue_size", 1), \
+                mock.patch.object(extractor, "main", side_effect=main), \
+                mock.patch.object(pipeline, "run_stages_on_file", side_effect=RuntimeError("scanner failed")):
+            with self.assertRaisesRegex(RuntimeError, "scanner failed"):
+                streaming_scan.extract_and_scan(source, dest_dir, dest_dir / "proj", workers=1)
+
+        # The producer gave up at its next file instead of extracting all of them
+        self.assertLess(len(emitted), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()